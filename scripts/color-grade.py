@@ -28,6 +28,8 @@ import os
 import subprocess
 import sys
 
+from stream_io import is_stream, output_codec_args
+
 
 def main():
     parser = argparse.ArgumentParser(description="Color grade cinematográfico.")
@@ -59,7 +61,7 @@ def main():
     input_path = os.path.join(video_dir, "fuente", "video", args.input)
     output_path = os.path.join(video_dir, "fuente", "video", args.output)
 
-    if not os.path.isfile(input_path):
+    if not (os.path.isfile(input_path) or is_stream(input_path)):
         print(f"❌ Video no encontrado: {input_path}")
         sys.exit(1)
 
@@ -108,8 +110,7 @@ def main():
     cmd = [
         "ffmpeg", "-i", input_path,
         "-vf", vf,
-        "-c:v", "libx264", "-crf", str(args.crf), "-preset", args.preset,
-        "-c:a", "copy",
+        *output_codec_args(output_path, args.crf, args.preset),
         "-y", output_path
     ]
 
@@ -120,6 +121,9 @@ def main():
         print(result.stderr[-1000:])
         sys.exit(1)
 
+    if is_stream(output_path):
+        print(f"\n✅ Listo: {output_path} (stream)")
+        return
     size_mb = os.path.getsize(output_path) / (1024 * 1024)
     print(f"\n✅ Listo: {output_path} ({size_mb:.0f} MB)")
 
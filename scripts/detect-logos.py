@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Paso 6 — Detección de marcas para overlay-logos.md
+
+Busca menciones de marcas en la transcripción word-level y genera
+`fuente/transcription/overlay-logos.md` (copia de transcription_limpia.md +
+líneas `→ marca.png | M:SS.xx | ✅` debajo de cada segmento) para que Sergio
+solo tenga que revisar ✅/❌ antes de correr logo-overlay.py.
+
+Las marcas salen de la librería central de logos:
+  ~/Documents/Edicion/Serudda/recursos/logos/{brand}/{brand}.png
+más un archivo de alias para los errores típicos de Whisper:
+  ~/Documents/Edicion/Serudda/recursos/logos/aliases.json
+
+  {
+    "anthropic": ["antropic", "anthropics"],
+    "claude": ["cloudy", "clod"],
+    "openai": ["open ai"],
+    "_ambiguous": ["apple", "meta"]
+  }
+
+Todas las marcas y alias van a un autómata Aho-Corasick sobre tokens: la
+transcripción se recorre una sola vez, sin importar cuántas marcas haya.
+
+Uso:
+  python3 detect-logos.py <carpeta-del-video>
+  python3 detect-logos.py <carpeta-del-video> --dry-run
+  python3 detect-logos.py <carpeta-del-video> --force --repeat-window 45
+
+Documentación completa: ../6_logo-overlay.md
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+from collections import deque
+
+from transcript_index import load_transcript
+
+
+LOGO_DIR = os.path.expanduser("~/Documents/Edicion/Serudda/recursos/logos")
+
+
+def parse_timestamp(ts):
+    """Convertir MM:SS.xx o H:MM:SS.xx a segundos."""
+    parts = ts.strip().split(":")
+    if len(parts) == 2:
+        return int(parts[0]) * 60 + float(parts[1])
+    elif len(parts) == 3:
+        return int(parts[0]) * 3600 + int(parts[1]) * 60 + float(parts[2])
+    return 0.0
+
+
+def format_time(seconds):
+    m, s = divmod(seconds, 60)
+    m = int(m)
+    if s == int(s):
+        return f"{m}:{int(s):02d}"
+    return f"{m}:{s:05.2f}"
+
+
+def normalize(text):
+    """Minúsculas, sin acentos ni puntuación: 'Antrópic,' → 'antropic'."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^\w]+", "", text)
+
+
+def tokenize(phrase):
+    """Frase/slug → tokens normalizados ('github-copilot' → ['github', 'copilot'])."""
+    return [t for t in (normalize(p) for p in re.split(r"[\s\-_.]+", phrase)) if t]
+
+
+def load_brand_patterns(logo_dir, aliases_path):
+    """Patrones {tokens: marca} desde los slugs de la librería + aliases.json.
+
+    Retorna (patterns, ambiguous, brands) — `ambiguous` son marcas que se
+    pre-marcan ❌ porque también son palabras comunes (Apple, Meta...).
+    """
+    patterns = {}
+    brands = sorted(
+        name for name in os.listdir(logo_dir)
+        if os.path.isfile(os.path.join(logo_dir, name, f"{name}.png"))
+    ) if os.path.isdir(logo_dir) else []
+
+    for brand in brands:
+        tokens = tokenize(brand)
+        if tokens:
+            patterns[tuple(tokens)] = brand
+        if len(tokens) > 1:
+            patterns[("".join(tokens),)] = brand  # "githubcopilot"
+
+    ambiguous = set()
+    if aliases_path and os.path.isfile(aliases_path):
+        with open(aliases_path) as f:
+            aliases = json.load(f)
+        ambiguous = set(aliases.pop("_ambiguous", []))
+        for brand, names in aliases.items():
+            if brand not in brands:
+                print(f"⚠️  aliases.json: '{brand}' no está en la librería de logos — se ignora")
+                continue
+            for name in names:
+                tokens = tokenize(name)
+                if tokens:
+                    patterns[tuple(tokens)] = brand
+
+    return patterns, ambiguous, brands
+
+
+class BrandMatcher:
+    """Autómata Aho-Corasick sobre tokens (palabras), no caracteres.
+
+    Trabajar por palabra evita falsos positivos dentro de otras palabras
+    ('meta' en 'metadata') y permite alias de varias palabras ('open ai').
+    """
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]  # (brand, largo en tokens)
+
+        for tokens, brand in patterns.items():
+            node = 0
+            for tok in tokens:
+                nxt = self.goto[node].get(tok)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[node][tok] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                node = nxt
+            self.out[node].append((brand, len(tokens)))
+
+        # Fail links por BFS; cada nodo hereda las salidas de su fail
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for tok, child in self.goto[node].items():
+                queue.append(child)
+                f = self.fail[node]
+                while f and tok not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[child] = self.goto[f].get(tok, 0)
+                self.out[child] = self.out[child] + self.out[self.fail[child]]
+
+    def find(self, tokens):
+        """Un solo pase lineal. Retorna [(i_inicio, i_fin, brand)] sin solapes (gana el más largo)."""
+        matches = []
+        node = 0
+        for i, tok in enumerate(tokens):
+            while node and tok not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(tok, 0)
+            for brand, length in self.out[node]:
+                matches.append((i - length + 1, i, brand))
+
+        matches.sort(key=lambda m: (m[0], -(m[1] - m[0])))
+        selected = []
+        last_end = -1
+        for start, end, brand in matches:
+            if start > last_end:
+                selected.append((start, end, brand))
+                last_end = end
+        return selected
+
+
+def detect_mentions(words, matcher, ambiguous, repeat_window):
+    """Menciones [(start, brand, approved)] con el timestamp exacto de la primera palabra.
+
+    Repeticiones de la misma marca dentro de `repeat_window` segundos y marcas
+    ambiguas se pre-marcan ❌ para revisión.
+    """
+    # Cada palabra original distinta se normaliza una sola vez
+    normalized = [normalize(w) for w in words.word_vocab]
+    tokens = [normalized[i] for i in words.word_ids]
+    mentions = []
+    last_shown = {}
+    for start_idx, _, brand in matcher.find(tokens):
+        t = words.start(start_idx)
+        approved = brand not in ambiguous
+        if brand in last_shown and t - last_shown[brand] < repeat_window:
+            approved = False
+        if approved:
+            last_shown[brand] = t
+        mentions.append((t, brand, approved))
+    return mentions
+
+
+def build_overlay_md(limpia_lines, mentions):
+    """Copia de la limpia con las detecciones debajo del segmento que las contiene."""
+    seg_pattern = re.compile(r'\[(\d+:\d+(?:\.\d+)?)\s*-\s*(\d+:\d+(?:\.\d+)?)\]')
+    out = []
+    pending = sorted(mentions)
+    i = 0
+    past_header = False
+    for line in limpia_lines:
+        if not past_header and (line.startswith('#') or line.strip() == ''):
+            continue
+        past_header = True
+        out.append(line.rstrip("\n"))
+        match = seg_pattern.match(line.strip())
+        if not match:
+            continue
+        seg_end = parse_timestamp(match.group(2))
+        while i < len(pending) and pending[i][0] < seg_end:
+            t, brand, approved = pending[i]
+            out.append(f"→ {brand}.png | {format_time(round(t, 2))} | {'✅' if approved else '❌'}")
+            i += 1
+    # Menciones después del último segmento
+    for t, brand, approved in pending[i:]:
+        out.append(f"→ {brand}.png | {format_time(round(t, 2))} | {'✅' if approved else '❌'}")
+    return "\n".join(out) + "\n"
+
+
+HEADER = """# Overlay Logos
+#
+# Generado por detect-logos.py desde transcription_limpia.md.
+#
+# INSTRUCCIONES:
+# Revisá cada detección y cambiá ✅ ↔ ❌. Nada más.
+# - Repeticiones cercanas de la misma marca ya vienen en ❌
+# - Marcas ambiguas (aliases.json → _ambiguous) vienen en ❌
+#
+# Formato: → marca.png | M:SS.xx | ✅/❌
+
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Paso 6 — Detección de marcas para overlay-logos.md")
+    parser.add_argument("video_dir", help="Carpeta del video")
+    parser.add_argument("--logo-dir", default=LOGO_DIR, help="Librería de logos (default: recursos/logos)")
+    parser.add_argument("--aliases", default=None, help="Archivo de alias (default: <logo-dir>/aliases.json)")
+    parser.add_argument("--repeat-window", type=float, default=30.0, help="Repeticiones de la misma marca dentro de N segundos van ❌ (default: 30)")
+    parser.add_argument("--force", action="store_true", help="Sobreescribir overlay-logos.md si ya existe")
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar detecciones")
+
+    args = parser.parse_args()
+
+    video_dir = os.path.expanduser(args.video_dir)
+    transcription_dir = os.path.join(video_dir, "fuente", "transcription")
+    transcription_json = os.path.join(transcription_dir, "transcription_original.json")
+    limpia_md = os.path.join(transcription_dir, "transcription_limpia.md")
+    overlay_md = os.path.join(transcription_dir, "overlay-logos.md")
+    logo_dir = os.path.expanduser(args.logo_dir)
+    aliases_path = os.path.expanduser(args.aliases) if args.aliases else os.path.join(logo_dir, "aliases.json")
+
+    for path in [transcription_json, limpia_md]:
+        if not os.path.isfile(path):
+            print(f"❌ No encontrado: {path}")
+            print(f"   Corré primero: python3 scripts/transcribe.py {args.video_dir}")
+            sys.exit(1)
+
+    patterns, ambiguous, brands = load_brand_patterns(logo_dir, aliases_path)
+    if not patterns:
+        print(f"❌ No hay logos en {logo_dir}")
+        sys.exit(1)
+
+    matcher = BrandMatcher(patterns)
+    words = load_transcript(transcription_json)
+    mentions = detect_mentions(words, matcher, ambiguous, args.repeat_window)
+
+    print(f"📋 Transcripción: {transcription_json} ({len(words)} palabras)")
+    print(f"🖼️  Logos: {logo_dir} ({len(brands)} marcas, {len(patterns)} patrones)")
+    print(f"\n📊 {len(mentions)} menciones | {sum(1 for m in mentions if m[2])} ✅\n")
+    for t, brand, approved in mentions:
+        print(f"   {'✅' if approved else '❌'} {format_time(round(t, 2)):>8}  {brand}")
+
+    if args.dry_run:
+        print("\n🏁 Dry run — no se escribió nada.")
+        return
+
+    if os.path.isfile(overlay_md) and not args.force:
+        print(f"\n⚠️  {overlay_md} ya existe (puede tener revisión de Sergio).")
+        print("   Usá --force para regenerarlo.")
+        sys.exit(1)
+
+    with open(limpia_md) as f:
+        limpia_lines = f.readlines()
+    with open(overlay_md, "w") as f:
+        f.write(HEADER)
+        f.write(build_overlay_md(limpia_lines, mentions))
+
+    print(f"\n✅ {overlay_md}")
+    print(f"   → Revisá ✅/❌ y después: python3 scripts/logo-overlay.py {args.video_dir} --dry-run")
+
+
+if __name__ == "__main__":
+    main()
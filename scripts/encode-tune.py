@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+"""
+Autotuner de encoding — Elegir CRF/preset de x264 para los pasos que re-encodean.
+
+Todos los scripts usan `-crf 18` con `-preset medium` o `fast`. A veces el
+video tiene que salir en una hora y a veces se quiere el archivo más chico.
+Este script encodea ventanas cortas del video real con el filtro de cada paso
+(hqdn3d, color grade o ninguno) y varios presets y CRF:
+
+  - calidad: todas las combinaciones en paralelo → bitrate y SSIM contra la
+    ventana filtrada sin comprimir
+  - velocidad: un encode a la vez por preset, con los threads que elige
+    ffmpeg (todos los cores, como corren los pasos), sin extrapolar
+
+y según el objetivo elige la configuración de cada paso. El presupuesto se
+reparte entre los pasos en proporción a lo que dura el video que encodea cada uno:
+
+  --budget 30m                      → terminar todos los encodes en 30 minutos
+  --max-bitrate 8M --min-ssim 0.98  → archivo más chico con esa calidad
+  (se pueden combinar)
+
+El resultado queda en `$VIDEO/tmp/encode-settings.json` y se imprimen los
+comandos de cada paso con `--crf` / `--preset`.
+
+Uso:
+  python3 encode-tune.py <carpeta-del-video> --budget 30m
+  python3 encode-tune.py <carpeta-del-video> --min-ssim 0.98
+  python3 encode-tune.py <carpeta-del-video> --budget 1h --max-bitrate 10M --steps 2,3,4
+  python3 encode-tune.py <carpeta-del-video> --dry-run
+
+Documentación completa: ../README.md (sección "Autotuner de encoding")
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+
+# Pasos que re-encodean el video completo: (paso, script, argumento de entrada)
+STEPS = [
+    (2, "denoise.py", "$VIDEO"),
+    (3, "color-grade.py", "$VIDEO"),
+    (4, "jump-cut.py", "$VIDEO/fuente/video/3_video_color_grade.mp4"),
+    (6, "logo-overlay.py", "$VIDEO"),
+    (7, "media-overlay.py", "$VIDEO"),
+    (8, "text-overlay.py", "$VIDEO"),
+    (9, "inserts.py", "$VIDEO"),
+]
+CUT_STEP = 4  # desde acá el video dura lo que diga la cut list
+
+# Filtro de cada paso para las pruebas (los defaults de denoise.py y color-grade.py).
+# El resto de los pasos encodea el video tal cual salvo en ventanas cortas.
+STEP_FILTERS = {
+    2: ("denoise", "hqdn3d=3:3:4:4"),
+    3: ("color-grade", ",".join([
+        "curves=master='0/0.04 0.25/0.22 0.5/0.50 0.75/0.73 1/0.92':red='0/0.04 0.5/0.55 1/0.93':"
+        "green='0/0.03 0.5/0.50 1/0.92':blue='0/0.06 0.5/0.49 1/0.9'",
+        "colorbalance=rs=0.03:gs=-0.02:bs=-0.04:rm=0.05:gm=0.01:bm=-0.02:rh=-0.03:gh=-0.01:bh=0.02",
+        "eq=saturation=1.1:contrast=1.02",
+        "vignette=PI/6",
+    ])),
+}
+PLAIN = ("encode", None)
+
+
+def format_time(seconds):
+    m, s = divmod(seconds, 60)
+    m = int(m)
+    if s == int(s):
+        return f"{m}:{int(s):02d}"
+    return f"{m}:{s:05.2f}"
+
+
+def parse_budget(value):
+    """'1h30m' / '30m' / '90s' / '45' (minutos) → segundos."""
+    value = value.strip().lower()
+    if re.fullmatch(r"\d+(\.\d+)?", value):
+        return float(value) * 60
+    parts = re.findall(r"(\d+(?:\.\d+)?)([hms])", value)
+    if not parts or "".join(n + u for n, u in parts) != value:
+        raise argparse.ArgumentTypeError(f"Presupuesto inválido: {value} (ej: 30m, 1h30m, 90s)")
+    return sum(float(n) * {"h": 3600, "m": 60, "s": 1}[u] for n, u in parts)
+
+
+def parse_bitrate(value):
+    """'8M' / '2500k' / '8000000' → bits por segundo."""
+    match = re.fullmatch(r"(\d+(?:\.\d+)?)([kKmM]?)", value.strip())
+    if not match:
+        raise argparse.ArgumentTypeError(f"Bitrate inválido: {value} (ej: 8M, 2500k)")
+    return float(match.group(1)) * {"": 1, "k": 1e3, "m": 1e6}[match.group(2).lower()]
+
+
+def format_bitrate(bps):
+    return f"{bps / 1e6:.1f} Mb/s"
+
+
+def get_duration(video_path):
+    result = subprocess.run(
+        ["ffprobe", "-v", "quiet", "-show_entries", "format=duration",
+         "-of", "default=noprint_wrappers=1:nokey=1", video_path],
+        capture_output=True, text=True
+    )
+    return float(result.stdout.strip())
+
+
+def sample_windows(duration, samples, sample_duration):
+    """Ventanas [(start, dur)] repartidas por el video (evita intro y cierre)."""
+    sample_duration = min(sample_duration, duration / max(samples, 1))
+    return [
+        (max(0.0, duration * (i + 1) / (samples + 1) - sample_duration / 2), sample_duration)
+        for i in range(samples)
+    ]
+
+
+def encode_cmd(video_path, start, duration, vf, preset, crf, threads=None):
+    """Encode de una ventana, sin path de salida. Sin `threads` usa los de ffmpeg, como los pasos."""
+    cmd = ["ffmpeg", "-y", "-ss", f"{start:.3f}", "-t", f"{duration:.3f}", "-i", video_path, "-an"]
+    if vf:
+        cmd += ["-vf", vf]
+    cmd += ["-c:v", "libx264", "-preset", preset, "-crf", str(crf)]
+    return cmd + (["-threads", str(threads)] if threads else [])
+
+
+def benchmark_quality(video_path, start, duration, vf, preset, crf, threads, out_path):
+    """Encodear una ventana y medir (bytes, SSIM contra la ventana filtrada sin comprimir)."""
+    result = subprocess.run(encode_cmd(video_path, start, duration, vf, preset, crf, threads) + [out_path],
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
+
+    size = os.path.getsize(out_path)
+    reference = f"[1:v]{vf}[ref];[0:v][ref]ssim" if vf else "[0:v][1:v]ssim"
+    result = subprocess.run(
+        ["ffmpeg", "-i", out_path, "-ss", f"{start:.3f}", "-t", f"{duration:.3f}", "-i", video_path,
+         "-lavfi", reference, "-threads", str(threads), "-f", "null", "-"],
+        capture_output=True, text=True
+    )
+    os.remove(out_path)
+    match = re.search(r"All:([\d.]+)", result.stderr)
+    ssim = float(match.group(1)) if match else 0.0
+    return size, ssim
+
+
+def benchmark_speed(video_path, start, duration, vf, preset, crf):
+    """Segundos de video por segundo de pared de un encode solo en la máquina (salida descartada)."""
+    t0 = time.monotonic()
+    result = subprocess.run(encode_cmd(video_path, start, duration, vf, preset, crf) + ["-f", "null", "-"],
+                            capture_output=True, text=True)
+    elapsed = time.monotonic() - t0
+    if result.returncode != 0:
+        return None
+    return duration / max(elapsed, 1e-6)
+
+
+def progress(i, total):
+    pct = (i + 1) / total * 100
+    bar = "█" * int(pct / 2) + "░" * (50 - int(pct / 2))
+    print(f"\r  [{bar}] {pct:.0f}% ({i+1}/{total})", end="", flush=True)
+
+
+def run_benchmarks(video_path, windows, filters, presets, crfs, tmp_dir, workers):
+    """Tabla de filas {filter, preset, crf, speed, bitrate, ssim}.
+
+    `filters` es {nombre: vf}. Bitrate y SSIM no dependen de los threads: se
+    miden en paralelo (workers × CPUs/workers threads). La velocidad sí: se
+    mide con un encode a la vez por filtro × preset con los threads de ffmpeg
+    (los pasos no pasan -threads), sobre la ventana del medio y con el CRF del
+    medio (el CRF mueve poco la velocidad).
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    cpus = os.cpu_count() or 4
+    threads = max(1, cpus // workers)
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    jobs = []
+    for name, vf in filters.items():
+        for preset in presets:
+            for crf in crfs:
+                for w_idx, (start, duration) in enumerate(windows):
+                    out_path = os.path.join(tmp_dir, f"tune_{name}_{preset}_{crf}_{w_idx}.mp4")
+                    jobs.append((name, vf, preset, crf, start, duration, out_path))
+
+    print(f"🧪 Calidad: {len(jobs)} encodes de prueba | {workers} workers × {threads} threads...")
+    quality = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(benchmark_quality, video_path, start, duration, vf, preset, crf, threads, out_path)
+            for _, vf, preset, crf, start, duration, out_path in jobs
+        ]
+        for i, ((name, _, preset, crf, _, duration, _), future) in enumerate(zip(jobs, futures)):
+            measured = future.result()
+            progress(i, len(jobs))
+            if measured is None:
+                continue
+            size, ssim = measured
+            acc = quality.setdefault((name, preset, crf), {"seconds": 0.0, "bytes": 0, "ssim": 0.0})
+            acc["seconds"] += duration
+            acc["bytes"] += size
+            acc["ssim"] += ssim * duration
+    print()
+
+    start, duration = windows[len(windows) // 2]
+    crf = sorted(crfs)[len(crfs) // 2]
+    speed_jobs = [(name, vf, preset) for name, vf in filters.items() for preset in presets]
+    print(f"⏱️  Velocidad: {len(speed_jobs)} encodes de a uno...")
+    speeds = {}
+    for i, (name, vf, preset) in enumerate(speed_jobs):
+        speed = benchmark_speed(video_path, start, duration, vf, preset, crf)
+        progress(i, len(speed_jobs))
+        if speed:
+            speeds[(name, preset)] = speed
+    print()
+
+    rows = []
+    for (name, preset, crf), acc in quality.items():
+        if (name, preset) not in speeds:
+            continue
+        rows.append({
+            "filter": name,
+            "preset": preset,
+            "crf": crf,
+            "speed": speeds[(name, preset)],  # segundos de video por segundo de pared
+            "bitrate": acc["bytes"] * 8 / acc["seconds"],
+            "ssim": acc["ssim"] / acc["seconds"],
+        })
+    return rows
+
+
+def step_durations(video_dir, steps, source_duration):
+    """Duración que encodea cada paso: después del jump cut, la de la cut list (si existe)."""
+    cutlist_path = os.path.join(video_dir, "fuente", "video", "4_video_jumpcut.cutlist.json")
+    cut_duration = None
+    if os.path.isfile(cutlist_path):
+        with open(cutlist_path) as f:
+            cut_duration = json.load(f).get("output_duration")
+    durations = {}
+    for step, *_ in STEPS:
+        if step in steps:
+            durations[step] = cut_duration if step > CUT_STEP and cut_duration else source_duration
+    return durations, cut_duration is not None
+
+
+def split_budget(budget, durations):
+    """Presupuesto de cada paso, proporcional a los segundos de video que encodea."""
+    total = sum(durations.values())
+    return {step: budget * seconds / total if total else 0.0 for step, seconds in durations.items()}
+
+
+def pick_setting(rows, total_seconds, budget=None, max_bitrate=None, min_ssim=None):
+    """Elegir preset/CRF de un paso según el objetivo.
+
+    `rows` son las mediciones con el filtro del paso, `total_seconds` lo que
+    dura el video que encodea y `budget` su parte del presupuesto.
+
+    - Con objetivo de calidad (--min-ssim / --max-bitrate): el archivo más chico que lo cumple.
+    - Solo con presupuesto: la mejor calidad (SSIM) que entra en el tiempo.
+    Retorna (row, cumple_todo).
+    """
+    def fits_time(r):
+        return budget is None or total_seconds / r["speed"] <= budget
+
+    def fits_quality(r):
+        return (max_bitrate is None or r["bitrate"] <= max_bitrate) and (min_ssim is None or r["ssim"] >= min_ssim)
+
+    feasible = [r for r in rows if fits_time(r) and fits_quality(r)]
+    if feasible:
+        if max_bitrate is not None or min_ssim is not None:
+            return min(feasible, key=lambda r: (r["bitrate"], -r["speed"])), True
+        return max(feasible, key=lambda r: (r["ssim"], -r["bitrate"])), True
+
+    # Nada cumple todo: el tiempo manda (si hay presupuesto), después la calidad
+    in_time = [r for r in rows if fits_time(r)]
+    if in_time:
+        return max(in_time, key=lambda r: (r["ssim"], -r["bitrate"])), False
+    return max(rows, key=lambda r: r["speed"]), False
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autotuner de encoding (CRF/preset x264 por paso)")
+    parser.add_argument("video_dir", help="Carpeta del video")
+    parser.add_argument("--video", default="1_video_sincronizado.mp4", help="Video a medir (default: 1_video_sincronizado.mp4)")
+    parser.add_argument("--budget", type=parse_budget, default=None, help="Tiempo total para los encodes (ej: 30m, 1h30m)")
+    parser.add_argument("--max-bitrate", type=parse_bitrate, default=None, help="Bitrate máximo (ej: 8M)")
+    parser.add_argument("--min-ssim", type=float, default=None, help="SSIM mínimo contra el original (ej: 0.98)")
+    parser.add_argument("--steps", default=",".join(str(s[0]) for s in STEPS), help="Pasos a configurar (default: 2,3,4,6,7,8,9)")
+    parser.add_argument("--presets", default="ultrafast,veryfast,faster,fast,medium,slow", help="Presets a probar")
+    parser.add_argument("--crfs", default="16,18,20,23", help="CRFs a probar")
+    parser.add_argument("--samples", type=int, default=3, help="Ventanas de prueba (default: 3)")
+    parser.add_argument("--sample-duration", type=float, default=8.0, help="Segundos por ventana (default: 8)")
+    parser.add_argument("--workers", type=int, default=None, help="Encodes de prueba de calidad en paralelo (default: CPUs/4)")
+    parser.add_argument("--margin", type=float, default=0.9, help="Fracción del presupuesto a usar; el resto cubre decodificación y overlays (default: 0.9)")
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar qué se va a medir")
+
+    args = parser.parse_args()
+
+    video_dir = os.path.expanduser(args.video_dir)
+    video_path = os.path.join(video_dir, "fuente", "video", args.video)
+    tmp_dir = os.path.join(video_dir, "tmp")
+    settings_path = os.path.join(tmp_dir, "encode-settings.json")
+
+    if not os.path.isfile(video_path):
+        print(f"❌ Video no encontrado: {video_path}")
+        sys.exit(1)
+    if args.budget is None and args.max_bitrate is None and args.min_ssim is None:
+        print("⚠️  Sin objetivo (--budget / --max-bitrate / --min-ssim): solo se muestra la tabla")
+
+    steps = [int(s) for s in args.steps.split(",") if s.strip()]
+    presets = [p.strip() for p in args.presets.split(",") if p.strip()]
+    crfs = [int(c) for c in args.crfs.split(",") if c.strip()]
+    workers = args.workers or max(1, (os.cpu_count() or 4) // 4)
+
+    duration = get_duration(video_path)
+    windows = sample_windows(duration, args.samples, args.sample_duration)
+    durations, from_cutlist = step_durations(video_dir, steps, duration)
+    total_seconds = sum(durations.values())
+    step_filters = {step: STEP_FILTERS.get(step, PLAIN) for step in durations}
+    filters = dict(step_filters.values())
+
+    print(f"📹 Video: {video_path} ({format_time(duration)})")
+    print("🎯 Objetivo: " + " | ".join(filter(None, [
+        f"terminar en {format_time(args.budget)} (usando {args.margin:.0%})" if args.budget else None,
+        f"bitrate ≤ {format_bitrate(args.max_bitrate)}" if args.max_bitrate else None,
+        f"SSIM ≥ {args.min_ssim}" if args.min_ssim else None,
+    ]) or "—"))
+    print(f"🔁 Pasos {', '.join(map(str, durations))}: {format_time(total_seconds)} de video a encodear"
+          + ("" if from_cutlist else " (sin cut list: se asume que el jump cut no acorta)"))
+    print(f"🧪 {len(filters)} filtros ({', '.join(filters)}) × {len(presets)} presets × {len(crfs)} CRFs × "
+          f"{len(windows)} ventanas de {windows[0][1]:.1f}s: " + ", ".join(format_time(round(s, 2)) for s, _ in windows))
+
+    if args.dry_run:
+        print("\n🏁 Dry run — no se encodeó nada.")
+        return
+
+    rows = run_benchmarks(video_path, windows, filters, presets, crfs, os.path.join(tmp_dir, "encode_tune"), workers)
+    if not rows:
+        print("❌ Ningún encode de prueba funcionó")
+        sys.exit(1)
+
+    budgets = split_budget(args.budget * args.margin, durations) if args.budget else {}
+    for name in filters:
+        group = [r for r in rows if r["filter"] == name]
+        group_seconds = sum(durations[step] for step, (f, _) in step_filters.items() if f == name)
+        print(f"\n[{name}] {format_time(round(group_seconds))} de video")
+        print(f"{'preset':<10} {'crf':>4} {'velocidad':>10} {'bitrate':>12} {'SSIM':>7} {'tiempo est.':>12}")
+        for r in sorted(group, key=lambda r: (-r["speed"], r["crf"])):
+            print(f"{r['preset']:<10} {r['crf']:>4} {r['speed']:>9.1f}x "
+                  f"{format_bitrate(r['bitrate']):>12} {r['ssim']:>7.4f} {format_time(round(group_seconds / r['speed'])):>12}")
+
+    if args.budget is None and args.max_bitrate is None and args.min_ssim is None:
+        return
+
+    print()
+    step_settings = {}
+    meets_target = True
+    for step, script, target in STEPS:
+        if step not in durations:
+            continue
+        name = step_filters[step][0]
+        group = [r for r in rows if r["filter"] == name]
+        if not group:
+            print(f"   ⚠️  Paso {step}: ningún encode de prueba con {name} funcionó, queda con sus defaults")
+            meets_target = False
+            continue
+        choice, ok = pick_setting(group, durations[step], budgets.get(step), args.max_bitrate, args.min_ssim)
+        meets_target = meets_target and ok
+        estimate = durations[step] / choice["speed"]
+        step_settings[str(step)] = {
+            "script": script,
+            "crf": choice["crf"],
+            "preset": choice["preset"],
+            "duration": round(durations[step], 2),
+            "budget_seconds": round(budgets[step], 1) if step in budgets else None,
+            "estimated_seconds": round(estimate, 1),
+        }
+        budget_note = f" de {format_time(round(budgets[step]))}" if step in budgets else ""
+        print(f"{'✅' if ok else '⚠️ '} Paso {step} [{name}]: preset {choice['preset']} | CRF {choice['crf']} | "
+              f"{format_bitrate(choice['bitrate'])} | SSIM {choice['ssim']:.4f} | "
+              f"~{format_time(round(estimate))}{budget_note}")
+        print(f"   python3 scripts/{script} {target} --crf {choice['crf']} --preset {choice['preset']}")
+
+    if not meets_target:
+        print("\n⚠️  Algún paso no cumple todo el objetivo — en esos pasos se prioriza el tiempo")
+
+    os.makedirs(tmp_dir, exist_ok=True)
+    with open(settings_path, "w") as f:
+        json.dump({
+            "video": args.video,
+            "target": {"budget": args.budget, "max_bitrate": args.max_bitrate, "min_ssim": args.min_ssim},
+            "meets_target": meets_target,
+            "steps": step_settings,
+            "benchmarks": rows,
+        }, f, indent=2)
+    print(f"\n💾 {settings_path}")
+
+
+if __name__ == "__main__":
+    main()
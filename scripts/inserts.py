@@ -11,17 +11,25 @@ Requiere ffmpeg.
 Uso:
   python3 inserts.py <carpeta-del-video>
   python3 inserts.py <carpeta-del-video> --dry-run
+  python3 inserts.py <carpeta-del-video> --smart
 
 Documentación completa: ../9_inserts.md
 """
 
 import argparse
+import bisect
+import hashlib
 import json
 import os
 import re
 import subprocess
 import sys
-from difflib import SequenceMatcher
+
+from render_ranges import encode_args, get_duration, get_keyframes, get_stream_params, piece_seek, plan_smart_pieces
+from transcript_index import WordIndex, load_transcript, normalize_token
+
+
+CACHE_DIR = os.path.expanduser("~/Documents/Edicion/Serudda/recursos/cache/inserts")
 
 
 def parse_timestamp(ts):
@@ -50,35 +58,23 @@ def format_time_ffmpeg(seconds):
     return f"{h:02d}:{m:02d}:{s:06.3f}"
 
 
-def find_word_end_timestamp(target_word, words, segment_start=None, segment_end=None):
+def find_word_end_timestamp(target_word, index, segment_start=None, segment_end=None):
     """Busca una palabra en la transcripción word-level y retorna word.end.
     
     Si se proporcionan segment_start/segment_end, limita la búsqueda a ese rango.
-    Usa fuzzy matching para tolerar diferencias menores.
+    Usa fuzzy matching para tolerar diferencias menores. `index` es un WordIndex.
     """
-    target_clean = target_word.lower().strip(' .,!?¿¡"\'')
+    target_clean = normalize_token(target_word)
     
-    best_score = 0
-    best_end = None
-    
-    for w in words:
-        # Filtrar por rango del segmento si se proporcionó
-        if segment_start is not None and w['start'] < segment_start - 1.0:
-            continue
-        if segment_end is not None and w['end'] > segment_end + 1.0:
-            continue
-        
-        word_clean = w['word'].lower().strip(' .,!?¿¡"\'')
-        score = SequenceMatcher(None, target_clean, word_clean).ratio()
-        
-        if score > best_score:
-            best_score = score
-            best_end = w['end']
+    lo, hi = index.range(segment_start, segment_end)
+    if lo >= hi:
+        return None
     
+    best_score, pos = index.best_word(target_clean, lo, hi)
     if best_score < 0.6:
         return None
     
-    return best_end
+    return index.words.end(pos)
 
 
 def parse_overlay_inserts_md(filepath):
@@ -183,6 +179,273 @@ def get_video_info(video_path):
     }
 
 
+def snap_cuts_to_keyframes(inserts, keyframes, fps):
+    """Mover cada corte al keyframe más cercano si está a menos de un frame.
+
+    Con keyframes forzados en el paso anterior (text-overlay.py --keyframes-at-inserts)
+    todos los cortes caen justo en un keyframe y el video base se copia entero.
+    """
+    snapped = 0
+    for ins in inserts:
+        i = bisect.bisect_left(keyframes, ins['cut_at'])
+        near = [keyframes[k] for k in (i - 1, i) if 0 <= k < len(keyframes)]
+        if not near:
+            continue
+        nearest = min(near, key=lambda k: abs(k - ins['cut_at']))
+        if abs(nearest - ins['cut_at']) < 1.0 / fps:
+            ins['cut_at'] = nearest
+            snapped += 1
+    return snapped
+
+
+def clip_has_audio(clip_path):
+    probe_audio = subprocess.run(
+        ["ffprobe", "-v", "quiet", "-select_streams", "a",
+         "-show_entries", "stream=codec_type", "-of", "csv=p=0",
+         clip_path],
+        capture_output=True, text=True
+    )
+    return bool(probe_audio.stdout.strip())
+
+
+def normalize_clip_cmd(clip_path, dest_path, base_info, codec_args):
+    """Comando para llevar un clip a la resolución/fps/audio del video base."""
+    cmd = ["ffmpeg", "-y", "-i", clip_path]
+
+    # Si no tiene audio, generar silencio
+    if not clip_has_audio(clip_path):
+        cmd += ["-f", "lavfi", "-i", f"anullsrc=r={base_info['sample_rate']}:cl={'stereo' if base_info['channels'] == 2 else 'mono'}"]
+        cmd += ["-shortest"]
+
+    cmd += [
+        "-vf", f"scale={base_info['width']}:{base_info['height']}:force_original_aspect_ratio=decrease,pad={base_info['width']}:{base_info['height']}:(ow-iw)/2:(oh-ih)/2",
+        *codec_args,
+        dest_path
+    ]
+    return cmd
+
+
+def write_insert_points(points_path, video_name, inserts):
+    """Guardar los cortes planeados para que text-overlay.py pueda forzar keyframes ahí."""
+    with open(points_path, "w") as f:
+        json.dump({
+            "video": video_name,
+            "points": [round(ins['cut_at'], 3) for ins in inserts],
+        }, f, indent=2)
+
+
+def file_hash(path):
+    """sha256 del archivo (por bloques, sirve para videos grandes)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def cached_clip_path(cache_dir, clip_path, base_info, codec_args, ext):
+    """Ruta del clip normalizado en el cache compartido.
+
+    Clave = hash del clip + formato destino (resolución, fps, audio) + args de
+    encoding, así un mismo clip sirve para cualquier video con el mismo formato.
+    """
+    target = json.dumps([
+        base_info['width'], base_info['height'], round(base_info['fps'], 3),
+        base_info['sample_rate'], base_info['channels'], codec_args, ext,
+    ])
+    stem = os.path.splitext(os.path.basename(clip_path))[0]
+    digest = hashlib.sha256(target.encode()).hexdigest()[:12]
+    return os.path.join(cache_dir, f"{stem}-{file_hash(clip_path)}-{digest}{ext}")
+
+
+def plan_clip(ins, dest_path, base_info, codec_args, desc, cache_dir=None, planned=None):
+    """Ruta final del clip normalizado + su job (None si ya está en cache).
+
+    Con cache, el job escribe a `.partial` y promote_partials lo mueve al
+    terminar: un render cortado nunca deja un clip a medias en el cache.
+    """
+    if not cache_dir:
+        return dest_path, (normalize_clip_cmd(ins['clip_path'], dest_path, base_info, codec_args), dest_path, desc)
+
+    cached = cached_clip_path(cache_dir, ins['clip_path'], base_info, codec_args, os.path.splitext(dest_path)[1])
+    if os.path.exists(cached):
+        os.utime(cached)  # LRU: un hit cuenta como uso reciente
+        return cached, None
+    if planned is not None:
+        if cached in planned:
+            return cached, None  # mismo clip dos veces en el video: se normaliza una
+        planned.add(cached)
+    root, ext = os.path.splitext(cached)
+    partial = f"{root}.partial{ext}"
+    return cached, (normalize_clip_cmd(ins['clip_path'], partial, base_info, codec_args), partial, desc)
+
+
+def promote_partials(jobs):
+    """Mover al cache los clips que terminaron de normalizarse."""
+    for _, path, _ in jobs:
+        root, ext = os.path.splitext(path)
+        if root.endswith(".partial"):
+            os.replace(path, root[:-len(".partial")] + ext)
+
+
+def prune_cache(cache_dir, max_bytes, keep=()):
+    """Borrar los clips menos usados (mtime más viejo) hasta quedar bajo `max_bytes`."""
+    entries = []
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if os.path.isfile(path) and ".partial." not in name:
+            st = os.stat(path)
+            entries.append((st.st_mtime, st.st_size, path))
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path in keep:
+            continue
+        os.remove(path)
+        total -= size
+        removed += 1
+    print(f"🗂️  Cache de inserts: {total / (1024 ** 3):.1f} GB" + (f" ({removed} clips viejos borrados)" if removed else ""))
+
+
+def run_jobs(jobs, workers=None):
+    """Correr los comandos ffmpeg de `jobs` [(cmd, path, descripción)] en paralelo.
+
+    Los jobs son independientes hasta el concat: el pool (acotado a `workers`)
+    solo lanza procesos y espera. Cada ffmpeg recibe `-threads` para que la
+    suma no sature la CPU. El orden del concat lo define `jobs`, no el orden
+    en que terminan.
+
+    Si un job falla se cancelan los pendientes, se matan los ffmpeg que están
+    corriendo y se borran sus salidas a medias (piezas y `.partial`); los clips
+    que sí terminaron pasan al cache.
+    """
+    import threading
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    cpus = os.cpu_count() or 4
+    workers = max(1, min(workers or cpus, len(jobs)))
+    threads = max(1, cpus // workers)
+    print(f"⚙️  {len(jobs)} jobs | {workers} workers × {threads} threads")
+
+    running = set()
+    lock = threading.Lock()
+    stopping = threading.Event()
+
+    def run(cmd):
+        # -threads es opción de salida: va justo antes del path de salida
+        cmd = [*cmd[:-1], "-threads", str(threads), cmd[-1]]
+        with lock:
+            if stopping.is_set():
+                return None
+            proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+            running.add(proc)
+        try:
+            _, stderr = proc.communicate()
+        finally:
+            with lock:
+                running.discard(proc)
+        return proc.returncode, stderr
+
+    total = len(jobs)
+    finished = []
+    failed = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run, cmd): (cmd, path, desc) for cmd, path, desc in jobs}
+        for future in as_completed(futures):
+            returncode, stderr = future.result()
+            if returncode != 0:
+                failed = (futures[future][2], stderr)
+                stopping.set()
+                for pending in futures:
+                    pending.cancel()
+                with lock:
+                    for proc in running:
+                        proc.kill()
+                break
+            finished.append(futures[future])
+            pct = len(finished) / total * 100
+            bar = "█" * int(pct / 2) + "░" * (50 - int(pct / 2))
+            print(f"\r  [{bar}] {pct:.0f}% ({len(finished)}/{total})", end="", flush=True)
+    print()
+
+    if failed:
+        promote_partials(finished)
+        for job in jobs:
+            if job not in finished and os.path.exists(job[1]):
+                os.remove(job[1])
+        desc, stderr = failed
+        print(f"\n❌ Error en {desc}:\n{stderr[-500:]}")
+        sys.exit(1)
+
+
+def concat_pieces(paths, concat_file, output_path):
+    """Concatenar las piezas en orden de timeline con el concat demuxer (-c copy)."""
+    with open(concat_file, "w") as f:
+        for path in paths:
+            f.write(f"file '{path}'\n")
+
+    print(f"\n🔗 Concatenando {len(paths)} piezas...")
+    result = subprocess.run(
+        ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_file, "-c", "copy", output_path],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        print(f"❌ Error concatenando:\n{result.stderr[-500:]}")
+        sys.exit(1)
+
+
+def render_smart(video_path, inserts, base_info, params, tmp_dir, output_path, crf, preset, workers=None, cache_dir=None):
+    """Render con stream copy: el video base se copia de keyframe a keyframe.
+
+    Solo se re-encodea el GOP parcial alrededor de cada corte (y los clips).
+    Todas las piezas van como .ts con los parámetros del original y se concatenan con -c copy.
+    """
+    keyframes = get_keyframes(video_path)
+    duration = get_duration(video_path)
+    snapped = snap_cuts_to_keyframes(inserts, keyframes, base_info['fps'])
+
+    codec = encode_args(crf, preset, params)
+    jobs = []  # (cmd, path, descripción)
+    paths = []  # piezas en orden de timeline
+    planned = set()
+    copied = encoded = 0.0
+    prev_cut = 0.0
+    for ins in inserts + [None]:
+        cut_at = ins['cut_at'] if ins else duration
+        if cut_at > prev_cut:
+            for start, end, mode in plan_smart_pieces(prev_cut, cut_at, keyframes):
+                piece = os.path.join(tmp_dir, f"piece_{len(paths):04d}.ts")
+                if mode == "copy":
+                    codec_args = ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+                    copied += end - start
+                else:
+                    codec_args = codec
+                    encoded += end - start
+                ss, t = piece_seek(start, end, copy=mode == "copy")
+                cmd = ["ffmpeg", "-y", "-ss", ss, "-i", video_path, "-t", t,
+                       "-map", "0:v:0", "-map", "0:a:0", *codec_args, "-f", "mpegts", piece]
+                jobs.append((cmd, piece, f"{mode} {format_time(start)} → {format_time(end)}"))
+                paths.append(piece)
+        if ins:
+            piece, job = plan_clip(ins, os.path.join(tmp_dir, f"piece_{len(paths):04d}.ts"), base_info,
+                                   [*codec, "-f", "mpegts"], f"clip {ins['clip_file']} ({ins['clip_duration']:.1f}s)",
+                                   cache_dir, planned)
+            if job:
+                jobs.append(job)
+            paths.append(piece)
+            prev_cut = cut_at
+
+    print(f"🔑 {len(keyframes)} keyframes | {snapped}/{len(inserts)} cortes en keyframe | "
+          f"copy: {format_time(copied)} | re-encode base: {format_time(encoded)}")
+
+    run_jobs(jobs, workers)
+    promote_partials(jobs)
+    concat_pieces(paths, os.path.join(tmp_dir, "concat_list.txt"), output_path)
+    return paths
+
+
 def main():
     parser = argparse.ArgumentParser(description="Paso 9 — Inserts")
     parser.add_argument("video_dir", help="Carpeta del video")
@@ -190,6 +453,11 @@ def main():
     parser.add_argument("--output", default="9_video_inserts.mp4", help="Video de salida")
     parser.add_argument("--crf", type=int, default=18, help="Calidad CRF (default: 18)")
     parser.add_argument("--preset", default="fast", help="Preset de encoding (default: fast)")
+    parser.add_argument("--workers", type=int, default=None, help="Jobs de ffmpeg en paralelo (default: CPUs)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Cache compartido de clips normalizados (default: recursos/cache/inserts)")
+    parser.add_argument("--cache-max-gb", type=float, default=20.0, help="Tamaño máximo del cache; se borran los clips menos usados (default: 20)")
+    parser.add_argument("--no-cache", action="store_true", help="Normalizar los clips en tmp/ sin usar el cache")
+    parser.add_argument("--smart", action="store_true", help="Copiar el video base de keyframe a keyframe y re-encodear solo el GOP de cada corte")
     parser.add_argument("--dry-run", action="store_true", help="Solo mostrar detecciones")
     
     args = parser.parse_args()
@@ -260,10 +528,9 @@ def main():
         print(f"❌ transcription_original.json no encontrado: {transcription_json}")
         sys.exit(1)
     
-    # Cargar transcripción word-level
-    with open(transcription_json) as f:
-        transcription = json.load(f)
-    words = transcription.get('words', [])
+    # Cargar transcripción word-level (índice columnar si está disponible)
+    words = load_transcript(transcription_json)
+    index = WordIndex(words)
     
     # Parsear marcas
     inserts = parse_overlay_inserts_md(overlay_md)
@@ -281,7 +548,7 @@ def main():
     # Resolver timestamps con word-level
     for ins in inserts:
         word_end = find_word_end_timestamp(
-            ins['target_word'], words,
+            ins['target_word'], index,
             segment_start=ins['segment_start'],
             segment_end=ins['segment_end']
         )
@@ -314,6 +581,9 @@ def main():
     # Ordenar por timestamp de corte
     inserts.sort(key=lambda x: x['cut_at'])
     
+    # Cortes planeados → text-overlay.py --keyframes-at-inserts puede forzar keyframes ahí
+    write_insert_points(os.path.join(video_dir, "tmp", "insert_points.json"), args.video, inserts)
+    
     # Mostrar resumen
     total_clip_duration = 0
     all_valid = True
@@ -344,8 +614,36 @@ def main():
     for f in os.listdir(tmp_dir):
         os.remove(os.path.join(tmp_dir, f))
     
-    # 1. Cortar video base en segmentos
-    segments = []
+    # Cache compartido de clips normalizados (recursos/cache/inserts)
+    cache_dir = None if args.no_cache else os.path.expanduser(args.cache_dir)
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+    
+    if args.smart:
+        params = get_stream_params(video_path)
+        if params.get("vcodec") != "h264" or params.get("acodec") != "aac":
+            print(f"⚠️  --smart requiere H.264 + AAC (es {params.get('vcodec')} + {params.get('acodec')}). Re-encodeando todo.")
+            args.smart = False
+    
+    if args.smart:
+        paths = render_smart(video_path, inserts, base_info, params, tmp_dir, output_path,
+                             args.crf, args.preset, args.workers, cache_dir)
+        if cache_dir:
+            prune_cache(cache_dir, args.cache_max_gb * 1024 ** 3, keep=set(paths))
+        size_mb = os.path.getsize(output_path) / (1024 * 1024)
+        print(f"\n✅ Listo: {output_path} ({size_mb:.0f} MB)")
+        return
+    
+    # 1. Planear segmentos del video base + clips normalizados (en orden de timeline)
+    codec = [
+        "-c:v", "libx264", "-crf", str(args.crf), "-preset", args.preset,
+        "-c:a", "aac", "-ar", str(base_info['sample_rate']),
+        "-ac", str(base_info['channels']),
+        "-video_track_timescale", "15360",
+    ]
+    jobs = []  # (cmd, path, descripción)
+    paths = []  # piezas en orden de timeline
+    planned = set()
     prev_cut = 0.0
     
     for idx, ins in enumerate(inserts):
@@ -358,52 +656,21 @@ def main():
             cmd = [
                 "ffmpeg", "-y", "-ss", format_time_ffmpeg(prev_cut),
                 "-i", video_path, "-t", str(duration),
-                "-c:v", "libx264", "-crf", str(args.crf), "-preset", args.preset,
-                "-c:a", "aac", "-ar", str(base_info['sample_rate']),
-                "-ac", str(base_info['channels']),
-                "-video_track_timescale", "15360",
+                *codec,
                 seg_file
             ]
-            print(f"✂️  Cortando segmento {idx}: {format_time(prev_cut)} → {format_time(cut_at)} ({duration:.1f}s)")
-            result = subprocess.run(cmd)
-            if result.returncode != 0:
-                print(f"❌ Error cortando segmento {idx}")
-                sys.exit(1)
-            segments.append(seg_file)
+            print(f"✂️  Segmento {idx}: {format_time(prev_cut)} → {format_time(cut_at)} ({duration:.1f}s)")
+            jobs.append((cmd, seg_file, f"segmento {idx}"))
+            paths.append(seg_file)
         
         # Normalizar clip
-        # Detectar si el clip tiene audio
-        probe_audio = subprocess.run(
-            ["ffprobe", "-v", "quiet", "-select_streams", "a",
-             "-show_entries", "stream=codec_type", "-of", "csv=p=0",
-             ins['clip_path']],
-            capture_output=True, text=True
-        )
-        has_audio = bool(probe_audio.stdout.strip())
-        
-        clip_norm = os.path.join(tmp_dir, f"insert_{idx:03d}.mp4")
-        cmd = ["ffmpeg", "-y", "-i", ins['clip_path']]
-        
-        # Si no tiene audio, generar silencio
-        if not has_audio:
-            cmd += ["-f", "lavfi", "-i", f"anullsrc=r={base_info['sample_rate']}:cl={'stereo' if base_info['channels'] == 2 else 'mono'}"]
-            cmd += ["-shortest"]
-        
-        cmd += [
-            "-vf", f"scale={base_info['width']}:{base_info['height']}:force_original_aspect_ratio=decrease,pad={base_info['width']}:{base_info['height']}:(ow-iw)/2:(oh-ih)/2",
-            "-r", str(base_info['fps']),
-            "-c:v", "libx264", "-crf", str(args.crf), "-preset", args.preset,
-            "-c:a", "aac", "-ar", str(base_info['sample_rate']),
-            "-ac", str(base_info['channels']),
-            "-video_track_timescale", "15360",
-            clip_norm
-        ]
-        print(f"🎬 Normalizando clip: {ins['clip_file']} ({ins['clip_duration']:.1f}s)")
-        result = subprocess.run(cmd)
-        if result.returncode != 0:
-            print(f"❌ Error normalizando clip {ins['clip_file']}")
-            sys.exit(1)
-        segments.append(clip_norm)
+        clip_norm, job = plan_clip(ins, os.path.join(tmp_dir, f"insert_{idx:03d}.mp4"), base_info,
+                                   ["-r", str(base_info['fps']), *codec], f"clip {ins['clip_file']}",
+                                   cache_dir, planned)
+        print(f"🎬 Clip: {ins['clip_file']} ({ins['clip_duration']:.1f}s)" + ("" if job else " ♻️  cache"))
+        if job:
+            jobs.append(job)
+        paths.append(clip_norm)
         
         prev_cut = cut_at
     
@@ -412,41 +679,22 @@ def main():
     cmd = [
         "ffmpeg", "-y", "-ss", format_time_ffmpeg(prev_cut),
         "-i", video_path,
-        "-c:v", "libx264", "-crf", str(args.crf), "-preset", args.preset,
-        "-c:a", "aac", "-ar", str(base_info['sample_rate']),
-        "-ac", str(base_info['channels']),
-        "-video_track_timescale", "15360",
+        *codec,
         last_seg
     ]
-    print(f"✂️  Cortando segmento final: {format_time(prev_cut)} → final")
-    result = subprocess.run(cmd)
-    if result.returncode != 0:
-        print(f"❌ Error cortando segmento final")
-        sys.exit(1)
-    segments.append(last_seg)
-    
-    # 2. Generar concat list
-    concat_file = os.path.join(tmp_dir, "concat_list.txt")
-    with open(concat_file, 'w') as f:
-        for seg in segments:
-            f.write(f"file '{seg}'\n")
-    
-    print(f"\n📋 Concat list ({len(segments)} segmentos):")
-    for seg in segments:
-        print(f"   {os.path.basename(seg)}")
-    
-    # 3. Concatenar
-    print(f"\n🔗 Concatenando...")
-    cmd = [
-        "ffmpeg", "-y", "-f", "concat", "-safe", "0",
-        "-i", concat_file,
-        "-c", "copy",
-        output_path
-    ]
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        print(f"❌ Error concatenando:\n{result.stderr[-500:]}")
-        sys.exit(1)
+    print(f"✂️  Segmento final: {format_time(prev_cut)} → final")
+    jobs.append((cmd, last_seg, "segmento final"))
+    paths.append(last_seg)
+    
+    # 2. Cortar y normalizar en paralelo (todo es independiente hasta el concat)
+    print()
+    run_jobs(jobs, args.workers)
+    promote_partials(jobs)
+    
+    # 3. Concatenar en orden de timeline
+    concat_pieces(paths, os.path.join(tmp_dir, "concat_list.txt"), output_path)
+    if cache_dir:
+        prune_cache(cache_dir, args.cache_max_gb * 1024 ** 3, keep=set(paths))
     
     size_mb = os.path.getsize(output_path) / (1024 * 1024)
     print(f"\n✅ Listo: {output_path} ({size_mb:.0f} MB)")
@@ -9,6 +9,9 @@ Uso:
   python3 jump-cut.py video.mp4
   python3 jump-cut.py video.mp4 --padding 0.5 --min-silence 2.0
   python3 jump-cut.py video.mp4 --noise -25 --min-detect 0.5 --dry-run
+  python3 jump-cut.py video.mp4 --sweep --target 17:00
+  python3 jump-cut.py video.mp4 --padding 0.5 --smart
+  python3 jump-cut.py video.mp4 --from-transcript transcription_precut.json --lead-padding 0.1
 
 Flags:
   --padding       Segundos de "aire" antes/después de cada corte (default: 0.3)
@@ -19,26 +22,27 @@ Flags:
   --preset        Preset de encoding ffmpeg (default: fast)
   --output        Nombre del archivo de salida (default: 4_video_jumpcut.mp4)
   --dry-run       Solo muestra estadísticas, no genera video
+  --from-transcript  Cortes desde los huecos entre palabras de un transcription JSON
+  --lead-padding  Aire antes de la primera palabra de cada segmento (default: = --padding)
+  --force-transcript  Usar --from-transcript aunque esté anotada con otro corte
+  --smart         Copia el interior de cada segmento y re-encodea solo los bordes
+  --sweep         Analiza el audio una vez y evalúa una grilla de parámetros
+  --target        Duración final deseada (M:SS o segundos) para recomendar config
 
 Documentación completa: ../4_eliminar-silencios.md
 """
 
 import argparse
+import bisect
+import hashlib
+import json
 import os
 import re
 import subprocess
 import sys
 import tempfile
 
-
-def get_duration(video_path):
-    """Obtener duración del video con ffprobe."""
-    result = subprocess.run(
-        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
-         "-of", "csv=p=0", video_path],
-        capture_output=True, text=True
-    )
-    return float(result.stdout.strip())
+from render_ranges import encode_args, get_duration, get_keyframes, get_stream_params, piece_seek, plan_smart_pieces
 
 
 def detect_silences(video_path, noise_db, min_detect):
@@ -70,8 +74,133 @@ def detect_silences(video_path, noise_db, min_detect):
     return silences
 
 
-def calculate_segments(silences, min_silence, padding, video_duration):
-    """Calcular segmentos de voz (inversión de silencios largos)."""
+def analyze_energy(video_path, window=0.01):
+    """Decodificar el audio UNA vez y medir el pico (dB) de cada ventana.
+
+    Devuelve una lista de niveles en dB, uno por ventana de `window` segundos.
+    Con este perfil se simula silencedetect para cualquier combinación de
+    --noise / --min-detect sin volver a decodificar el video.
+    """
+    sample_rate = 16000
+    nsamples = int(round(sample_rate * window))
+    print(f"🔍 Analizando energía del audio (ventana={window * 1000:.0f}ms)...")
+    result = subprocess.run(
+        ["ffmpeg", "-i", video_path, "-vn",
+         "-af", f"aresample={sample_rate},asetnsamples=n={nsamples}:p=0,"
+                f"astats=metadata=1:reset=1,"
+                f"ametadata=print:key=lavfi.astats.Overall.Peak_level",
+         "-f", "null", "-"],
+        capture_output=True, text=True
+    )
+
+    levels = []
+    for line in result.stderr.split("\n"):
+        m = re.search(r'lavfi\.astats\.Overall\.Peak_level=(\S+)', line)
+        if m:
+            try:
+                levels.append(float(m.group(1)))
+            except ValueError:
+                levels.append(float("-inf"))
+
+    return levels
+
+
+def silences_from_profile(levels, window, noise_db, min_detect):
+    """Simular silencedetect sobre el perfil de energía.
+
+    Una ventana es silencio si su pico está por debajo de `noise_db`
+    (igual que silencedetect: todos los samples bajo el threshold).
+    Retorna el mismo formato que detect_silences: [(start, end, dur), ...].
+    """
+    silences = []
+    run_start = None
+
+    for i, level in enumerate(levels):
+        if level < noise_db:
+            if run_start is None:
+                run_start = i
+            continue
+        if run_start is not None:
+            dur = (i - run_start) * window
+            if dur >= min_detect:
+                silences.append((run_start * window, i * window, dur))
+            run_start = None
+
+    if run_start is not None:
+        dur = (len(levels) - run_start) * window
+        if dur >= min_detect:
+            silences.append((run_start * window, len(levels) * window, dur))
+
+    return silences
+
+
+def silences_from_transcript(words, video_duration):
+    """Silencios a partir de los huecos entre palabras de una transcripción word-level.
+
+    Retorna el mismo formato que detect_silences: [(start, end, dur), ...],
+    incluyendo el hueco antes de la primera palabra y después de la última.
+    """
+    silences = []
+    prev_end = 0.0
+    for w in sorted(words, key=lambda w: w['start']):
+        if w['start'] > prev_end:
+            silences.append((prev_end, w['start'], w['start'] - prev_end))
+        prev_end = max(prev_end, w['end'])
+    if video_duration > prev_end:
+        silences.append((prev_end, video_duration, video_duration - prev_end))
+    return silences
+
+
+def transcript_timeline(data, video_path, history_dir):
+    """¿En qué timeline está una transcripción para --from-transcript?
+
+    Una transcripción anotada con `"cutlist"` es de un video ya cortado
+    (ej: transcription_original.json sobre 4_video_jumpcut.mp4). Sirve tal cual
+    si el video de entrada es ese mismo corte; si no, se vuelve al timeline
+    origen con la cut list del historial cuando su `source` es el video de entrada.
+
+    Retorna (cut list para volver al origen | None, motivo de error | None).
+    """
+    tag = data.get("cutlist")
+    if not tag:
+        return None, None
+    own_cutlist = os.path.splitext(video_path)[0] + ".cutlist.json"
+    if os.path.isfile(own_cutlist):
+        with open(own_cutlist) as f:
+            if json.load(f).get("id") == tag:
+                return None, None
+    history_path = os.path.join(history_dir, f"{tag}.json")
+    if os.path.isfile(history_path):
+        with open(history_path) as f:
+            cutlist = json.load(f)
+        if cutlist.get("source") == os.path.basename(video_path):
+            return cutlist, None
+    return None, (f"la transcripción está en el timeline del corte {tag}, no en el de "
+                  f"{os.path.basename(video_path)} — pasá la del video pre-corte (o --force-transcript)")
+
+
+def words_to_source(words, cutlist):
+    """Llevar palabras del timeline de salida de una cut list al del video origen."""
+    segs = sorted(cutlist.get("segments", []), key=lambda e: e["output_start"])
+    if not segs:
+        return words
+    out_starts = [e["output_start"] for e in segs]
+
+    def to_source(t):
+        e = segs[max(0, bisect.bisect_right(out_starts, t) - 1)]
+        return min(e["source_start"] + (t - e["output_start"]), e["source_end"])
+
+    return [{**w, "start": round(to_source(w["start"]), 3), "end": round(to_source(w["end"]), 3)} for w in words]
+
+
+def calculate_segments(silences, min_silence, padding, video_duration, lead_padding=None):
+    """Calcular segmentos de voz (inversión de silencios largos).
+
+    `lead_padding` (opcional) es el aire antes de la primera palabra de cada
+    segmento; por default es igual a `padding`.
+    """
+    if lead_padding is None:
+        lead_padding = padding
     long_silences = [(s, e, d) for s, e, d in silences if d > min_silence]
     
     cuts = []
@@ -80,7 +209,7 @@ def calculate_segments(silences, min_silence, padding, video_duration):
         seg_end = s_start + padding
         if seg_end > prev_end + 0.1:
             cuts.append((prev_end, seg_end))
-        prev_end = s_end - padding
+        prev_end = max(0, s_end - lead_padding)
     
     if prev_end < video_duration:
         cuts.append((prev_end, video_duration))
@@ -88,8 +217,52 @@ def calculate_segments(silences, min_silence, padding, video_duration):
     return cuts, long_silences
 
 
-def extract_and_concat(video_path, segments, output_path, crf, preset):
-    """Extraer segmentos como .ts y concatenar en .mp4."""
+def sweep_parameters(levels, window, video_duration, noises, min_detects, min_silences, paddings):
+    """Evaluar una grilla de parámetros en memoria sobre un solo perfil de energía."""
+    rows = []
+    for noise_db in noises:
+        for min_detect in min_detects:
+            silences = silences_from_profile(levels, window, noise_db, min_detect)
+            for min_silence in min_silences:
+                for padding in paddings:
+                    segments, long_silences = calculate_segments(
+                        silences, min_silence, padding, video_duration
+                    )
+                    lengths = [end - start for start, end in segments]
+                    rows.append({
+                        'noise': noise_db,
+                        'min_detect': min_detect,
+                        'min_silence': min_silence,
+                        'padding': padding,
+                        'cuts': len(long_silences),
+                        'segments': len(segments),
+                        'duration': sum(lengths),
+                        'shortest': min(lengths) if lengths else 0.0,
+                    })
+    return rows
+
+
+def recommend_setting(rows, target):
+    """Elegir la combinación más cercana a la duración objetivo.
+
+    En empate, gana la que deja el segmento más corto más largo
+    (menos cortes nerviosos).
+    """
+    if not rows:
+        return None
+    return min(rows, key=lambda r: (round(abs(r['duration'] - target), 1), -r['shortest']))
+
+
+def extract_and_concat(video_path, segments, output_path, crf, preset, smart=False):
+    """Extraer segmentos como .ts y concatenar en .mp4.
+
+    Con smart=True, el interior de cada segmento (keyframe a keyframe) se copia
+    sin re-encodear y solo se re-encodean los GOPs parciales de cabeza y cola.
+
+    Retorna la duración real de cada segmento en la salida (suma de sus piezas
+    medidas con ffprobe): `-t` se redondea a frames y cada .ts trae su propio
+    priming/padding de AAC, así que no es exactamente end - start.
+    """
     # Use tmp/ inside the video project folder
     video_parent = os.path.dirname(video_path) or "."
     if "fuente" in video_parent:
@@ -98,20 +271,49 @@ def extract_and_concat(video_path, segments, output_path, crf, preset):
         project_dir = video_parent
     tmpdir = os.path.join(project_dir, "tmp", "jc_segments")
     os.makedirs(tmpdir, exist_ok=True)
-    total = len(segments)
+
+    params = None
+    if smart:
+        params = get_stream_params(video_path)
+        if params.get("vcodec") != "h264" or params.get("acodec") != "aac":
+            print(f"⚠️  Smart render requiere H.264 + AAC (es {params.get('vcodec')} + {params.get('acodec')}). Re-encodeando todo.")
+            smart = False
+
+    if smart:
+        print("🔑 Indexando keyframes...")
+        keyframes = get_keyframes(video_path)
+        pieces = []
+        owners = []  # segmento al que pertenece cada pieza
+        for seg_idx, (start, end) in enumerate(segments):
+            seg_pieces = plan_smart_pieces(start, end, keyframes)
+            pieces.extend(seg_pieces)
+            owners.extend([seg_idx] * len(seg_pieces))
+        copied = sum(e - s for s, e, mode in pieces if mode == "copy")
+        encoded = sum(e - s for s, e, mode in pieces if mode == "encode")
+        print(f"   {len(keyframes)} keyframes | copy: {format_time(copied)} | re-encode: {format_time(encoded)}")
+    else:
+        pieces = [(start, end, "encode") for start, end in segments]
+        owners = list(range(len(segments)))
+
+    total = len(pieces)
     
-    print(f"✂️  Extrayendo {total} segmentos...")
-    for i, (start, end) in enumerate(segments):
-        duration = end - start
+    print(f"✂️  Extrayendo {total} piezas de {len(segments)} segmentos...")
+    measured = [0.0] * len(segments)
+    for i, (start, end, mode) in enumerate(pieces):
+        ss, t = piece_seek(start, end, copy=mode == "copy")
         seg_path = os.path.join(tmpdir, f"seg_{i:04d}.ts")
+        if mode == "copy":
+            codec_args = ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+        else:
+            codec_args = encode_args(crf, preset, params)
         subprocess.run(
-            ["ffmpeg", "-ss", f"{start:.3f}", "-i", video_path,
-             "-t", f"{duration:.3f}",
-             "-c:v", "libx264", "-crf", str(crf), "-preset", preset,
-             "-c:a", "aac", "-b:a", "192k",
+            ["ffmpeg", "-ss", ss, "-i", video_path,
+             "-t", t,
+             *codec_args,
              "-f", "mpegts", "-y", seg_path],
             capture_output=True
         )
+        measured[owners[i]] += piece_duration(seg_path, end - start)
         # Progress bar
         pct = (i + 1) / total * 100
         bar = "█" * int(pct / 2) + "░" * (50 - int(pct / 2))
@@ -137,6 +339,58 @@ def extract_and_concat(video_path, segments, output_path, crf, preset):
     for f in os.listdir(tmpdir):
         os.remove(os.path.join(tmpdir, f))
     os.rmdir(tmpdir)
+    return measured
+
+
+def piece_duration(piece_path, nominal):
+    """Duración real de una pieza .ts (la que usa el concat), o la pedida si ffprobe no puede leerla."""
+    try:
+        return get_duration(piece_path)
+    except ValueError:
+        return nominal
+
+
+def build_cutlist(video_path, video_duration, segments, config, durations=None):
+    """Cut list (EDL) con el mapeo origen → salida de cada segmento conservado.
+
+    `durations` son las duraciones medidas de cada segmento en la salida
+    (extract_and_concat); sin ellas se usa end - start (dry run / tests).
+    """
+    entries = []
+    out_t = 0.0
+    for i, (start, end) in enumerate(segments):
+        length = durations[i] if durations is not None else end - start
+        entries.append({
+            "source_start": round(start, 3),
+            "source_end": round(end, 3),
+            "output_start": round(out_t, 3),
+            "output_end": round(out_t + length, 3),
+        })
+        out_t += length
+    # Id por contenido: el mismo corte del mismo video siempre tiene el mismo id
+    cuts = [(e["source_start"], e["source_end"]) for e in entries]
+    key = json.dumps({"source": os.path.basename(video_path), "segments": cuts}, sort_keys=True)
+    return {
+        "id": hashlib.sha256(key.encode()).hexdigest()[:12],
+        "source": os.path.basename(video_path),
+        "source_duration": round(video_duration, 3),
+        "output_duration": round(out_t, 3),
+        "config": config,
+        "segments": entries,
+    }
+
+
+def write_cutlist(cutlist_path, cutlist):
+    """Guardar la cut list y archivarla en `<video>.cutlists/<id>.json`.
+
+    El historial guarda todos los cortes, no solo el anterior: remap-transcript.py
+    encuentra ahí la cut list de cualquier transcripción por el id que lleva.
+    """
+    history_dir = cutlist_path[:-len(".cutlist.json")] + ".cutlists"
+    os.makedirs(history_dir, exist_ok=True)
+    for path in (cutlist_path, os.path.join(history_dir, f"{cutlist['id']}.json")):
+        with open(path, "w") as f:
+            json.dump(cutlist, f, indent=2)
 
 
 def format_time(seconds):
@@ -145,6 +399,61 @@ def format_time(seconds):
     return f"{m}:{s:02d}"
 
 
+def parse_timestamp(ts):
+    """Convertir MM:SS.xx, H:MM:SS.xx o segundos a float."""
+    parts = ts.strip().split(":")
+    if len(parts) == 1:
+        return float(parts[0])
+    if len(parts) == 2:
+        return int(parts[0]) * 60 + float(parts[1])
+    if len(parts) == 3:
+        return int(parts[0]) * 3600 + int(parts[1]) * 60 + float(parts[2])
+    return 0.0
+
+
+def parse_float_list(value):
+    """Parsear '1.0,1.5,2' → [1.0, 1.5, 2.0]."""
+    return [float(v) for v in value.split(",") if v.strip()]
+
+
+def run_sweep(args, duration):
+    """Modo --sweep: un solo análisis de audio, muchas combinaciones."""
+    window = 0.01
+    levels = analyze_energy(args.video, window)
+    if not levels:
+        print("❌ No se pudo medir la energía del audio (¿el video tiene audio?)")
+        sys.exit(1)
+
+    noises = parse_float_list(args.sweep_noise)
+    min_detects = parse_float_list(args.sweep_min_detect)
+    min_silences = parse_float_list(args.sweep_min_silence)
+    paddings = parse_float_list(args.sweep_padding)
+
+    rows = sweep_parameters(levels, window, duration, noises, min_detects, min_silences, paddings)
+    print(f"   {len(levels)} ventanas analizadas → {len(rows)} combinaciones")
+    print()
+
+    target = parse_timestamp(args.target) if args.target else None
+    best = recommend_setting(rows, target) if target is not None else None
+
+    print(f"   {'noise':>6} {'detect':>6} {'min-sil':>7} {'padding':>7} │ {'cortes':>6} {'segs':>5} {'duración':>9} {'seg mín':>7}")
+    print(f"   {'─' * 30}┼{'─' * 40}")
+    for row in rows:
+        mark = "  ⭐" if row is best else ""
+        print(f"   {row['noise']:>6.0f} {row['min_detect']:>6.2f} {row['min_silence']:>7.2f} {row['padding']:>7.2f} │ "
+              f"{row['cuts']:>6} {row['segments']:>5} {format_time(row['duration']):>9} {row['shortest']:>6.2f}s{mark}")
+
+    print()
+    if best:
+        print(f"🎯 Objetivo: {format_time(target)} → mejor: {format_time(best['duration'])}")
+        print(f"   python3 scripts/jump-cut.py {args.video} --noise {best['noise']:.0f} "
+              f"--min-detect {best['min_detect']} --min-silence {best['min_silence']} --padding {best['padding']}")
+    else:
+        print("💡 Usa --target M:SS para que recomiende una configuración.")
+    print()
+    print("🏁 Sweep — no se generó video.")
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Jump Cut Automático — Eliminar silencios de un video."
@@ -166,6 +475,26 @@ def main():
                         help="Archivo de salida (default: 4_video_jumpcut.mp4)")
     parser.add_argument("--dry-run", action="store_true",
                         help="Solo mostrar estadísticas, no generar video")
+    parser.add_argument("--from-transcript", default=None,
+                        help="Calcular cortes desde los huecos entre palabras de una transcripción word-level (sin decodificar audio)")
+    parser.add_argument("--lead-padding", type=float, default=None,
+                        help="Aire antes de la primera palabra de cada segmento (default: = --padding). Bajarlo recorta respiraciones")
+    parser.add_argument("--force-transcript", action="store_true",
+                        help="Usar --from-transcript aunque esté anotada con otro corte (confirmar que es del video de entrada)")
+    parser.add_argument("--smart", action="store_true",
+                        help="Smart render: copiar el interior de cada segmento y re-encodear solo los GOPs de borde")
+    parser.add_argument("--sweep", action="store_true",
+                        help="Analizar el audio una vez y evaluar una grilla de parámetros")
+    parser.add_argument("--sweep-noise", default="-35,-30,-25",
+                        help="Valores de --noise a probar (default: -35,-30,-25)")
+    parser.add_argument("--sweep-min-detect", default="0.5,0.8",
+                        help="Valores de --min-detect a probar (default: 0.5,0.8)")
+    parser.add_argument("--sweep-min-silence", default="1.0,1.5,2.0,3.0",
+                        help="Valores de --min-silence a probar (default: 1.0,1.5,2.0,3.0)")
+    parser.add_argument("--sweep-padding", default="0.15,0.3,0.5",
+                        help="Valores de --padding a probar (default: 0.15,0.3,0.5)")
+    parser.add_argument("--target", default=None,
+                        help="Duración final deseada (M:SS o segundos) para recomendar config en --sweep")
     
     args = parser.parse_args()
     
@@ -193,17 +522,47 @@ def main():
     print(f"⏱️  Duración: {format_time(duration)} ({duration:.1f}s)")
     print()
     
+    if args.sweep:
+        run_sweep(args, duration)
+        return
+    
     # Detect silences
-    silences = detect_silences(args.video, args.noise, args.min_detect)
+    if args.from_transcript:
+        # Huecos entre palabras de Whisper: no hace falta decodificar el audio
+        with open(args.from_transcript) as f:
+            data = json.load(f)
+        words = data.get("words", [])
+        if not words:
+            print(f"❌ La transcripción no tiene words: {args.from_transcript}")
+            sys.exit(1)
+        print(f"📝 Silencios desde transcripción: {args.from_transcript} ({len(words)} palabras)")
+        # Una transcripción de un video ya cortado (ej: transcription_original.json) es más
+        # corta que la entrada: la guarda de duración no la detecta y los cortes saldrían mal
+        if not args.force_transcript:
+            history_dir = os.path.splitext(output_path)[0] + ".cutlists"
+            cutlist, problem = transcript_timeline(data, args.video, history_dir)
+            if problem:
+                print(f"❌ {problem}")
+                sys.exit(1)
+            if cutlist:
+                words = words_to_source(words, cutlist)
+                print(f"   🗺️  Transcripción del corte {data['cutlist']}: llevada al timeline de {os.path.basename(args.video)}")
+        if words[-1]['end'] > duration + 1.0:
+            print(f"⚠️  La transcripción termina en {format_time(words[-1]['end'])} pero el video dura {format_time(duration)}.")
+            print("   ¿Es la transcripción de este video?")
+        silences = silences_from_transcript(words, duration)
+    else:
+        silences = detect_silences(args.video, args.noise, args.min_detect)
     print(f"   Silencios detectados: {len(silences)}")
     
     # Calculate segments
+    lead_padding = args.lead_padding if args.lead_padding is not None else args.padding
     segments, long_silences = calculate_segments(
-        silences, args.min_silence, args.padding, duration
+        silences, args.min_silence, args.padding, duration, lead_padding
     )
     
     # Stats
-    time_cut = sum(d for _, _, d in long_silences) - (args.padding * 2 * len(long_silences))
+    time_cut = sum(d for _, _, d in long_silences) - ((args.padding + lead_padding) * len(long_silences))
     result_duration = duration - time_cut
     
     print()
@@ -214,7 +573,10 @@ def main():
     print(f"   Tiempo recortado: ~{format_time(time_cut)}")
     print(f"   Duración estimada: {format_time(duration)} → {format_time(result_duration)}")
     print()
-    print(f"⚙️  Config: padding={args.padding}s | min-silence={args.min_silence}s | noise={args.noise}dB | crf={args.crf}")
+    source_info = "transcript" if args.from_transcript else f"noise={args.noise}dB"
+    print(f"⚙️  Config: padding={args.padding}s | min-silence={args.min_silence}s | {source_info} | crf={args.crf}"
+          f"{f' | lead-padding={lead_padding}s' if lead_padding != args.padding else ''}"
+          f"{' | smart render' if args.smart else ''}")
     
     if args.dry_run:
         print()
@@ -222,7 +584,19 @@ def main():
         return
     
     print()
-    extract_and_concat(args.video, segments, output_path, args.crf, args.preset)
+    durations = extract_and_concat(args.video, segments, output_path, args.crf, args.preset, smart=args.smart)
+    
+    # Cut list: mapeo origen → salida para remapear transcripciones y overlays
+    cutlist_path = os.path.splitext(output_path)[0] + ".cutlist.json"
+    write_cutlist(cutlist_path, build_cutlist(args.video, duration, segments, {
+        "padding": args.padding,
+        "min_silence": args.min_silence,
+        "lead_padding": lead_padding,
+        "noise": None if args.from_transcript else args.noise,
+        "min_detect": None if args.from_transcript else args.min_detect,
+        "from_transcript": os.path.basename(args.from_transcript) if args.from_transcript else None,
+    }, durations))
+    print(f"🗺️  Cut list: {cutlist_path}")
     
     # Final size
     size_mb = os.path.getsize(output_path) / (1024 * 1024)
@@ -9,16 +9,28 @@ qué logos aplicar y en qué momentos. Los logos se buscan en el repo central:
 Uso:
   python3 logo-overlay.py <carpeta-del-video>
   python3 logo-overlay.py <carpeta-del-video> --dry-run
+  python3 logo-overlay.py <carpeta-del-video> --ranges
+  python3 logo-overlay.py --build-cache --size 250
 
 Documentación completa: ../6_logo-overlay.md
 """
 
 import argparse
+import hashlib
+import importlib.util
 import os
 import re
+import shlex
 import subprocess
 import sys
 
+from render_ranges import get_duration, get_keyframes, get_stream_params, plan_render_ranges, range_commands
+from stream_io import is_stream, output_codec_args
+
+
+LOGO_DIR = os.path.expanduser("~/Documents/Edicion/Serudda/recursos/logos")
+CACHE_DIR = os.path.expanduser("~/Documents/Edicion/Serudda/recursos/cache/logos")
+
 
 def parse_timestamp(ts):
     """Convertir MM:SS.xx o H:MM:SS.xx a segundos (con decimales)."""
@@ -89,6 +101,175 @@ def parse_overlay_md(filepath, logo_duration=3.0):
     return detections
 
 
+def logo_source_path(logo_dir, logo):
+    return os.path.join(logo_dir, logo, f"{logo}.png")
+
+
+def cached_logo_path(cache_dir, source_path, size, aspect):
+    """Ruta del logo pre-escalado: clave = hash del PNG fuente + tamaño + política de aspecto."""
+    with open(source_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    brand = os.path.splitext(os.path.basename(source_path))[0]
+    # "straight": los caches viejos tenían alpha premultiplicado y no se reusan
+    return os.path.join(cache_dir, f"{brand}-{digest}-{size}-{aspect}-straight.png")
+
+
+def has_pillow():
+    """Pillow es opcional: sin él no hay cache de logos pre-escalados."""
+    return importlib.util.find_spec("PIL") is not None
+
+
+def prescale_logo(source_path, dest_path, size, aspect):
+    """Pre-renderizar un logo: recortar bordes transparentes y escalar a `size` (alpha sin premultiplicar).
+
+    aspect='fit' → entra en size×size respetando el aspecto (como force_original_aspect_ratio=decrease)
+    aspect='square' → además se centra en un lienzo transparente de size×size
+    """
+    from PIL import Image
+
+    img = Image.open(source_path).convert("RGBA")
+    bbox = img.getchannel("A").getbbox()
+    if bbox:
+        img = img.crop(bbox)
+
+    scale = min(size / img.width, size / img.height)
+    new_size = (max(1, round(img.width * scale)), max(1, round(img.height * scale)))
+    img = img.resize(new_size, Image.LANCZOS)
+
+    if aspect == "square":
+        canvas = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+        canvas.paste(img, ((size - img.width) // 2, (size - img.height) // 2))
+        img = canvas
+
+    # Alpha directo (straight): con alpha=premultiplied el overlay sobre yuv420p
+    # convierte el negro transparente a Y=16 y deja una caja gris alrededor del logo
+    tmp_path = dest_path + ".tmp.png"
+    img.save(tmp_path, optimize=False)
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+def build_logo_cache(logos, logo_dir, cache_dir, size, aspect, workers=None):
+    """Asegurar que cada logo tenga su versión pre-escalada en el cache (en paralelo).
+
+    Retorna {logo: ruta_cacheada}.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    os.makedirs(cache_dir, exist_ok=True)
+    cached = {}
+    pending = {}
+    for logo in logos:
+        source = logo_source_path(logo_dir, logo)
+        dest = cached_logo_path(cache_dir, source, size, aspect)
+        cached[logo] = dest
+        if not os.path.exists(dest):
+            pending[logo] = (source, dest)
+
+    if pending:
+        print(f"🗂️  Pre-escalando {len(pending)} logos ({len(cached) - len(pending)} ya en cache)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                logo: pool.submit(prescale_logo, source, dest, size, aspect)
+                for logo, (source, dest) in pending.items()
+            }
+            for logo, future in futures.items():
+                future.result()
+    else:
+        print(f"♻️  {len(cached)} logos pre-escalados desde cache")
+    return cached
+
+
+def merge_windows(windows):
+    """Unir ventanas (start, end) que se solapan o se tocan."""
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def group_detections(detections):
+    """Agrupar detecciones por (logo, stack_level) con sus ventanas unidas.
+
+    Retorna lista de (logo, stack_level, windows) en orden de primera aparición,
+    para que el grafo escale con las marcas distintas y no con las menciones.
+    """
+    grouped = {}
+    for start, end, logo, stack_level in detections:
+        grouped.setdefault((logo, stack_level), []).append((start, end))
+    return [(logo, stack, merge_windows(windows)) for (logo, stack), windows in grouped.items()]
+
+
+def enable_expr(windows):
+    """Expresión `enable` de ffmpeg que vale 1 dentro de cualquiera de las ventanas."""
+    return "+".join(f"between(t,{start},{end})" for start, end in windows)
+
+
+def logo_position(args, stack_level):
+    """Posición (x, y) del overlay según --position y el nivel de apilado."""
+    y_offset = (args.size + 10) * stack_level
+    pad_x = args.padding_x if args.padding_x is not None else args.padding
+    pad_y = args.padding_y if args.padding_y is not None else args.padding
+
+    if args.position == "top-left":
+        pos_x = str(pad_x)
+        pos_y = str(pad_y + y_offset) if stack_level == 0 else f"{pad_y}+{y_offset}"
+    elif args.position == "top-right":
+        pos_x = f"W-{args.size}-{pad_x}"
+        pos_y = str(pad_y + y_offset) if stack_level == 0 else f"{pad_y}+{y_offset}"
+    elif args.position == "bottom-left":
+        pos_x = str(pad_x)
+        pos_y = f"H-{args.size}-{pad_y}" if stack_level == 0 else f"H-{args.size}-{pad_y}-{y_offset}"
+    else:  # bottom-right
+        pos_x = f"W-{args.size}-{pad_x}"
+        pos_y = f"H-{args.size}-{pad_y}" if stack_level == 0 else f"H-{args.size}-{pad_y}-{y_offset}"
+    return pos_x, pos_y
+
+
+def build_filter_graph(groups, logo_index, args, base="0:v", prescaled=False):
+    """Armar el filter_complex: cada logo se escala una sola vez (split si aparece
+    en varios stack levels) y cada grupo es un único overlay con su enable unido.
+
+    Con `prescaled` los inputs ya vienen del cache al tamaño final: no hay scale.
+
+    Retorna (filters, label_final).
+    """
+    filters = []
+    streams = {}
+    for logo, idx in logo_index.items():
+        levels = [stack for l, stack, _ in groups if l == logo]
+        labels = [f"l{idx}_{stack}" for stack in levels]
+        if prescaled:
+            scaled = f"[{idx}:v]format=rgba"
+        else:
+            scaled = (
+                f"[{idx}:v]scale={args.size}:{args.size}:force_original_aspect_ratio=decrease,"
+                f"format=rgba"
+            )
+        if len(labels) == 1:
+            filters.append(f"{scaled}[{labels[0]}]")
+        else:
+            filters.append(f"{scaled},split={len(labels)}" + "".join(f"[{lb}]" for lb in labels))
+        for stack, lb in zip(levels, labels):
+            streams[(logo, stack)] = lb
+
+    # ⚠️ NO usar fade con alpha=1 en overlays encadenados — hace los logos invisibles.
+    # Ver 6_logo-overlay.md → "NOTA IMPORTANTE" para detalles.
+    chain = base
+    for i, (logo, stack_level, windows) in enumerate(groups):
+        pos_x, pos_y = logo_position(args, stack_level)
+        vl = f"v{i}"
+        filters.append(
+            f"[{chain}][{streams[(logo, stack_level)]}]overlay={pos_x}:{pos_y}:"
+            f"enable='{enable_expr(windows)}'[{vl}]"
+        )
+        chain = vl
+    return filters, chain
+
+
 def format_time(seconds):
     m, s = divmod(seconds, 60)
     m = int(m)
@@ -99,7 +280,7 @@ def format_time(seconds):
 
 def main():
     parser = argparse.ArgumentParser(description="Paso 6 — Logo Overlay")
-    parser.add_argument("video_dir", help="Carpeta del video")
+    parser.add_argument("video_dir", nargs="?", help="Carpeta del video")
     parser.add_argument("--video", default="5_video_limpio.mp4", help="Video de entrada (default: 5_video_limpio.mp4)")
     parser.add_argument("--output", default=None, help="Video de salida (default: <video>_logos.mp4)")
     parser.add_argument("--size", type=int, default=250, help="Tamaño del logo en px (default: 250)")
@@ -110,14 +291,36 @@ def main():
     parser.add_argument("--fade", type=float, default=0.0, help="[DESACTIVADO] Fade causa logos invisibles en overlays encadenados. Se ignora.")
     parser.add_argument("--crf", type=int, default=18, help="Calidad CRF (default: 18)")
     parser.add_argument("--preset", default="fast", help="Preset de encoding (default: fast)")
+    parser.add_argument("--ranges", action="store_true", help="Re-encodear solo los tramos con logos (snap a keyframes) y copiar el resto")
+    parser.add_argument("--aspect", default="fit", choices=["fit", "square"], help="Logos pre-escalados: fit = respeta aspecto, square = centrado en size×size (default: fit)")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="Cache de logos pre-escalados (default: recursos/cache/logos)")
+    parser.add_argument("--no-cache", action="store_true", help="No usar logos pre-escalados (escala en el filter graph)")
+    parser.add_argument("--build-cache", action="store_true", help="Pre-escalar toda la librería de logos y salir")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para pre-escalar (default: CPUs)")
     parser.add_argument("--dry-run", action="store_true", help="Solo mostrar detecciones")
 
     args = parser.parse_args()
+    cache_dir = os.path.expanduser(args.cache_dir)
+
+    if args.build_cache:
+        if not has_pillow():
+            print("❌ Necesitas Pillow: pip3 install Pillow")
+            sys.exit(1)
+        logos = sorted(
+            name for name in os.listdir(LOGO_DIR)
+            if os.path.isfile(logo_source_path(LOGO_DIR, name))
+        )
+        build_logo_cache(logos, LOGO_DIR, cache_dir, args.size, args.aspect, args.workers)
+        print(f"✅ Cache listo: {len(logos)} logos @ {args.size}px ({args.aspect}) en {cache_dir}")
+        return
+
+    if not args.video_dir:
+        parser.error("falta la carpeta del video (o usá --build-cache)")
 
     video_dir = os.path.expanduser(args.video_dir)
     video_path = os.path.join(video_dir, "fuente", "video", args.video)
     overlay_md = os.path.join(video_dir, "fuente", "transcription", "overlay-logos.md")
-    logo_dir = os.path.expanduser("~/Documents/Edicion/Serudda/recursos/logos")
+    logo_dir = LOGO_DIR
     output_dir = os.path.join(video_dir, "output")
     tmp_dir = os.path.join(video_dir, "tmp")
 
@@ -130,7 +333,7 @@ def main():
     else:
         output_path = os.path.join(video_out_dir, "6_video_limpio_logos.mp4")
 
-    if not os.path.isfile(video_path):
+    if not (os.path.isfile(video_path) or is_stream(video_path)):
         print(f"❌ Video no encontrado: {video_path}")
         sys.exit(1)
     if not os.path.isfile(overlay_md):
@@ -167,68 +370,96 @@ def main():
 
     # --- Generar comando ffmpeg como .sh ---
 
+    # Logos pre-escalados desde el cache (o el PNG original si no hay Pillow / --no-cache)
+    brands = list(dict.fromkeys(logo for _, _, logo, _ in detections))
+    logo_inputs = {logo: logo_source_path(logo_dir, logo) for logo in brands}
+    prescaled = False
+    if not args.no_cache:
+        if has_pillow():
+            logo_inputs = build_logo_cache(brands, logo_dir, cache_dir, args.size, args.aspect, args.workers)
+            prescaled = True
+        else:
+            print("⚠️  Sin Pillow no hay cache de logos (pip3 install Pillow) — se escalan en el filter graph")
+
     # Inputs
     input_parts = [f'ffmpeg -i "{video_path}"']
     logo_index = {}
-    for _, _, logo, _ in detections:
-        if logo not in logo_index:
-            logo_index[logo] = len(logo_index) + 1
-            input_parts.append(f'-i "{os.path.join(logo_dir, logo, logo + ".png")}"')
+    for logo in brands:
+        logo_index[logo] = len(logo_index) + 1
+        input_parts.append(f'-i "{logo_inputs[logo]}"')
 
-    # Filter complex
-    filters = []
-    chain = "0:v"
-    for i, (start, end, logo, stack_level) in enumerate(detections):
-        idx = logo_index[logo]
-        sl = f"s{i}"
-        vl = f"v{i}"
-        y_offset = (args.size + 10) * stack_level
-        pad_x = args.padding_x if args.padding_x is not None else args.padding
-        pad_y = args.padding_y if args.padding_y is not None else args.padding
-
-        # Posición según --position
-        if args.position == "top-left":
-            pos_x = str(pad_x)
-            pos_y = str(pad_y + y_offset) if stack_level == 0 else f"{pad_y}+{y_offset}"
-        elif args.position == "top-right":
-            pos_x = f"W-{args.size}-{pad_x}"
-            pos_y = str(pad_y + y_offset) if stack_level == 0 else f"{pad_y}+{y_offset}"
-        elif args.position == "bottom-left":
-            pos_x = str(pad_x)
-            pos_y = f"H-{args.size}-{pad_y}" if stack_level == 0 else f"H-{args.size}-{pad_y}-{y_offset}"
-        else:  # bottom-right
-            pos_x = f"W-{args.size}-{pad_x}"
-            pos_y = f"H-{args.size}-{pad_y}" if stack_level == 0 else f"H-{args.size}-{pad_y}-{y_offset}"
-
-        # ⚠️ NO usar fade con alpha=1 en overlays encadenados — hace los logos invisibles.
-        # Ver 6_logo-overlay.md → "NOTA IMPORTANTE" para detalles.
-        filters.append(
-            f"[{idx}:v]scale={args.size}:{args.size}:force_original_aspect_ratio=decrease,"
-            f"format=rgba[{sl}]"
-        )
-        filters.append(
-            f"[{chain}][{sl}]overlay={pos_x}:{pos_y}:"
-            f"enable='between(t,{start},{end})'[{vl}]"
-        )
-        chain = vl
+    # Filter complex: un overlay por (logo, stack level), no uno por mención
+    groups = group_detections(detections)
+    filters, chain = build_filter_graph(groups, logo_index, args, prescaled=prescaled)
 
     fc = ";".join(filters)
 
-    # Escribir .sh
     sh_file = os.path.join(tmp_dir, "logo_overlay_cmd.sh")
-    with open(sh_file, "w") as f:
-        f.write("#!/bin/bash\nset -e\n")
-        f.write(" ".join(input_parts))
-        f.write(f' -filter_complex "{fc}"')
-        f.write(f' -map "[{chain}]" -map 0:a')
-        f.write(f" -c:v libx264 -crf {args.crf} -preset {args.preset}")
-        f.write(f' -c:a copy -y "{output_path}"\n')
+
+    params = None
+    if args.ranges and (is_stream(video_path) or is_stream(output_path)):
+        print("⚠️  --ranges necesita leer el video con seek — no funciona encadenado por FIFO. Re-encodeando todo.")
+        args.ranges = False
+    if args.ranges:
+        params = get_stream_params(video_path)
+        if params.get("vcodec") != "h264" or params.get("acodec") != "aac":
+            print(f"⚠️  --ranges requiere H.264 + AAC (es {params.get('vcodec')} + {params.get('acodec')}). Re-encodeando todo.")
+            args.ranges = False
+
+    if args.ranges:
+        # Render por tramos: solo se re-encodea donde hay logos
+        duration = get_duration(video_path)
+        pieces = plan_render_ranges([(s, e) for s, e, _, _ in detections], get_keyframes(video_path), duration)
+        encoded = sum(e - s for s, e, mode in pieces if mode == "encode")
+        print(f"\n✂️  Tramos: re-encode {format_time(encoded)} de {format_time(duration)} "
+              f"({encoded / duration * 100:.0f}%) | {len(pieces)} piezas")
+
+        def encode_piece(start, end):
+            piece_groups = []
+            for logo, stack_level, windows in groups:
+                inside = [(s, e) for s, e in windows if s < end and e > start]
+                if inside:
+                    piece_groups.append((logo, stack_level, inside))
+            piece_index = {}
+            inputs = []
+            for logo, _, _ in piece_groups:
+                if logo not in piece_index:
+                    piece_index[logo] = len(piece_index) + 1
+                    inputs += ["-i", logo_inputs[logo]]
+            # El tramo arranca en t=0: se lleva al tiempo absoluto para que los enable sigan valiendo
+            piece_filters, piece_chain = build_filter_graph(piece_groups, piece_index, args, base="base",
+                                                            prescaled=prescaled)
+            piece_fc = ";".join([
+                f"[0:v]setpts=PTS-STARTPTS+{start:.3f}/TB[base]",
+                *piece_filters,
+                f"[{piece_chain}]setpts=PTS-STARTPTS[vout]",
+            ])
+            return [*inputs, "-filter_complex", piece_fc, "-map", "[vout]", "-map", "0:a"]
+
+        pieces_dir = os.path.join(tmp_dir, "logo_pieces")
+        commands, concat = range_commands(video_path, output_path, pieces, pieces_dir,
+                                          encode_piece, args.crf, args.preset, params)
+        with open(sh_file, "w") as f:
+            f.write("#!/bin/bash\nset -e\n")
+            for cmd in commands:
+                f.write(shlex.join([*cmd[:1], "-v", "error", *cmd[1:]]) + "\n")
+            f.write(shlex.join(concat) + "\n")
+            f.write(f"rm -rf {shlex.quote(pieces_dir)}\n")
+    else:
+        # Escribir .sh
+        with open(sh_file, "w") as f:
+            f.write("#!/bin/bash\nset -e\n")
+            f.write(" ".join(input_parts))
+            f.write(f' -filter_complex "{fc}"')
+            f.write(f' -map "[{chain}]" -map 0:a')
+            f.write(" " + shlex.join(output_codec_args(output_path, args.crf, args.preset)))
+            f.write(f' -y "{output_path}"\n')
     os.chmod(sh_file, 0o755)
 
     _px = args.padding_x if args.padding_x is not None else args.padding
     _py = args.padding_y if args.padding_y is not None else args.padding
     print(f"\n⚙️  Config: size={args.size}px | padding-x={_px}px | padding-y={_py}px | crf={args.crf}")
-    print(f"\n🎬 Aplicando {len(detections)} logos...")
+    print(f"\n🎬 Aplicando {len(detections)} logos ({len(groups)} overlays, {len(logo_index)} marcas)...")
     print(f"   ⚠️  Tarda ~7-10 min para un video de 17 min.\n")
     print(f"📝 Script: {sh_file}\n")
 
@@ -239,6 +470,9 @@ def main():
         print(f"   Revisa: cat {sh_file}")
         sys.exit(1)
 
+    if is_stream(output_path):
+        print(f"\n✅ Listo: {output_path} (stream)")
+        return
     size_mb = os.path.getsize(output_path) / (1024 * 1024)
     print(f"\n✅ Listo: {output_path} ({size_mb:.0f} MB)")
 
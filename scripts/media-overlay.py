@@ -10,17 +10,24 @@ Requiere ffmpeg.
 Uso:
   python3 media-overlay.py <carpeta-del-video>
   python3 media-overlay.py <carpeta-del-video> --dry-run
+  python3 media-overlay.py <carpeta-del-video> --ranges
 
 Documentación completa: ../7_media-overlay.md
 """
 
 import argparse
+import hashlib
 import json
+import math
 import os
 import re
+import shutil
 import subprocess
 import sys
-from difflib import SequenceMatcher
+
+from render_ranges import get_keyframes, get_stream_params, plan_render_ranges, range_commands, run_range_commands
+from stream_io import is_stream, output_codec_args
+from transcript_index import WordIndex, load_transcript
 
 
 def parse_timestamp(ts):
@@ -41,7 +48,7 @@ def format_time(seconds):
     return f"{m}:{s:05.2f}"
 
 
-def find_word_timestamp(target_phrase, words, segment_start=None, segment_end=None):
+def find_word_timestamp(target_phrase, index, segment_start=None, segment_end=None):
     """Busca una palabra o frase en la transcripción word-level y retorna (start, end).
     
     Soporta:
@@ -49,17 +56,10 @@ def find_word_timestamp(target_phrase, words, segment_start=None, segment_end=No
     - Frase multi-palabra: @"El 50" → busca palabras consecutivas, retorna start de la primera
     
     Si se proporcionan segment_start/segment_end, limita la búsqueda a ese rango.
+    `index` es un WordIndex de la transcripción.
     """
-    # Filtrar palabras al rango del segmento
-    filtered = []
-    for i, w in enumerate(words):
-        if segment_start is not None and w['start'] < segment_start - 1.0:
-            continue
-        if segment_end is not None and w['end'] > segment_end + 1.0:
-            continue
-        filtered.append((i, w))
-    
-    if not filtered:
+    lo, hi = index.range(segment_start, segment_end)
+    if lo >= hi:
         return None, None
     
     # Tokenizar la frase objetivo
@@ -69,48 +69,16 @@ def find_word_timestamp(target_phrase, words, segment_start=None, segment_end=No
     
     if len(target_tokens) == 1:
         # Búsqueda de palabra individual (fuzzy)
-        target_clean = target_tokens[0]
-        best_score = 0
-        best_start = None
-        best_end = None
-        
-        for _, w in filtered:
-            word_clean = w['word'].lower().strip(' .,!?¿¡"\'')
-            score = SequenceMatcher(None, target_clean, word_clean).ratio()
-            if score > best_score:
-                best_score = score
-                best_start = w['start']
-                best_end = w['end']
-        
+        best_score, pos = index.best_word(target_tokens[0], lo, hi)
         if best_score < 0.6:
             return None, None
-        return best_start, best_end
+        return index.words.start(pos), index.words.end(pos)
     
     # Búsqueda de frase multi-palabra (ventana deslizante)
-    window_size = len(target_tokens)
-    best_score = 0
-    best_start = None
-    best_end = None
-    
-    for i in range(len(filtered) - window_size + 1):
-        window = filtered[i:i + window_size]
-        window_tokens = [w['word'].lower().strip(' .,!?¿¡"\'') for _, w in window]
-        
-        # Score: promedio de similarity por posición
-        total_score = 0
-        for t_tok, w_tok in zip(target_tokens, window_tokens):
-            total_score += SequenceMatcher(None, t_tok, w_tok).ratio()
-        avg_score = total_score / window_size
-        
-        if avg_score > best_score:
-            best_score = avg_score
-            best_start = window[0][1]['start']
-            best_end = window[-1][1]['end']
-    
+    best_score, pos = index.best_phrase(target_tokens, lo, hi)
     if best_score < 0.6:
         return None, None
-    
-    return best_start, best_end
+    return index.words.start(pos), index.words.end(pos + len(target_tokens) - 1)
 
 
 def parse_duration_str(s):
@@ -163,7 +131,209 @@ def get_video_info(video_path):
     else:
         fps = float(fps_str)
     
-    return {'width': width, 'height': height, 'fps': fps}
+    pix_fmt = video_stream.get('pix_fmt', 'yuv420p') if video_stream else 'yuv420p'
+    
+    return {'width': width, 'height': height, 'fps': fps, 'pix_fmt': pix_fmt}
+
+
+ALPHA_PIX_FMTS = re.compile(r'^(yuva|rgba|argb|bgra|abgr|gbrap|ya|pal8)')
+
+
+def get_media_alpha(filepath):
+    """¿El video overlay tiene canal alfa? Retorna (alpha, args de decoder para antes de -i).
+
+    VP9 con alfa (webm) se reporta como yuv420p con el tag alpha_mode: solo
+    libvpx-vp9 decodifica el alfa, el decoder nativo lo descarta.
+    """
+    cmd = [
+        "ffprobe", "-v", "quiet", "-print_format", "json", "-select_streams", "v:0",
+        "-show_entries", "stream=codec_name,pix_fmt:stream_tags=alpha_mode", filepath
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    streams = json.loads(result.stdout or "{}").get("streams", []) if result.returncode == 0 else []
+    if not streams:
+        return False, []
+    stream = streams[0]
+    if stream.get("tags", {}).get("alpha_mode") == "1":
+        decoder = {"vp9": "libvpx-vp9", "vp8": "libvpx"}.get(stream.get("codec_name"))
+        return True, (["-c:v", decoder] if decoder else [])
+    return bool(ALPHA_PIX_FMTS.match(stream.get("pix_fmt", ""))), []
+
+
+def file_hash(path):
+    """sha256 del archivo (por bloques, sirve para videos grandes)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()[:16]
+
+
+def normalized_media_path(cache_dir, media_path, is_video, base_info, alpha=False):
+    """Ruta en cache del medio normalizado: clave = hash del archivo + formato destino."""
+    stem = os.path.splitext(os.path.basename(media_path))[0]
+    target = f"{base_info['width']}x{base_info['height']}"
+    if is_video and alpha:
+        target += f"-{base_info['fps']:.3f}fps-yuva420p"
+        ext = ".mkv"
+    elif is_video:
+        target += f"-{base_info['fps']:.3f}fps-{base_info['pix_fmt']}"
+        ext = ".mp4"
+    else:
+        target += "-rgba"
+        ext = ".png"
+    return os.path.join(cache_dir, f"{stem}-{file_hash(media_path)}-{target}{ext}")
+
+
+def normalize_media(media_path, dest_path, is_video, base_info, threads, alpha=False, decoder=()):
+    """Escalar + pad a la resolución base (y fps/pix_fmt para videos). Retorna (dest, error).
+
+    Los videos con alfa van a FFV1 yuva420p en .mkv (sin pérdida, conserva la
+    transparencia, con pad transparente); el resto a H.264 con el pix_fmt base.
+    """
+    fit = (
+        f"scale={base_info['width']}:{base_info['height']}:"
+        f"force_original_aspect_ratio=decrease,"
+        f"pad={base_info['width']}:{base_info['height']}:(ow-iw)/2:(oh-ih)/2"
+    )
+    tmp_path = dest_path + ".part" + os.path.splitext(dest_path)[1]
+    if is_video and alpha:
+        cmd = [
+            "ffmpeg", "-v", "error", *decoder, "-i", media_path,
+            "-vf", f"format=yuva420p,{fit}:color=black@0,fps={base_info['fps']:.3f}",
+            "-an", "-c:v", "ffv1", "-pix_fmt", "yuva420p",
+            "-threads", str(threads), "-y", tmp_path
+        ]
+    elif is_video:
+        cmd = [
+            "ffmpeg", "-v", "error", "-i", media_path,
+            "-vf", f"{fit},fps={base_info['fps']:.3f},format={base_info['pix_fmt']}",
+            "-an", "-c:v", "libx264", "-crf", "14", "-preset", "veryfast",
+            "-threads", str(threads), "-y", tmp_path
+        ]
+    else:
+        cmd = [
+            "ffmpeg", "-v", "error", "-i", media_path,
+            "-vf", f"{fit},format=rgba", "-frames:v", "1",
+            "-threads", str(threads), "-y", tmp_path
+        ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        return dest_path, result.stderr[-500:]
+    os.replace(tmp_path, dest_path)
+    return dest_path, None
+
+
+def prenormalize_overlays(overlays, base_info, cache_dir, workers=None):
+    """Pre-pass: normalizar en paralelo cada medio al formato del video base.
+
+    Lo ya normalizado (mismo archivo, mismo formato destino) sale del cache, así
+    que re-renderizar después de editar las marcas no repite conversiones. Los
+    overlays normalizados quedan con `prescaled=True` y `media_path` al cache.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    os.makedirs(cache_dir, exist_ok=True)
+    jobs = {}
+    for ov in overlays:
+        dest = normalized_media_path(cache_dir, ov['media_path'], ov['is_video'], base_info, ov.get('alpha', False))
+        ov['normalized_path'] = dest
+        if not os.path.exists(dest) and dest not in jobs:
+            jobs[dest] = (ov['media_path'], ov['is_video'], ov.get('alpha', False), ov.get('decoder', []))
+
+    unique = len({ov['normalized_path'] for ov in overlays})
+    if jobs:
+        workers = workers or min(len(jobs), os.cpu_count() or 4)
+        threads = max(1, (os.cpu_count() or 4) // workers)
+        print(f"🗂️  Normalizando {len(jobs)} medios ({unique - len(jobs)} ya en cache) | {workers} workers × {threads} threads...")
+        # Cada job es un proceso ffmpeg: el pool solo los lanza y espera
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(normalize_media, src, dest, is_video, base_info, threads, alpha, decoder)
+                for dest, (src, is_video, alpha, decoder) in jobs.items()
+            ]
+            for future in futures:
+                dest, error = future.result()
+                if error:
+                    print(f"⚠️  No se pudo normalizar {os.path.basename(dest)} — se escala en el render")
+                    print(f"   {error.strip()}")
+    else:
+        print(f"♻️  {unique} medios normalizados desde cache")
+
+    for ov in overlays:
+        if os.path.exists(ov['normalized_path']):
+            ov['media_path'] = ov['normalized_path']
+            ov['prescaled'] = True
+            ov['decoder'] = []  # el cache se decodifica con el decoder nativo
+
+
+def media_input_args(ov):
+    """Args de input de un overlay, acotados a su ventana.
+
+    Los videos se leen solo `duration` segundos (-t); las imágenes se decodifican
+    una vez y se repiten en el grafo (ver build_media_graph).
+    """
+    if ov['is_video']:
+        return ["-t", f"{ov['duration']:.3f}", *ov.get('decoder', []), "-i", ov['media_path']]
+    return ["-i", ov['media_path']]
+
+
+def build_media_graph(overlays, base_info, base="[0:v]"):
+    """Filtros de overlay fullscreen: cada media es el input idx+1 (0 es el video base).
+
+    Cada overlay existe solo durante su ventana: los videos se recortan con trim
+    (y congelan el último frame con tpad si la duración pedida es mayor), las
+    imágenes se escalan una vez y se repiten con loop hasta cubrir la duración.
+    Con eof_action=pass el overlay se suelta al terminar, así que ffmpeg no
+    mantiene decoders ni frames vivos fuera de la ventana.
+
+    Retorna (filter_parts, stream_final).
+    """
+    filter_parts = []
+    current_stream = base
+    fps = base_info['fps']
+    fit = (
+        f"scale={base_info['width']}:{base_info['height']}:"
+        f"force_original_aspect_ratio=decrease,"
+        f"pad={base_info['width']}:{base_info['height']}:(ow-iw)/2:(oh-ih)/2"
+    )
+    
+    for idx, ov in enumerate(overlays):
+        input_idx = idx + 1  # 0 es el video base
+        start = ov['start']
+        end = ov['end']
+        duration = end - start
+        
+        # Medios pre-normalizados (cache) ya vienen a la resolución base
+        ov_fit = "" if ov.get('prescaled') else f"{fit},"
+        
+        if ov['is_video']:
+            # Video overlay: trim a la ventana, scale to fill, overlay fullscreen
+            hold = duration - (ov['media_duration'] or duration)
+            tpad = f"tpad=stop_mode=clone:stop_duration={hold:.3f}," if hold > 0.05 else ""
+            filter_parts.append(
+                f"[{input_idx}:v]trim=duration={duration:.3f},{ov_fit}{tpad}"
+                f"setpts=PTS-STARTPTS+{start}/TB"
+                f"[media{idx}]"
+            )
+        else:
+            # Image overlay: se escala una vez y el frame se repite durante la ventana
+            frames = max(1, math.ceil(duration * fps))
+            filter_parts.append(
+                f"[{input_idx}:v]{ov_fit}format=rgba,"
+                f"loop=loop={frames - 1}:size=1:start=0,"
+                f"setpts=N/({fps}*TB)+{start}/TB"
+                f"[media{idx}]"
+            )
+        
+        # Overlay on current stream
+        filter_parts.append(
+            f"{current_stream}[media{idx}]overlay=0:0:eof_action=pass:"
+            f"enable='between(t,{start:.2f},{end:.2f})'"
+            f"[v{idx}]"
+        )
+        current_stream = f"[v{idx}]"
+    return filter_parts, current_stream
 
 
 def parse_overlay_media_md(filepath):
@@ -244,6 +414,10 @@ def main():
     parser.add_argument("--fade", type=float, default=0.3, help="Fade in/out en segundos (default: 0.3)")
     parser.add_argument("--crf", type=int, default=18, help="Calidad CRF (default: 18)")
     parser.add_argument("--preset", default="fast", help="Preset de encoding (default: fast)")
+    parser.add_argument("--no-cache", action="store_true", help="No pre-normalizar medios (escala/pad dentro del render)")
+    parser.add_argument("--workers", type=int, default=None, help="Normalizaciones en paralelo (default: CPUs)")
+    parser.add_argument("--ranges", action="store_true", help="Re-encodear solo los tramos con overlays (snap a keyframes) y copiar el resto")
+    parser.add_argument("--probe", default=None, help="Video del que leer resolución/fps/duración cuando el input es un FIFO (lo pasa stream-steps.py)")
     parser.add_argument("--dry-run", action="store_true", help="Solo mostrar detecciones")
     
     args = parser.parse_args()
@@ -255,7 +429,7 @@ def main():
     media_dir = os.path.join(video_dir, "fuente", "overlays")
     output_path = os.path.join(video_dir, "fuente", "video", args.output)
     
-    if not os.path.isfile(video_path):
+    if not (os.path.isfile(video_path) or is_stream(video_path)):
         print(f"❌ Video no encontrado: {video_path}")
         sys.exit(1)
     
@@ -316,10 +490,9 @@ def main():
         print(f"❌ transcription_original.json no encontrado: {transcription_json}")
         sys.exit(1)
     
-    # Cargar transcripción word-level
-    with open(transcription_json) as f:
-        transcription = json.load(f)
-    words = transcription.get('words', [])
+    # Cargar transcripción word-level (índice columnar si está disponible)
+    words = load_transcript(transcription_json)
+    index = WordIndex(words)
     
     # Parsear marcas
     overlays = parse_overlay_media_md(overlay_md)
@@ -334,21 +507,28 @@ def main():
     if not overlays:
         print("⚠️  No hay medios marcados con >>>")
         # Si no hay overlays, copiar video de entrada a salida
-        if not args.dry_run:
-            import shutil
+        if not args.dry_run and (is_stream(video_path) or is_stream(output_path)):
+            # Encadenado por FIFO: el stream tiene que pasar igual al paso siguiente
+            cmd = ["ffmpeg", "-y", "-i", video_path, "-map", "0:v:0", "-map", "0:a",
+                   *output_codec_args(output_path, args.crf, args.preset), output_path]
+            if subprocess.run(cmd).returncode != 0:
+                sys.exit(1)
+            print(f"📋 Sin overlays — stream pasado tal cual a {output_path}")
+        elif not args.dry_run:
             shutil.copy2(video_path, output_path)
             print(f"📋 Sin overlays — copiado input a {output_path}")
         return
     
     # Obtener info del video base
-    base_info = get_video_info(video_path)
+    # Un FIFO no se puede probar sin consumirlo: stream-steps.py pasa el video original en --probe
+    base_info = get_video_info(args.probe or video_path)
     
     # Resolver timestamps y validar archivos
     all_valid = True
     for ov in overlays:
         # Buscar timestamp de la palabra
         word_start, word_end = find_word_timestamp(
-            ov['target_word'], words,
+            ov['target_word'], index,
             segment_start=ov['segment_start'],
             segment_end=ov['segment_end']
         )
@@ -369,6 +549,7 @@ def main():
             
             if ov['is_video']:
                 ov['media_duration'] = get_media_duration(media_path)
+                ov['alpha'], ov['decoder'] = get_media_alpha(media_path)
             else:
                 ov['media_duration'] = None
         else:
@@ -405,47 +586,17 @@ def main():
         print("❌ Hay archivos faltantes. Corrige antes de renderizar.")
         sys.exit(1)
     
+    # Pre-pass: medios normalizados al formato del video base (cache por hash + formato)
+    if not args.no_cache:
+        prenormalize_overlays(overlays, base_info, os.path.join(video_dir, "tmp", "media_cache"), args.workers)
+    
     # Construir comando ffmpeg con filter_complex
     # Cada media es un input adicional
     inputs = ["-i", video_path]
     for ov in overlays:
-        inputs += ["-i", ov['media_path']]
-        # Si es video overlay, también necesitamos loop para imágenes
+        inputs += media_input_args(ov)
     
-    filter_parts = []
-    current_stream = "[0:v]"
-    
-    for idx, ov in enumerate(overlays):
-        input_idx = idx + 1  # 0 es el video base
-        start = ov['start']
-        end = ov['end']
-        
-        if ov['is_video']:
-            # Video overlay: scale to fill, trim to duration, overlay fullscreen
-            filter_parts.append(
-                f"[{input_idx}:v]scale={base_info['width']}:{base_info['height']}:"
-                f"force_original_aspect_ratio=decrease,"
-                f"pad={base_info['width']}:{base_info['height']}:(ow-iw)/2:(oh-ih)/2,"
-                f"setpts=PTS-STARTPTS+{start}/TB"
-                f"[media{idx}]"
-            )
-        else:
-            # Image overlay: scale to fill, loop for duration
-            filter_parts.append(
-                f"[{input_idx}:v]scale={base_info['width']}:{base_info['height']}:"
-                f"force_original_aspect_ratio=decrease,"
-                f"pad={base_info['width']}:{base_info['height']}:(ow-iw)/2:(oh-ih)/2,"
-                f"format=rgba"
-                f"[media{idx}]"
-            )
-        
-        # Overlay on current stream
-        filter_parts.append(
-            f"{current_stream}[media{idx}]overlay=0:0:"
-            f"enable='between(t,{start:.2f},{end:.2f})'"
-            f"[v{idx}]"
-        )
-        current_stream = f"[v{idx}]"
+    filter_parts, current_stream = build_media_graph(overlays, base_info)
     
     filter_complex = ";".join(filter_parts)
     
@@ -455,20 +606,59 @@ def main():
         "-filter_complex", filter_complex,
         "-map", current_stream,
         "-map", "0:a",
-        "-c:v", "libx264", "-crf", str(args.crf), "-preset", args.preset,
-        "-c:a", "copy",
+        *output_codec_args(output_path, args.crf, args.preset),
         output_path
     ]
     
+    params = None
+    if args.ranges and (is_stream(video_path) or is_stream(output_path)):
+        print("⚠️  --ranges necesita leer el video con seek — no funciona encadenado por FIFO. Re-encodeando todo.")
+        args.ranges = False
+    if args.ranges:
+        params = get_stream_params(video_path)
+        if params.get("vcodec") != "h264" or params.get("acodec") != "aac":
+            print(f"⚠️  --ranges requiere H.264 + AAC (es {params.get('vcodec')} + {params.get('acodec')}). Re-encodeando todo.")
+            args.ranges = False
+    
     print(f"🎬 Aplicando {len(overlays)} media overlays...")
     print(f"📤 Output: {output_path}\n")
     
-    result = subprocess.run(cmd)
+    if args.ranges:
+        # Render por tramos: solo se re-encodea donde hay overlays
+        duration = get_media_duration(video_path)
+        pieces = plan_render_ranges([(ov['start'], ov['end']) for ov in overlays], get_keyframes(video_path), duration)
+        encoded = sum(e - s for s, e, mode in pieces if mode == "encode")
+        print(f"✂️  Tramos: re-encode {format_time(encoded)} de {format_time(duration)} "
+              f"({encoded / duration * 100:.0f}%) | {len(pieces)} piezas")
+        
+        def encode_piece(start, end):
+            piece_overlays = [ov for ov in overlays if ov['start'] < end and ov['end'] > start]
+            piece_inputs = []
+            for ov in piece_overlays:
+                piece_inputs += media_input_args(ov)
+            # El tramo arranca en t=0: se lleva al tiempo absoluto para que los enable sigan valiendo
+            parts, final = build_media_graph(piece_overlays, base_info, base="[base]")
+            piece_fc = ";".join([
+                f"[0:v]setpts=PTS-STARTPTS+{start:.3f}/TB[base]",
+                *parts,
+                f"{final}setpts=PTS-STARTPTS[vout]",
+            ])
+            return [*piece_inputs, "-filter_complex", piece_fc, "-map", "[vout]", "-map", "0:a"]
+        
+        pieces_dir = os.path.join(video_dir, "tmp", "media_pieces")
+        commands, concat = range_commands(video_path, output_path, pieces, pieces_dir,
+                                          encode_piece, args.crf, args.preset, params)
+        returncode = run_range_commands(commands, concat, pieces_dir)
+    else:
+        returncode = subprocess.run(cmd).returncode
     
-    if result.returncode != 0:
-        print(f"\n❌ Error (código {result.returncode})")
+    if returncode != 0:
+        print(f"\n❌ Error (código {returncode})")
         sys.exit(1)
     
+    if is_stream(output_path):
+        print(f"\n✅ Listo: {output_path} (stream)")
+        return
     size_mb = os.path.getsize(output_path) / (1024 * 1024)
     print(f"\n✅ Listo: {output_path} ({size_mb:.0f} MB)")
 
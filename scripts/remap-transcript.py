@@ -0,0 +1,311 @@
+#!/usr/bin/env python3
+"""
+Remap de transcripción — Proyectar timestamps a través de la cut list del jump cut.
+
+jump-cut.py (Paso 4) guarda junto al video una cut list con el mapeo
+origen → salida de cada segmento conservado (`4_video_jumpcut.cutlist.json`).
+Este script usa ese mapeo para llevar una transcripción (y los overlay-*.md)
+al nuevo timeline sin volver a llamar a Whisper ni re-marcar overlays.
+
+Dos casos:
+  1. Transcripción del video PRE-corte (ej: 3_video_color_grade.mp4)
+     → se proyecta directo con la cut list nueva (`--precut`).
+  2. Transcripción de un corte ANTERIOR (ej: el 4_video_jumpcut.mp4 de antes
+     de cambiar --padding) → primero se lleva al timeline original con la
+     cut list vieja y después se proyecta con la nueva. La transcripción
+     anota el id de su cut list (`"cutlist"`) y jump-cut.py archiva cada
+     corte en `4_video_jumpcut.cutlists/<id>.json`, así que la vieja se
+     encuentra sola; `--from-cutlist` la fuerza a mano.
+
+La salida queda anotada con el id de la cut list nueva: correrlo dos veces
+no remapea dos veces. Los overlay-*.md también (`<!-- cutlist: <id> -->` al
+final, que los parsers ignoran): uno ya anotado con el corte actual se saltea
+y uno anotado con un corte anterior se remapea desde ese corte.
+
+Uso:
+  python3 remap-transcript.py <carpeta-del-video>
+  python3 remap-transcript.py <carpeta-del-video> --overlays
+  python3 remap-transcript.py <carpeta-del-video> --transcript transcription_precut.json --precut
+  python3 remap-transcript.py <carpeta-del-video> --from-cutlist 4_video_jumpcut.cutlists/3f2a9c1b7d4e.json
+  python3 remap-transcript.py <carpeta-del-video> --dry-run
+
+Documentación completa: ../4_eliminar-silencios.md
+"""
+
+import argparse
+import bisect
+import json
+import os
+import re
+import shutil
+import sys
+
+
+def parse_timestamp(ts):
+    """Convertir MM:SS.xx o H:MM:SS.xx a segundos."""
+    parts = ts.strip().split(":")
+    if len(parts) == 2:
+        return int(parts[0]) * 60 + float(parts[1])
+    elif len(parts) == 3:
+        return int(parts[0]) * 3600 + int(parts[1]) * 60 + float(parts[2])
+    return 0.0
+
+
+def format_time(seconds):
+    m, s = divmod(seconds, 60)
+    m = int(m)
+    if s == int(s):
+        return f"{m}:{int(s):02d}"
+    return f"{m}:{s:05.2f}"
+
+
+class CutMap:
+    """Mapeo entre el timeline origen y el de salida de una cut list."""
+
+    def __init__(self, cutlist):
+        segs = sorted(cutlist.get("segments", []), key=lambda e: e["source_start"])
+        self.segments = [(e["source_start"], e["source_end"], e["output_start"]) for e in segs]
+        self.src_starts = [s for s, _, _ in self.segments]
+        self.out_starts = [o for _, _, o in self.segments]
+        self.output_duration = cutlist.get("output_duration") or (
+            self.segments[-1][2] + self.segments[-1][1] - self.segments[-1][0] if self.segments else 0.0
+        )
+
+    def to_output(self, t):
+        """Tiempo origen → salida. Si `t` cayó en un corte, se pega al inicio del siguiente segmento."""
+        i = bisect.bisect_right(self.src_starts, t) - 1
+        if i >= 0:
+            src_start, src_end, out_start = self.segments[i]
+            if t <= src_end:
+                return out_start + (t - src_start)
+        if i + 1 < len(self.segments):
+            return self.segments[i + 1][2]
+        return self.output_duration
+
+    def to_source(self, t):
+        """Tiempo salida → origen (siempre definido: la salida es continua)."""
+        i = max(0, bisect.bisect_right(self.out_starts, t) - 1)
+        if not self.segments:
+            return t
+        src_start, src_end, out_start = self.segments[i]
+        return min(src_start + (t - out_start), src_end)
+
+    def interval_to_output(self, start, end):
+        """Intervalo origen → salida. None si quedó entero dentro de un corte."""
+        i = max(0, bisect.bisect_right(self.src_starts, start) - 1)
+        first = last = None
+        while i < len(self.segments) and self.segments[i][0] < end:
+            src_start, src_end, out_start = self.segments[i]
+            lo, hi = max(start, src_start), min(end, src_end)
+            if hi > lo or (hi == lo and src_start <= start <= src_end):
+                if first is None:
+                    first = out_start + (lo - src_start)
+                last = out_start + (hi - src_start)
+            i += 1
+        if first is None:
+            return None
+        return first, last
+
+
+def load_cutmap(path):
+    with open(path) as f:
+        return CutMap(json.load(f))
+
+
+def resolve_source_cutlist(data, cutlist, history_dir, from_cutlist_path=None, precut=False):
+    """Cut list del timeline en el que está la transcripción.
+
+    Retorna (path | None, motivo de error | None). None sin error = transcripción pre-corte.
+    """
+    if from_cutlist_path:
+        return from_cutlist_path, None
+    if precut:
+        return None, None
+    tag = data.get("cutlist")
+    if not tag:
+        return None, ("la transcripción no dice sobre qué corte se hizo — pasá --from-cutlist "
+                      "(o --precut si es del video antes del jump cut)")
+    if tag == cutlist.get("id"):
+        return None, "la transcripción ya está en el timeline de la cut list actual"
+    path = os.path.join(history_dir, f"{tag}.json")
+    if not os.path.isfile(path):
+        return None, f"no está la cut list {tag} en {history_dir}"
+    return path, None
+
+
+def remap_items(items, forward, backward=None):
+    """Remapear una lista de dicts con start/end (words o segments). Descarta los que quedaron cortados."""
+    remapped = []
+    for item in items:
+        start, end = item.get("start", 0.0), item.get("end", 0.0)
+        if backward:
+            start, end = backward.to_source(start), backward.to_source(end)
+        projected = forward.interval_to_output(start, end)
+        if projected is None:
+            continue
+        new_item = dict(item)
+        new_item["start"] = round(projected[0], 3)
+        new_item["end"] = round(projected[1], 3)
+        remapped.append(new_item)
+    return remapped
+
+
+def remap_transcript(data, forward, backward=None):
+    """Proyectar una transcripción verbose_json (words + segments) al timeline de salida."""
+    out = dict(data)
+    out["words"] = remap_items(data.get("words", []), forward, backward)
+    out["segments"] = remap_items(data.get("segments", []), forward, backward)
+    for idx, seg in enumerate(out["segments"]):
+        if "id" in seg:
+            seg["id"] = idx
+    out["duration"] = round(forward.output_duration, 3)
+    return out
+
+
+TS_PATTERN = re.compile(r'(?<![\d:.])(\d+:\d{2}(?::\d{2})?(?:\.\d+)?)(?![\d:])')
+
+
+OVERLAY_TAG = re.compile(r'^<!-- cutlist: (\w+) -->\n?', re.M)
+
+
+def overlay_cutlist(text):
+    """Id de la cut list anotada en un overlay-*.md, o None."""
+    match = OVERLAY_TAG.search(text)
+    return match.group(1) if match else None
+
+
+def tag_overlay_md(text, cutlist_id):
+    """Anotar (o re-anotar) un overlay-*.md con el id de su cut list."""
+    text = OVERLAY_TAG.sub("", text).rstrip("\n")
+    return f"{text}\n\n<!-- cutlist: {cutlist_id} -->\n"
+
+
+def remap_overlay_md(text, forward, backward=None):
+    """Remapear los timestamps M:SS.xx de un overlay-*.md (líneas [a - b] y → logo | ts | ✅)."""
+    def replace(match):
+        t = parse_timestamp(match.group(1))
+        if backward:
+            t = backward.to_source(t)
+        return format_time(round(forward.to_output(t), 2))
+
+    lines = []
+    for line in text.split("\n"):
+        if line.startswith("#"):
+            lines.append(line)
+            continue
+        if re.match(r'\s*\[', line) or re.match(r'\s*→', line):
+            line = TS_PATTERN.sub(replace, line)
+            # Recalcular la duración "(x.xs)" de las líneas de segmento
+            seg = re.match(r'(\s*\[(\S+)\s*-\s*(\S+)\]\s*)\(\d+\.?\d*s\)', line)
+            if seg:
+                duration = parse_timestamp(seg.group(3)) - parse_timestamp(seg.group(2))
+                line = f"{seg.group(1)}({duration:.1f}s)" + line[seg.end():]
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Remap de transcripción a través de la cut list del jump cut")
+    parser.add_argument("video_dir", help="Carpeta del video")
+    parser.add_argument("--transcript", default="transcription_original.json", help="Transcripción de entrada (en fuente/transcription/)")
+    parser.add_argument("--output", default=None, help="Transcripción remapeada (en fuente/transcription/, default: la de entrada)")
+    parser.add_argument("--cutlist", default="4_video_jumpcut.cutlist.json", help="Cut list del corte nuevo (en fuente/video/)")
+    parser.add_argument("--from-cutlist", default=None, help="Cut list del corte sobre el que se transcribió (default: la anotada en la transcripción)")
+    parser.add_argument("--precut", action="store_true", help="La transcripción es del video antes del jump cut")
+    parser.add_argument("--overlays", action="store_true", help="Remapear también los overlay-*.md existentes")
+    parser.add_argument("--dry-run", action="store_true", help="Mostrar qué haría sin escribir")
+
+    args = parser.parse_args()
+
+    video_dir = os.path.expanduser(args.video_dir)
+    video_subdir = os.path.join(video_dir, "fuente", "video")
+    transcription_dir = os.path.join(video_dir, "fuente", "transcription")
+    tmp_dir = os.path.join(video_dir, "tmp", "remap_backup")
+
+    transcript_path = os.path.join(transcription_dir, args.transcript)
+    output_path = os.path.join(transcription_dir, args.output or args.transcript)
+    cutlist_path = os.path.join(video_subdir, args.cutlist)
+    history_dir = cutlist_path[:-len(".cutlist.json")] + ".cutlists"
+    from_cutlist_path = os.path.join(video_subdir, args.from_cutlist) if args.from_cutlist else None
+
+    for path in [transcript_path, cutlist_path, from_cutlist_path]:
+        if path and not os.path.isfile(path):
+            print(f"❌ No encontrado: {path}")
+            sys.exit(1)
+
+    with open(transcript_path) as f:
+        data = json.load(f)
+    with open(cutlist_path) as f:
+        cutlist = json.load(f)
+
+    from_cutlist_path, problem = resolve_source_cutlist(data, cutlist, history_dir, from_cutlist_path, args.precut)
+    if problem:
+        print(f"❌ No se remapeó: {problem}")
+        sys.exit(1)
+
+    forward = CutMap(cutlist)
+    backward = load_cutmap(from_cutlist_path) if from_cutlist_path else None
+
+    remapped = remap_transcript(data, forward, backward)
+    if cutlist.get("id"):
+        remapped["cutlist"] = cutlist["id"]
+
+    dropped_words = len(data.get("words", [])) - len(remapped["words"])
+    print(f"📄 Transcripción: {transcript_path}")
+    print(f"🗺️  Cut list: {cutlist_path}" + (f" (desde {os.path.relpath(from_cutlist_path, video_subdir)})" if backward else " (desde el video pre-corte)"))
+    print(f"   {len(forward.segments)} segmentos | duración salida: {format_time(forward.output_duration)}")
+    print(f"   Palabras: {len(data.get('words', []))} → {len(remapped['words'])} ({dropped_words} en zonas cortadas)")
+    print(f"   Segmentos: {len(data.get('segments', []))} → {len(remapped['segments'])}")
+
+    overlay_files = []
+    if args.overlays:
+        overlay_files = sorted(
+            os.path.join(transcription_dir, name) for name in os.listdir(transcription_dir)
+            if name.startswith("overlay-") and name.endswith(".md")
+        )
+    overlay_plan = []  # (path, texto, cut map de origen)
+    for path in overlay_files:
+        with open(path, encoding="utf-8") as f:
+            text = f.read()
+        tag = overlay_cutlist(text)
+        if tag is None:
+            # Sin anotar: se asume el mismo timeline que la transcripción
+            source = backward
+        elif tag == cutlist.get("id"):
+            print(f"   ⏭️  {os.path.basename(path)}: ya está en el timeline de la cut list actual")
+            continue
+        elif os.path.isfile(os.path.join(history_dir, f"{tag}.json")):
+            source = load_cutmap(os.path.join(history_dir, f"{tag}.json"))
+        else:
+            print(f"   ⚠️  {os.path.basename(path)}: no está la cut list {tag} en {history_dir}, no se remapea")
+            continue
+        overlay_plan.append((path, text, source))
+        print(f"   📋 {os.path.basename(path)}")
+
+    if args.dry_run:
+        print("\n🏁 Dry run — no se escribió nada.")
+        return
+
+    os.makedirs(tmp_dir, exist_ok=True)
+    if os.path.isfile(output_path):
+        shutil.copy2(output_path, os.path.join(tmp_dir, os.path.basename(output_path)))
+
+    with open(output_path, "w") as f:
+        f.write(json.dumps(remapped, ensure_ascii=False, indent=2))
+    print(f"\n✅ Transcripción remapeada: {output_path}")
+
+    for path, text, source in overlay_plan:
+        shutil.copy2(path, os.path.join(tmp_dir, os.path.basename(path)))
+        remapped_text = remap_overlay_md(OVERLAY_TAG.sub("", text), forward, source)
+        if cutlist.get("id"):
+            remapped_text = tag_overlay_md(remapped_text, cutlist["id"])
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(remapped_text)
+        print(f"✅ Remapeado: {os.path.basename(path)}")
+
+    print(f"   Backups en: {tmp_dir}")
+    print(f"   Regenerá la limpia con: python3 scripts/transcribe.py {args.video_dir} --clean-only")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Render por tramos — helpers compartidos por jump-cut, logo/media/text overlay e inserts.
+
+Keyframes y parámetros del stream con ffprobe, planificación de piezas
+copy/encode y los comandos ffmpeg por pieza (.ts) + el concat final.
+
+Los scripts viven en la misma carpeta, así que lo importan directo:
+  from render_ranges import get_keyframes, plan_render_ranges, ...
+"""
+
+import bisect
+import json
+import math
+import os
+import shutil
+import subprocess
+
+
+def get_duration(video_path):
+    """Duración del video con ffprobe."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "csv=p=0", video_path],
+        capture_output=True, text=True
+    )
+    return float(result.stdout.strip())
+
+
+def get_keyframes(video_path):
+    """Índice de keyframes del video (escaneo de paquetes con ffprobe, sin decodificar)."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-select_streams", "v:0",
+         "-show_entries", "packet=pts_time,flags",
+         "-of", "csv=p=0", video_path],
+        capture_output=True, text=True
+    )
+    keyframes = []
+    for line in result.stdout.split("\n"):
+        parts = line.strip().split(",")
+        if len(parts) < 2 or "K" not in parts[1]:
+            continue
+        try:
+            keyframes.append(float(parts[0]))
+        except ValueError:
+            continue
+    keyframes.sort()
+    return keyframes
+
+
+def get_stream_params(video_path):
+    """Parámetros del stream de video/audio para que el re-encode sea compatible con el copy."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "quiet", "-print_format", "json",
+         "-show_streams", video_path],
+        capture_output=True, text=True
+    )
+    info = json.loads(result.stdout or "{}")
+    params = {}
+    for st in info.get("streams", []):
+        if st.get("codec_type") == "video" and "vcodec" not in params:
+            params["vcodec"] = st.get("codec_name")
+            params["profile"] = (st.get("profile") or "").lower().replace(" ", "")
+            params["pix_fmt"] = st.get("pix_fmt")
+            params["level"] = st.get("level")
+            params["fps"] = st.get("r_frame_rate", "30/1")
+        elif st.get("codec_type") == "audio" and "acodec" not in params:
+            params["acodec"] = st.get("codec_name")
+            params["sample_rate"] = st.get("sample_rate")
+            params["channels"] = st.get("channels")
+    return params
+
+
+def encode_args(crf, preset, params=None):
+    """Args de encoding. Con `params` (smart render / tramos) replica perfil/pix_fmt/audio del original."""
+    args = ["-c:v", "libx264", "-crf", str(crf), "-preset", preset]
+    if params:
+        if params.get("profile") in ("baseline", "main", "high", "high10", "high422", "high444"):
+            args += ["-profile:v", params["profile"]]
+        if params.get("pix_fmt"):
+            args += ["-pix_fmt", params["pix_fmt"]]
+        if params.get("level") and params["level"] > 0:
+            args += ["-level:v", f"{params['level'] / 10:.1f}"]
+        args += ["-r", params.get("fps", "30/1")]
+    args += ["-c:a", "aac", "-b:a", "192k"]
+    if params and params.get("sample_rate"):
+        args += ["-ar", str(params["sample_rate"]), "-ac", str(params.get("channels", 2))]
+    return args
+
+
+def piece_seek(start, end, copy):
+    """-ss y -t de una pieza como strings, redondeados a ms hacia el lado correcto del borde.
+
+    Los bordes de las piezas son pts exactos (keyframes o frames snappeados).
+    Con -c copy el seek cae en el keyframe <= -ss: truncar 16.68333 a 16.683
+    arrastraría el GOP anterior entero, así que se redondea hacia arriba. Con
+    re-encode el seek es exacto y descarta los frames antes de -ss: ahí se
+    redondea hacia abajo para no perder el frame de borde. La duración se cuenta
+    desde el -ss redondeado y se trunca, así el frame donde arranca la pieza
+    siguiente no entra dos veces.
+    """
+    ss = (math.ceil if copy else math.floor)(start * 1000) / 1000
+    return f"{ss:.3f}", f"{math.floor((end - ss) * 1000) / 1000:.3f}"
+
+
+def plan_smart_pieces(start, end, keyframes, min_piece=0.02):
+    """Dividir un tramo en cabeza (re-encode) + interior (copy) + cola (re-encode).
+
+    El interior va del primer keyframe >= start al último keyframe <= end.
+    Si el tramo no contiene dos keyframes, se re-encodea completo.
+    Retorna [(start, end, 'encode' | 'copy'), ...].
+    """
+    i = bisect.bisect_left(keyframes, start)
+    j = bisect.bisect_right(keyframes, end) - 1
+    if i >= len(keyframes) or j < i or keyframes[j] - keyframes[i] < min_piece:
+        return [(start, end, "encode")]
+
+    k_in, k_out = keyframes[i], keyframes[j]
+    pieces = []
+    if k_in - start >= min_piece:
+        pieces.append((start, k_in, "encode"))
+    pieces.append((k_in, k_out, "copy"))
+    if end - k_out >= min_piece:
+        pieces.append((k_out, end, "encode"))
+    return pieces
+
+
+def plan_render_ranges(windows, keyframes, duration):
+    """Dividir el video en tramos a re-encodear (unión de las ventanas con overlays,
+    abierta hacia afuera hasta keyframes) y tramos a copiar (todo lo demás).
+
+    Retorna [(start, end, 'encode' | 'copy'), ...] cubriendo [0, duration].
+    """
+    snapped = []
+    for start, end in sorted(windows):
+        start, end = max(0.0, start), min(duration, end)
+        if end <= start:
+            continue
+        i = bisect.bisect_right(keyframes, start) - 1
+        j = bisect.bisect_left(keyframes, end)
+        k_start = keyframes[i] if i >= 0 else 0.0
+        k_end = keyframes[j] if j < len(keyframes) else duration
+        if snapped and k_start <= snapped[-1][1]:
+            snapped[-1][1] = max(snapped[-1][1], k_end)
+        else:
+            snapped.append([k_start, k_end])
+
+    pieces = []
+    cursor = 0.0
+    for start, end in snapped:
+        if start - cursor > 0.001:
+            pieces.append((cursor, start, "copy"))
+        pieces.append((start, end, "encode"))
+        cursor = end
+    if duration - cursor > 0.001:
+        pieces.append((cursor, duration, "copy"))
+    return pieces
+
+
+def range_commands(video_path, output_path, pieces, tmpdir, encode_piece, crf, preset, params, card_piece=None):
+    """Comandos ffmpeg del render por tramos: uno por pieza (.ts) + el concat final.
+
+    `encode_piece(start, end)` retorna los args de la pieza re-encodeada que van
+    después del input 0 (inputs extra, filtros y -map). El input 0 ya viene
+    recortado con -ss/-t, así que sus timestamps arrancan en 0.
+
+    `card_piece(start, end)` (solo text-overlay --splice) retorna (inputs, filtros)
+    del video de una pieza 'card'; del original se toma únicamente el audio.
+    """
+    os.makedirs(tmpdir, exist_ok=True)
+    commands = []
+    for i, (start, end, mode) in enumerate(pieces):
+        seg_path = os.path.join(tmpdir, f"piece_{i:04d}.ts")
+        ss, t = piece_seek(start, end, copy=mode == "copy")
+        base = ["ffmpeg", "-ss", ss, "-t", t, "-i", video_path]
+        if mode == "copy":
+            codec_args = ["-map", "0:v:0", "-map", "0:a?", "-c", "copy", "-avoid_negative_ts", "make_zero"]
+        elif mode == "card":
+            # La card es opaca: el video base de este tramo no se decodifica
+            card_inputs, card_filters = card_piece(start, end)
+            base = ["ffmpeg", *card_inputs, *base[1:]]
+            codec_args = [*card_filters, "-map", "0:v:0", "-map", "1:a",
+                          *encode_args(crf, preset, params), "-tune", "stillimage",
+                          "-t", t]
+        else:
+            codec_args = [*encode_piece(start, end), *encode_args(crf, preset, params)]
+        commands.append([*base, *codec_args, "-f", "mpegts", "-y", seg_path])
+
+    list_path = os.path.join(tmpdir, "list.txt")
+    with open(list_path, "w") as f:
+        for i in range(len(pieces)):
+            f.write(f"file 'piece_{i:04d}.ts'\n")
+    concat = ["ffmpeg", "-f", "concat", "-safe", "0", "-i", list_path, "-c", "copy", "-y", output_path]
+    return commands, concat
+
+
+def run_range_commands(commands, concat, tmpdir):
+    """Ejecutar las piezas del render por tramos con barra de progreso y concatenar."""
+    total = len(commands)
+    for i, cmd in enumerate(commands):
+        result = subprocess.run(cmd, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"\n❌ Falló la pieza {i + 1}/{total}:")
+            print(result.stderr[-1000:])
+            return result.returncode
+        pct = (i + 1) / total * 100
+        bar = "█" * int(pct / 2) + "░" * (50 - int(pct / 2))
+        print(f"\r  [{bar}] {pct:.0f}% ({i+1}/{total})", end="", flush=True)
+    print()
+    result = subprocess.run(concat, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stderr[-1000:])
+        return result.returncode
+    shutil.rmtree(tmpdir, ignore_errors=True)
+    return 0
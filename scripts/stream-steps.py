@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+Streaming entre pasos — Encadenar pasos consecutivos con named pipes (FIFOs).
+
+Cada paso escribe un `fuente/video/N_*.mp4` completo antes de que el siguiente
+pueda empezar a leerlo: el disco escribe y lee el video dos veces por paso y
+los pasos corren uno detrás del otro. Para los pasos que son un filtro lineal
+sobre el video (denoise → color grade, logos → media → text) este script los
+corre a la vez, conectados por FIFOs con NUT (video sin comprimir + audio
+copiado): el paso siguiente consume frames apenas salen y cada paso ocupa sus
+propios cores. Solo el último paso encodea a disco.
+
+Encadenables:
+  denoise → color-grade        (Pasos 2 → 3)
+  logos → media → text         (Pasos 6 → 7 → 8)
+
+Uso:
+  python3 stream-steps.py <carpeta-del-video> --steps denoise,color-grade
+  python3 stream-steps.py <carpeta-del-video> --steps logos,media,text
+  python3 stream-steps.py <carpeta-del-video> --steps logos,media,text --keep media
+  python3 stream-steps.py <carpeta-del-video> --steps denoise,color-grade --args "denoise=--strength heavy"
+  python3 stream-steps.py <carpeta-del-video> --steps logos,media,text --dry-run
+
+Documentación completa: ../README.md (sección "Streaming entre pasos")
+"""
+
+import argparse
+import json
+import os
+import shlex
+import shutil
+import signal
+import subprocess
+import sys
+import threading
+
+
+# (nombre, paso, script, flag de input, input default, output default)
+STEPS = [
+    ("denoise", 2, "denoise.py", "--input", "1_video_sincronizado.mp4", "2_video_denoised.mp4"),
+    ("color-grade", 3, "color-grade.py", "--input", "2_video_denoised.mp4", "3_video_color_grade.mp4"),
+    ("logos", 6, "logo-overlay.py", "--video", "5_video_limpio.mp4", "6_video_limpio_logos.mp4"),
+    ("media", 7, "media-overlay.py", "--video", "6_video_limpio_logos.mp4", "7_video_media_overlay.mp4"),
+    ("text", 8, "text-overlay.py", "--video", "7_video_media_overlay.mp4", "8_video_text_overlay.mp4"),
+]
+# Pares que se pueden conectar por FIFO (el de la derecha lee el output del de la izquierda)
+LINKS = {("denoise", "color-grade"), ("logos", "media"), ("media", "text")}
+# Pasos que leen resolución/fps/duración del input: con FIFO se les pasa --probe
+PROBES_INPUT = {"media", "text"}
+
+
+def parse_step_args(values):
+    """--args "media=--fade 0.5" (repetible) → {'media': ['--fade', '0.5']}."""
+    extra = {}
+    for value in values:
+        name, sep, rest = value.partition("=")
+        if not sep:
+            raise SystemExit(f"❌ --args inválido: {value} (formato: paso=\"--flag valor\")")
+        extra.setdefault(name.strip(), []).extend(shlex.split(rest))
+    return extra
+
+
+def load_tuned_settings(settings_path):
+    """--crf/--preset por paso desde tmp/encode-settings.json (encode-tune.py)."""
+    if not os.path.isfile(settings_path):
+        return {}
+    with open(settings_path) as f:
+        steps = json.load(f).get("steps", {})
+    return {int(step): ["--crf", str(s["crf"]), "--preset", s["preset"]] for step, s in steps.items()}
+
+
+def plan_chain(names, keep, video_subdir, stream_dir, extra, tuned):
+    """Comandos de cada paso (y de los tee de --keep) con sus FIFOs.
+
+    Retorna (procesos [(etiqueta, cmd)], fifos).
+    """
+    by_name = {s[0]: s for s in STEPS}
+    scripts_dir = os.path.dirname(os.path.abspath(__file__))
+    first_input = os.path.join(video_subdir, by_name[names[0]][4])
+
+    processes = []
+    fifos = []
+    upstream = None  # FIFO del que lee el paso actual (None = archivo en disco)
+    for i, name in enumerate(names):
+        _, step, script, input_flag, input_name, output_name = by_name[name]
+        last = i == len(names) - 1
+
+        if last:
+            output = output_name
+        else:
+            output = os.path.join(stream_dir, f"{name}.nut")
+            fifos.append(output)
+
+        cmd = [sys.executable, os.path.join(scripts_dir, script), "VIDEO_DIR",
+               input_flag, upstream or input_name, "--output", output]
+        if upstream and name in PROBES_INPUT:
+            cmd += ["--probe", first_input]
+        cmd += tuned.get(step, []) + extra.get(name, [])
+        processes.append((name, cmd))
+
+        if last:
+            break
+
+        upstream = output
+        if name in keep:
+            # tee: el stream sigue al paso siguiente y además se encodea el intermedio a disco
+            teed = os.path.join(stream_dir, f"{name}-tee.nut")
+            fifos.append(teed)
+            crf, preset = "18", "fast"
+            if step in tuned:
+                crf, preset = tuned[step][1], tuned[step][3]
+            processes.append((f"{name}→disco", [
+                "ffmpeg", "-v", "error", "-y", "-i", output,
+                "-map", "0", "-c", "copy", "-f", "nut", teed,
+                "-map", "0", "-c:v", "libx264", "-crf", crf, "-preset", preset, "-c:a", "copy",
+                os.path.join(video_subdir, output_name),
+            ]))
+            upstream = teed
+
+    return processes, fifos
+
+
+def pump(label, stream):
+    """Reenviar la salida de un paso con su etiqueta (los pasos corren intercalados)."""
+    for line in iter(stream.readline, ""):
+        for part in line.rstrip("\n").split("\r"):
+            if part.strip():
+                print(f"[{label}] {part}", flush=True)
+    stream.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Encadenar pasos consecutivos con named pipes")
+    parser.add_argument("video_dir", help="Carpeta del video")
+    parser.add_argument("--steps", required=True, help="Pasos a encadenar, en orden (ej: logos,media,text)")
+    parser.add_argument("--keep", default="", help="Pasos intermedios que además se escriben a disco (ej: media)")
+    parser.add_argument("--args", action="append", default=[], help="Flags extra para un paso: \"paso=--flag valor\" (repetible)")
+    parser.add_argument("--tuned", action="store_true", help="Usar --crf/--preset de tmp/encode-settings.json (encode-tune.py)")
+    parser.add_argument("--dry-run", action="store_true", help="Solo mostrar los comandos")
+
+    args = parser.parse_args()
+
+    video_dir = os.path.expanduser(args.video_dir)
+    video_subdir = os.path.join(video_dir, "fuente", "video")
+    stream_dir = os.path.join(video_dir, "tmp", "streams")
+    names = [n.strip() for n in args.steps.split(",") if n.strip()]
+    keep = {n.strip() for n in args.keep.split(",") if n.strip()}
+    known = [s[0] for s in STEPS]
+
+    for name in names + sorted(keep):
+        if name not in known:
+            print(f"❌ Paso desconocido: {name} (encadenables: {', '.join(known)})")
+            sys.exit(1)
+    if len(names) < 2:
+        print("❌ Hacen falta al menos dos pasos para encadenar")
+        sys.exit(1)
+    for a, b in zip(names, names[1:]):
+        if (a, b) not in LINKS:
+            print(f"❌ {a} → {b} no se puede encadenar (pares válidos: "
+                  + ", ".join(f"{x} → {y}" for x, y in sorted(LINKS)) + ")")
+            sys.exit(1)
+    if keep & {names[-1]} or keep - set(names):
+        print("❌ --keep solo aplica a pasos intermedios de la cadena")
+        sys.exit(1)
+    if not hasattr(os, "mkfifo"):
+        print("❌ Este sistema no soporta named pipes (os.mkfifo)")
+        sys.exit(1)
+
+    by_name = {s[0]: s for s in STEPS}
+    first_input = os.path.join(video_subdir, by_name[names[0]][4])
+    if not os.path.isfile(first_input):
+        print(f"❌ Video no encontrado: {first_input}")
+        sys.exit(1)
+
+    extra = parse_step_args(args.args)
+    tuned = load_tuned_settings(os.path.join(video_dir, "tmp", "encode-settings.json")) if args.tuned else {}
+    processes, fifos = plan_chain(names, keep, video_subdir, stream_dir, extra, tuned)
+    processes = [(label, [video_dir if c == "VIDEO_DIR" else c for c in cmd]) for label, cmd in processes]
+
+    print(f"📹 Input: {first_input}")
+    print(f"🔗 Cadena: {' → '.join(names)} ({len(fifos)} FIFOs en {stream_dir})")
+    print(f"📤 Output: {os.path.join(video_subdir, by_name[names[-1]][5])}")
+    for name in sorted(keep):
+        print(f"💾 Intermedio a disco: {os.path.join(video_subdir, by_name[name][5])}")
+    print()
+    for label, cmd in processes:
+        print(f"   [{label}] {shlex.join(cmd)}")
+
+    if args.dry_run:
+        print("\n🏁 Dry run — no se ejecutó nada.")
+        return
+
+    shutil.rmtree(stream_dir, ignore_errors=True)
+    os.makedirs(stream_dir)
+    for path in fifos:
+        os.mkfifo(path)
+
+    print(f"\n🎬 Corriendo {len(processes)} procesos en paralelo...\n")
+    running = []
+    pumps = []
+    for label, cmd in processes:
+        # Sesión propia: al cortar la cadena se corta también el ffmpeg que lanza cada paso
+        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+                                start_new_session=True)
+        running.append((label, proc))
+        t = threading.Thread(target=pump, args=(label, proc.stdout), daemon=True)
+        t.start()
+        pumps.append(t)
+
+    # Si un paso falla, los demás quedan bloqueados en su FIFO: se cortan todos
+    failed = None
+    pending = list(running)
+    while pending:
+        for label, proc in list(pending):
+            try:
+                proc.wait(timeout=0.5)
+            except subprocess.TimeoutExpired:
+                continue
+            pending.remove((label, proc))
+            if proc.returncode != 0 and failed is None:
+                failed = (label, proc.returncode)
+                for _, other in pending:
+                    try:
+                        os.killpg(other.pid, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+    for t in pumps:
+        t.join(timeout=1)
+
+    shutil.rmtree(stream_dir, ignore_errors=True)
+
+    if failed:
+        print(f"\n❌ Falló {failed[0]} (código {failed[1]}) — se cortó la cadena")
+        sys.exit(1)
+
+    output_path = os.path.join(video_subdir, by_name[names[-1]][5])
+    size_mb = os.path.getsize(output_path) / (1024 * 1024)
+    print(f"\n✅ Listo: {output_path} ({size_mb:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+Salida/entrada por named pipes — helpers compartidos por los pasos que
+stream-steps.py puede encadenar (denoise, color-grade, logo/media/text overlay).
+"""
+
+import os
+import stat
+
+
+def is_stream(path):
+    """True si `path` es un named pipe (stream-steps.py encadena pasos con FIFOs)."""
+    try:
+        return stat.S_ISFIFO(os.stat(path).st_mode)
+    except OSError:
+        return False
+
+
+def output_codec_args(output_path, crf, preset):
+    """Encoding de salida: libx264 a archivo, o NUT sin comprimir si la salida es un FIFO."""
+    if is_stream(output_path):
+        # El paso siguiente consume los frames directo: no se encodea entre pasos encadenados
+        return ["-c:v", "rawvideo", "-c:a", "copy", "-f", "nut"]
+    return ["-c:v", "libx264", "-crf", str(crf), "-preset", preset, "-c:a", "copy"]
@@ -10,17 +10,27 @@ Requiere ffmpeg compilado con --enable-libfreetype (drawtext filter).
 Uso:
   python3 text-overlay.py <carpeta-del-video>
   python3 text-overlay.py <carpeta-del-video> --dry-run
+  python3 text-overlay.py <carpeta-del-video> --ranges
+  python3 text-overlay.py <carpeta-del-video> --splice
 
 Documentación completa: ../8_text-overlay.md
 """
 
 import argparse
+import bisect
+import hashlib
+import importlib.util
 import json
 import os
 import re
 import subprocess
 import sys
 from difflib import SequenceMatcher
+from functools import lru_cache
+
+from render_ranges import get_duration, get_keyframes, get_stream_params, plan_render_ranges, range_commands, run_range_commands
+from stream_io import is_stream, output_codec_args
+from transcript_index import load_transcript
 
 
 def parse_timestamp(ts):
@@ -41,42 +51,96 @@ def format_time(seconds):
     return f"{m}:{s:05.2f}"
 
 
-def find_phrase_timestamps(phrase_text, words):
-    """Busca una frase en la transcripción word-level y retorna (start, end).
-    
-    Usa fuzzy matching para tolerar diferencias menores entre el texto
-    del segmento y las palabras individuales de Whisper.
+@lru_cache(maxsize=None)
+def similarity(a, b):
+    return SequenceMatcher(None, a, b).ratio()
+
+
+def align_phrase(tokens, words, lo, hi, gap=-0.6, extra=-0.3):
+    """Alineamiento por DP de la frase completa contra words[lo:hi] (extremos libres en la transcripción).
+
+    `words` es un Transcript (transcript_index.py).
+
+    Puntaje por par = 2*similitud-1 (tolera errores de Whisper). `gap` penaliza
+    tokens de la card que no se dijeron; `extra` (más barato) las palabras
+    dichas que la card resume. Costo O(len(tokens) × (hi-lo)): la banda la acota el caller.
+    Retorna (i_inicio, i_fin) en índices de `words`, o None.
     """
-    # Normalizar la frase del segmento
-    phrase_words = re.findall(r'\w+', phrase_text.lower())
-    if not phrase_words:
-        return None, None
-    
-    # Buscar la mejor coincidencia en la lista de palabras
-    word_texts = [w['word'].lower().strip(' .,!?¿¡') for w in words]
-    
-    best_score = 0
-    best_start_idx = 0
-    best_end_idx = 0
-    
-    # Ventana deslizante
-    window_size = len(phrase_words)
-    for i in range(len(word_texts) - window_size + 1):
-        window = word_texts[i:i + window_size]
-        # Comparar como strings unidos
-        window_str = ' '.join(window)
-        phrase_str = ' '.join(phrase_words)
-        score = SequenceMatcher(None, phrase_str, window_str).ratio()
-        
-        if score > best_score:
-            best_score = score
-            best_start_idx = i
-            best_end_idx = i + window_size - 1
-    
-    if best_score < 0.5:
-        return None, None
-    
-    return words[best_start_idx]['start'], words[best_end_idx]['end']
+    n, m = len(tokens), hi - lo
+    if n == 0 or m <= 0:
+        return None
+    norms = words.norms(lo, hi)
+    # D[i][j]: mejor puntaje alineando tokens[:i] terminando en words[lo + j - 1]
+    D = [[0.0] * (m + 1) for _ in range(n + 1)]
+    back = [[0] * (m + 1) for _ in range(n + 1)]  # 0 diag, 1 arriba, 2 izquierda
+    for i in range(1, n + 1):
+        D[i][0] = gap * i
+        back[i][0] = 1
+    for i in range(1, n + 1):
+        tok = tokens[i - 1]
+        for j in range(1, m + 1):
+            diag = D[i - 1][j - 1] + 2 * similarity(tok, norms[j - 1]) - 1
+            up = D[i - 1][j] + gap
+            left = D[i][j - 1] + extra
+            if diag >= up and diag >= left:
+                D[i][j], back[i][j] = diag, 0
+            elif up >= left:
+                D[i][j], back[i][j] = up, 1
+            else:
+                D[i][j], back[i][j] = left, 2
+
+    end_j = max(range(1, m + 1), key=lambda j: D[n][j])
+    i, j = n, end_j
+    start_j = end_j
+    while i > 0 and j > 0:
+        move = back[i][j]
+        if move == 0:
+            start_j = j
+            i, j = i - 1, j - 1
+        elif move == 1:
+            i -= 1
+        else:
+            j -= 1
+    return lo + start_j - 1, lo + end_j - 1
+
+
+def align_cards(cards, words, margin=5.0, min_confidence=0.5):
+    """Alinear todas las cards con la transcripción en una pasada, en orden.
+
+    Cada card se busca solo en una banda alrededor de su segmento
+    (segment_start - margin .. segment_end + margin) y nunca antes que la card
+    anterior, así una frase repetida no puede matchear otra ocurrencia.
+    Se prueba el texto de display y, si no alcanza, el texto del segmento.
+
+    Retorna por card (start, end, confidence, source) — start/end None si no hubo match.
+    """
+    floor = 0  # índice mínimo para la próxima card (monotonía)
+    results = []
+    for card in cards:
+        lo = max(floor, bisect.bisect_left(words.starts, card['segment_start'] - margin))
+        hi = bisect.bisect_right(words.starts, card['segment_end'] + margin)
+
+        best = None
+        for text, source in ((card['display_text'], 'word-level (display)'),
+                             (card['segment_text'], 'word-level (segment)')):
+            tokens = re.findall(r'\w+', text.lower())
+            span = align_phrase(tokens, words, lo, hi)
+            if span is None:
+                continue
+            first, last = span
+            window_str = ' '.join(words.norms(first, last + 1))
+            confidence = similarity(' '.join(tokens), window_str)
+            if confidence >= min_confidence:
+                best = (first, last, confidence, source)
+                break
+
+        if best:
+            first, last, confidence, source = best
+            results.append((words.start(first), words.end(last), confidence, source))
+            floor = first + 1
+        else:
+            results.append((None, None, 0.0, 'segment fallback'))
+    return results
 
 
 def parse_overlay_text_md(filepath):
@@ -160,6 +224,189 @@ def parse_overlay_text_md(filepath):
     return cards
 
 
+def get_video_info(video_path):
+    """Obtener resolución y framerate del video."""
+    cmd = [
+        "ffprobe", "-v", "quiet", "-print_format", "json",
+        "-show_streams", video_path
+    ]
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    info = json.loads(result.stdout)
+
+    video_stream = None
+    for s in info.get('streams', []):
+        if s['codec_type'] == 'video' and video_stream is None:
+            video_stream = s
+
+    width = int(video_stream['width']) if video_stream else 1920
+    height = int(video_stream['height']) if video_stream else 1080
+    fps = video_stream.get('r_frame_rate', '30/1') if video_stream else '30/1'
+    return {'width': width, 'height': height, 'fps': fps}
+
+
+def card_image_path(cards_dir, text, font_hash, fontsize, width, height):
+    """PNG cacheado de una card: clave = texto + fuente + tamaño + resolución."""
+    key = json.dumps([text, font_hash, fontsize, width, height], ensure_ascii=False)
+    return os.path.join(cards_dir, f"card-{hashlib.sha256(key.encode()).hexdigest()[:16]}.png")
+
+
+def rasterize_card(text, font_path, fontsize, width, height, dest_path):
+    """Dibujar una card (fondo negro + texto blanco centrado) como PNG RGBA a resolución completa.
+
+    Mismas reglas que los filtros drawtext: interlineado 140%, bloque centrado
+    vertical, cada línea centrada horizontal, líneas vacías ocupan su lugar.
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    img = Image.new("RGBA", (width, height), (0, 0, 0, 255))
+    draw = ImageDraw.Draw(img)
+    font = ImageFont.truetype(font_path, fontsize)
+
+    lines = text.split('\n')
+    line_height = int(fontsize * 1.4)  # interlineado ~140%
+    total_height = len(lines) * line_height
+    for line_idx, line_text in enumerate(lines):
+        if not line_text.strip():
+            continue
+        text_w = draw.textlength(line_text, font=font)
+        x = (width - text_w) / 2
+        y = (height - total_height) / 2 + line_idx * line_height
+        draw.text((x, y), line_text, font=font, fill=(255, 255, 255, 255), anchor="la")
+
+    tmp_path = dest_path + ".tmp.png"
+    img.save(tmp_path)
+    os.replace(tmp_path, dest_path)
+    return dest_path
+
+
+def has_pillow():
+    """Pillow es opcional: sin él las cards se dibujan con drawtext."""
+    return importlib.util.find_spec("PIL") is not None
+
+
+def rasterize_cards(cards, font_path, fontsize, base_info, cards_dir, workers=None):
+    """Rasterizar todas las cards en paralelo (las que ya estén en cache se reusan).
+
+    Retorna (imágenes por card, PNG transparente para los huecos).
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from PIL import Image
+
+    os.makedirs(cards_dir, exist_ok=True)
+    width, height = base_info['width'], base_info['height']
+    with open(font_path, "rb") as f:
+        font_hash = hashlib.sha256(f.read()).hexdigest()[:16]
+
+    images = [
+        card_image_path(cards_dir, card['display_text'], font_hash, fontsize, width, height)
+        for card in cards
+    ]
+    pending = {path: card['display_text'] for card, path in zip(cards, images) if not os.path.exists(path)}
+    if pending:
+        print(f"🖼️  Rasterizando {len(pending)} cards ({len(set(images)) - len(pending)} ya en cache)...")
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(rasterize_card, text, font_path, fontsize, width, height, path)
+                for path, text in pending.items()
+            ]
+            for future in futures:
+                future.result()
+    else:
+        print(f"♻️  {len(images)} cards desde cache")
+
+    blank = os.path.join(cards_dir, f"blank-{width}x{height}.png")
+    if not os.path.exists(blank):
+        Image.new("RGBA", (width, height), (0, 0, 0, 0)).save(blank)
+    return images, blank
+
+
+def card_track_windows(cards, t0, t1):
+    """Ventanas visibles [(start, end, idx)] dentro de [t0, t1]; si dos cards se pisan, gana la siguiente."""
+    windows = []
+    order = sorted(range(len(cards)), key=lambda i: cards[i]['start'])
+    for n, i in enumerate(order):
+        start = max(cards[i]['start'], t0)
+        end = min(cards[i]['end'], t1)
+        if n + 1 < len(order):
+            end = min(end, cards[order[n + 1]]['start'])
+        if windows:
+            start = max(start, windows[-1][1])
+        if end > start:
+            windows.append((start, end, i))
+    return windows
+
+
+def write_card_track(windows, images, blank, t0, t1, list_path):
+    """Lista ffconcat con las cards como stills entre t0 y t1 (huecos = PNG transparente).
+
+    Cada PNG se decodifica una sola vez; el filtro fps del grafo repite el frame.
+    """
+    entries = []
+    cursor = t0
+    for start, end, i in windows:
+        if start - cursor > 0.001:
+            entries.append((blank, start - cursor))
+        entries.append((images[i], end - start))
+        cursor = end
+    if t1 - cursor > 0.001 or not entries:
+        entries.append((blank, max(t1 - cursor, 0.001)))
+
+    with open(list_path, "w") as f:
+        f.write("ffconcat version 1.0\n")
+        for path, duration in entries:
+            f.write(f"file '{os.path.basename(path)}'\nduration {duration:.3f}\n")
+        # El concat demuxer ignora la duración de la última entrada si no se repite
+        f.write(f"file '{os.path.basename(entries[-1][0])}'\n")
+
+
+def build_drawtext_filters(cards, args, cards_dir):
+    """Filtros drawbox + drawtext por card (fallback sin Pillow o con --drawtext)."""
+    card_filters = []
+
+    for idx, card in enumerate(cards):
+        start = card['start']
+        end = card['end']
+        filters = []
+        card_filters.append(filters)
+
+        # Fondo negro
+        filters.append(
+            f"drawbox=x=0:y=0:w=iw:h=ih:color=black:t=fill:"
+            f"enable='between(t,{start:.2f},{end:.2f})'"
+        )
+
+        # Dividir texto en líneas para evitar el bug del cuadrito con newlines
+        lines = card['display_text'].split('\n')
+        num_lines = len(lines)
+        line_height = int(args.fontsize * 1.4)  # interlineado ~140%
+
+        for line_idx, line_text in enumerate(lines):
+            if not line_text.strip():
+                continue
+
+            # Escapar % para drawtext
+            escaped_line = line_text.replace('%', '％')  # fullwidth % (U+FF05)
+
+            # Escribir cada línea a su propio archivo
+            card_file = os.path.join(cards_dir, f"card_{idx:03d}_line_{line_idx:02d}.txt")
+            with open(card_file, 'w') as f:
+                f.write(escaped_line)
+
+            # Calcular Y centrado: el bloque completo se centra, cada línea se offsets
+            # y_centro = (h - alto_total) / 2 + line_idx * line_height
+            total_height = num_lines * line_height
+            y_expr = f"(h-{total_height})/2+{line_idx * line_height}"
+
+            filters.append(
+                f"drawtext=fontfile='{args.font}':"
+                f"textfile='{card_file}':"
+                f"fontcolor=white:fontsize={args.fontsize}:"
+                f"x=(w-text_w)/2:y={y_expr}:"
+                f"enable='between(t,{start:.2f},{end:.2f})'"
+            )
+    return card_filters
+
+
 def escape_drawtext(text):
     """Escapar texto para drawtext de ffmpeg."""
     # ffmpeg drawtext necesita escapar: ', \, :, ;
@@ -171,6 +418,36 @@ def escape_drawtext(text):
     return text
 
 
+def plan_splice_pieces(pieces, windows, fps):
+    """Partir los tramos 'encode' en clips de card ('card') y video base visible ('encode').
+
+    `windows` son las ventanas de card_track_windows (sin solapes). Los bordes de
+    cada card se redondean a frames para que las piezas no acumulen drift.
+    Retorna [(start, end, 'copy' | 'encode' | 'card'), ...].
+    """
+    def snap(t):
+        return round(t * fps) / fps
+
+    out = []
+    for start, end, mode in pieces:
+        if mode != "encode":
+            out.append((start, end, mode))
+            continue
+        cursor = start
+        for card_start, card_end, _ in windows:
+            card_start = max(snap(card_start), cursor)
+            card_end = min(snap(card_end), end)
+            if card_end - card_start <= 0.001:
+                continue
+            if card_start - cursor > 0.001:
+                out.append((cursor, card_start, "encode"))
+            out.append((card_start, card_end, "card"))
+            cursor = card_end
+        if end - cursor > 0.001:
+            out.append((cursor, end, "encode"))
+    return out
+
+
 def main():
     parser = argparse.ArgumentParser(description="Paso 8 — Text Overlay (Black Card)")
     parser.add_argument("video_dir", help="Carpeta del video")
@@ -181,8 +458,15 @@ def main():
     parser.add_argument("--min-duration", type=float, default=0.0, help="Duración mínima en pantalla en segundos (default: 0 = dura lo que la frase)")
     parser.add_argument("--pad-before", type=float, default=0.5, help="Padding antes de la frase (default: 0.5s)")
     parser.add_argument("--pad-after", type=float, default=0.3, help="Padding después de la frase (default: 0.3s)")
+    parser.add_argument("--drawtext", action="store_true", help="Dibujar las cards con drawtext en cada frame (sin pre-rasterizar)")
+    parser.add_argument("--workers", type=int, default=None, help="Procesos para rasterizar cards (default: CPUs)")
+    parser.add_argument("--align-margin", type=float, default=5.0, help="Segundos de margen alrededor del segmento para buscar cada card (default: 5)")
     parser.add_argument("--crf", type=int, default=18, help="Calidad CRF (default: 18)")
     parser.add_argument("--preset", default="fast", help="Preset de encoding (default: fast)")
+    parser.add_argument("--ranges", action="store_true", help="Re-encodear solo los tramos con text cards (snap a keyframes) y copiar el resto")
+    parser.add_argument("--splice", action="store_true", help="Cards como clips still (-tune stillimage) + audio original, copiando el video base entre cards (implica --ranges)")
+    parser.add_argument("--keyframes-at-inserts", action="store_true", help="Forzar keyframes en los cortes de tmp/insert_points.json (para inserts.py --smart)")
+    parser.add_argument("--probe", default=None, help="Video del que leer resolución/fps/duración cuando el input es un FIFO (lo pasa stream-steps.py)")
     parser.add_argument("--dry-run", action="store_true", help="Solo mostrar detecciones")
     
     args = parser.parse_args()
@@ -201,7 +485,7 @@ def main():
     else:
         output_path = os.path.join(video_out_dir, "8_video_text_overlay.mp4")
     
-    if not os.path.isfile(video_path):
+    if not (os.path.isfile(video_path) or is_stream(video_path)):
         print(f"❌ Video no encontrado: {video_path}")
         sys.exit(1)
     if not os.path.isfile(overlay_md):
@@ -265,10 +549,8 @@ def main():
         print(f"❌ transcription_original.json no encontrado: {transcription_json}")
         sys.exit(1)
     
-    # Cargar transcripción word-level
-    with open(transcription_json) as f:
-        transcription = json.load(f)
-    words = transcription.get('words', [])
+    # Cargar transcripción word-level (índice columnar si está disponible)
+    words = load_transcript(transcription_json)
     
     # Parsear marcas
     cards = parse_overlay_text_md(overlay_md)
@@ -282,34 +564,26 @@ def main():
     
     if not cards:
         print("⚠️  No hay frases marcadas con >>>")
+        if not args.dry_run and (is_stream(video_path) or is_stream(output_path)):
+            # Encadenado por FIFO: el stream tiene que pasar igual al paso siguiente
+            cmd = ["ffmpeg", "-y", "-i", video_path, "-map", "0:v:0", "-map", "0:a",
+                   *output_codec_args(output_path, args.crf, args.preset), output_path]
+            if subprocess.run(cmd).returncode != 0:
+                sys.exit(1)
+            print(f"📋 Sin cards — stream pasado tal cual a {output_path}")
         return
     
-    # Refinar timestamps con word-level
-    # Para cada card, buscar el DISPLAY TEXT en la transcripción word-level
-    for card in cards:
-        # Buscar el texto de display en el word-level (lo que realmente se dijo)
-        word_start, word_end = find_phrase_timestamps(card['display_text'], words)
-        if word_start is not None:
-            card['start'] = max(0.01, word_start - args.pad_before)
-            speech_duration = word_end - word_start + args.pad_before + args.pad_after
-            actual_duration = max(speech_duration, args.min_duration)
-            card['end'] = card['start'] + actual_duration
-            card['source'] = 'word-level (display)'
-        else:
-            # Fallback: buscar el texto del segmento
-            word_start2, word_end2 = find_phrase_timestamps(card['segment_text'], words)
-            if word_start2 is not None:
-                card['start'] = max(0.01, word_start2 - args.pad_before)
-                speech_duration = word_end2 - word_start2 + args.pad_before + args.pad_after
-                actual_duration = max(speech_duration, args.min_duration)
-                card['end'] = card['start'] + actual_duration
-                card['source'] = 'word-level (segment)'
-            else:
-                card['start'] = max(0.01, card['segment_start'] - args.pad_before)
-                speech_duration = card['segment_end'] - card['segment_start'] + args.pad_before + args.pad_after
-                actual_duration = max(speech_duration, args.min_duration)
-                card['end'] = card['start'] + actual_duration
-                card['source'] = 'segment fallback'
+    # Refinar timestamps con word-level: alineamiento monotónico de todas las cards
+    alignments = align_cards(cards, words, margin=args.align_margin)
+    for card, (word_start, word_end, confidence, source) in zip(cards, alignments):
+        if word_start is None:
+            word_start, word_end = card['segment_start'], card['segment_end']
+        card['start'] = max(0.01, word_start - args.pad_before)
+        speech_duration = word_end - word_start + args.pad_before + args.pad_after
+        actual_duration = max(speech_duration, args.min_duration)
+        card['end'] = card['start'] + actual_duration
+        card['source'] = source
+        card['confidence'] = confidence
     
     # Para bloques: asegurar que cards consecutivas no tengan gaps
     # (el negro debe ser continuo)
@@ -330,7 +604,8 @@ def main():
         duration = card['end'] - card['start']
         display_preview = card['display_text'].replace('\n', ' / ')
         block_info = f" [block {card['block_id']}]" if card['block_id'] else ""
-        print(f"   [{format_time(card['start'])} - {format_time(card['end'])}] ({duration:.1f}s) [{card['source']}]{block_info}")
+        low = " ⚠️" if card['confidence'] < 0.7 else ""
+        print(f"   [{format_time(card['start'])} - {format_time(card['end'])}] ({duration:.1f}s) [{card['source']} | conf {card['confidence']:.2f}{low}]{block_info}")
         print(f"   → \"{display_preview}\"")
         print()
     
@@ -342,67 +617,145 @@ def main():
     cards_dir = os.path.join(tmp_dir, "text_cards")
     os.makedirs(cards_dir, exist_ok=True)
     
-    filters = []
-    
-    for idx, card in enumerate(cards):
-        start = card['start']
-        end = card['end']
-        
-        # Fondo negro
-        filters.append(
-            f"drawbox=x=0:y=0:w=iw:h=ih:color=black:t=fill:"
-            f"enable='between(t,{start:.2f},{end:.2f})'"
-        )
-        
-        # Dividir texto en líneas para evitar el bug del cuadrito con newlines
-        lines = card['display_text'].split('\n')
-        num_lines = len(lines)
-        line_height = int(args.fontsize * 1.4)  # interlineado ~140%
-        
-        for line_idx, line_text in enumerate(lines):
-            if not line_text.strip():
-                continue
-            
-            # Escapar % para drawtext
-            escaped_line = line_text.replace('%', '％')  # fullwidth % (U+FF05)
-            
-            # Escribir cada línea a su propio archivo
-            card_file = os.path.join(cards_dir, f"card_{idx:03d}_line_{line_idx:02d}.txt")
-            with open(card_file, 'w') as f:
-                f.write(escaped_line)
-            
-            # Calcular Y centrado: el bloque completo se centra, cada línea se offsets
-            # y_centro = (h - alto_total) / 2 + line_idx * line_height
-            total_height = num_lines * line_height
-            y_expr = f"(h-{total_height})/2+{line_idx * line_height}"
-            
-            filters.append(
-                f"drawtext=fontfile='{args.font}':"
-                f"textfile='{card_file}':"
-                f"fontcolor=white:fontsize={args.fontsize}:"
-                f"x=(w-text_w)/2:y={y_expr}:"
-                f"enable='between(t,{start:.2f},{end:.2f})'"
-            )
+    # Keyframes forzados en los cortes que planeó inserts.py (Paso 9 --smart copia el video entero)
+    insert_points = []
+    if args.keyframes_at_inserts:
+        points_path = os.path.join(tmp_dir, "insert_points.json")
+        if os.path.isfile(points_path):
+            with open(points_path) as f:
+                insert_points = json.load(f).get("points", [])
+            print(f"🔑 Forzando keyframes en {len(insert_points)} puntos de inserción")
+        else:
+            print(f"⚠️  No existe {points_path}")
+            print(f"   Corré primero: python3 scripts/inserts.py {args.video_dir} --dry-run")
     
-    fc = ','.join(filters)
+    def keyframe_args(start, end):
+        """-force_key_frames para los puntos de inserción dentro de [start, end) (relativos al tramo)."""
+        points = [f"{t - start:.3f}" for t in insert_points if start <= t < end]
+        return ["-force_key_frames", ",".join(points)] if points else []
     
-    cmd = [
-        "ffmpeg",
-        "-i", video_path,
-        "-vf", fc,
-        "-c:v", "libx264", "-crf", str(args.crf), "-preset", args.preset,
-        "-c:a", "copy", "-y", output_path
-    ]
+    # Cards pre-rasterizadas con Pillow (una imagen por card) o drawtext por frame como fallback
+    # Un FIFO no se puede probar sin consumirlo: stream-steps.py pasa el video original en --probe
+    probe_path = args.probe or video_path
+    base_info = get_video_info(probe_path)
+    card_images = None
+    if not args.drawtext:
+        if has_pillow():
+            card_images, blank = rasterize_cards(cards, args.font, args.fontsize, base_info, cards_dir, args.workers)
+        else:
+            print("⚠️  Sin Pillow no se pueden pre-rasterizar las cards (pip3 install Pillow) — usando drawtext")
+
+    if card_images is None:
+        card_filters = build_drawtext_filters(cards, args, cards_dir)
+        fc = ','.join(f for filters in card_filters for f in filters)
+
+    def video_filter_args(start, end, track_name):
+        """Args de filtros para el intervalo [start, end] del video (en tiempo absoluto)."""
+        if card_images is None:
+            piece_filters = [
+                f for card, filters in zip(cards, card_filters)
+                if card['start'] < end and card['end'] > start
+                for f in filters
+            ]
+            # El tramo arranca en t=0: se lleva al tiempo absoluto para que los enable sigan valiendo
+            piece_vf = ",".join([f"setpts=PTS-STARTPTS+{start:.3f}/TB", *piece_filters, "setpts=PTS-STARTPTS"])
+            return ["-vf", piece_vf, "-map", "0:v:0", "-map", "0:a"]
+
+        # Un solo overlay: la pista de cards (stills concatenados) sobre el video base
+        windows = card_track_windows(cards, start, end)
+        track = os.path.join(cards_dir, track_name)
+        write_card_track(windows, card_images, blank, start, end, track)
+        enable = "+".join(f"between(t,{s:.3f},{e:.3f})" for s, e, _ in windows) or "0"
+        # format antes de fps: los PNG del concat fijan un solo formato con alpha
+        # (las cards y el blank pueden decodificar distinto) y el overlay no lo renegocia a mitad del tramo
+        graph = (
+            f"[0:v]setpts=PTS-STARTPTS+{start:.3f}/TB[base];"
+            f"[1:v]format=yuva420p,fps={base_info['fps']},setpts=PTS-STARTPTS+{start:.3f}/TB[cards];"
+            f"[base][cards]overlay=0:0:eof_action=pass:enable='{enable}',setpts=PTS-STARTPTS[vout]"
+        )
+        return ["-f", "concat", "-safe", "0", "-i", track,
+                "-filter_complex", graph, "-map", "[vout]", "-map", "0:a"]
+
+    def card_piece(start, end):
+        """Video de una pieza --splice: la card como still (o negro + drawtext) de start a end."""
+        idx = max(card_track_windows(cards, start, end), key=lambda w: w[1] - w[0])[2]
+        duration = f"{end - start:.3f}"
+        if card_images is not None:
+            return ["-loop", "1", "-framerate", base_info['fps'], "-t", duration, "-i", card_images[idx]], keyframe_args(start, end)
+        color = f"color=c=black:s={base_info['width']}x{base_info['height']}:r={base_info['fps']}:d={duration}"
+        card_vf = ",".join([f"setpts=PTS-STARTPTS+{start:.3f}/TB", *card_filters[idx], "setpts=PTS-STARTPTS"])
+        return ["-f", "lavfi", "-i", color], ["-vf", card_vf, *keyframe_args(start, end)]
+
+    if card_images is None:
+        cmd = [
+            "ffmpeg",
+            "-i", video_path,
+            "-vf", fc,
+            *output_codec_args(output_path, args.crf, args.preset),
+            *keyframe_args(0.0, float("inf")),
+            "-y", output_path
+        ]
+    else:
+        cmd = [
+            "ffmpeg",
+            "-i", video_path,
+            *video_filter_args(0.0, get_duration(probe_path), "track.ffconcat"),
+            *output_codec_args(output_path, args.crf, args.preset),
+            *keyframe_args(0.0, float("inf")),
+            "-y", output_path
+        ]
+
+    params = None
+    if args.splice:
+        args.ranges = True
+    if args.ranges and (is_stream(video_path) or is_stream(output_path)):
+        flag = "--splice" if args.splice else "--ranges"
+        print(f"⚠️  {flag} necesita leer el video con seek — no funciona encadenado por FIFO. Re-encodeando todo.")
+        args.ranges = args.splice = False
+    if args.ranges:
+        params = get_stream_params(video_path)
+        if params.get("vcodec") != "h264" or params.get("acodec") != "aac":
+            flag = "--splice" if args.splice else "--ranges"
+            print(f"⚠️  {flag} requiere H.264 + AAC (es {params.get('vcodec')} + {params.get('acodec')}). Re-encodeando todo.")
+            args.ranges = args.splice = False
     
     print(f"🎬 Aplicando {len(cards)} text cards...")
     print(f"📤 Output: {output_path}\n")
     
-    result = subprocess.run(cmd)
+    if args.ranges:
+        # Render por tramos: solo se re-encodea donde hay text cards
+        duration = get_duration(video_path)
+        pieces = plan_render_ranges([(c['start'], c['end']) for c in cards], get_keyframes(video_path), duration)
+        if args.splice:
+            num, _, den = params.get("fps", "30/1").partition("/")
+            pieces = plan_splice_pieces(pieces, card_track_windows(cards, 0.0, duration), float(num) / float(den or 1))
+        encoded = sum(e - s for s, e, mode in pieces if mode == "encode")
+        stills = sum(e - s for s, e, mode in pieces if mode == "card")
+        print(f"✂️  Tramos: re-encode {format_time(encoded)} de {format_time(duration)} "
+              f"({encoded / duration * 100:.0f}%) | {len(pieces)} piezas")
+        if args.splice:
+            print(f"🃏 Cards como stills: {format_time(stills)} sin decodificar el video base")
+        
+        def encode_piece(start, end):
+            if args.splice:
+                # Entre cards solo queda video base visible: re-encode sin filtros
+                return ["-map", "0:v:0", "-map", "0:a", *keyframe_args(start, end)]
+            return [*video_filter_args(start, end, f"track_{start:09.3f}.ffconcat"), *keyframe_args(start, end)]
+        
+        pieces_dir = os.path.join(tmp_dir, "text_pieces")
+        commands, concat = range_commands(video_path, output_path, pieces, pieces_dir,
+                                          encode_piece, args.crf, args.preset, params, card_piece)
+        returncode = run_range_commands(commands, concat, pieces_dir)
+    else:
+        returncode = subprocess.run(cmd).returncode
     
-    if result.returncode != 0:
-        print(f"\n❌ Error (código {result.returncode})")
+    if returncode != 0:
+        print(f"\n❌ Error (código {returncode})")
         sys.exit(1)
     
+    if is_stream(output_path):
+        print(f"\n✅ Listo: {output_path} (stream)")
+        return
     size_mb = os.path.getsize(output_path) / (1024 * 1024)
     print(f"\n✅ Listo: {output_path} ({size_mb:.0f} MB)")
 
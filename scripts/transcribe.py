@@ -10,6 +10,8 @@ Uso:
     python3 transcribe.py ~/ruta/al/folder --input 4_video_jumpcut.mp4
     python3 transcribe.py ~/ruta/al/folder --audio-only
     python3 transcribe.py ~/ruta/al/folder --dry-run
+    python3 transcribe.py ~/ruta/al/folder --chunked --workers 4
+    python3 transcribe.py ~/ruta/al/folder --backend local --threads 8
 """
 
 import argparse
@@ -17,8 +19,12 @@ import json
 import os
 import subprocess
 import sys
+import time
+from abc import ABC, abstractmethod
 from pathlib import Path
 
+from transcript_index import write_transcript_index
+
 
 def get_api_key():
     """Busca OPENAI_API_KEY en entorno o en .env de workspace."""
@@ -36,11 +42,21 @@ def get_api_key():
     return None
 
 
-def extract_audio(video_path: Path, audio_path: Path, dry_run: bool = False):
-    """Extrae audio del video como OGG comprimido."""
+def extract_audio(video_path: Path, audio_path: Path, dry_run: bool = False, keep=None):
+    """Extrae audio del video como OGG comprimido.
+
+    Si se pasa `keep` ([(start, end, stripped_start), ...]), solo se conservan
+    esos intervalos: los silencios largos no se suben.
+    """
+    select_args = []
+    if keep:
+        expr = "+".join(f"between(t,{start:.3f},{end:.3f})" for start, end, _ in keep)
+        select_args = ["-af", f"aselect='{expr}',asetpts=N/SR/TB"]
+
     cmd = [
         "ffmpeg", "-i", str(video_path),
         "-vn",                    # sin video
+        *select_args,             # (opcional) solo los intervalos con voz
         "-ac", "1",               # mono (Whisper no necesita estéreo)
         "-ar", "16000",           # 16kHz (suficiente para speech)
         "-c:a", "libopus",        # Opus = excelente compresión
@@ -51,7 +67,7 @@ def extract_audio(video_path: Path, audio_path: Path, dry_run: bool = False):
     print(f"📎 Extrayendo audio: {video_path.name} → {audio_path.name}")
 
     if dry_run:
-        print(f"   [DRY RUN] {' '.join(cmd)}")
+        print(f"   [DRY RUN] {' '.join(cmd) if not keep else 'ffmpeg -i ... -af aselect=... ' + str(audio_path)}")
         return
 
     result = subprocess.run(cmd, capture_output=True, text=True)
@@ -63,30 +79,81 @@ def extract_audio(video_path: Path, audio_path: Path, dry_run: bool = False):
     print(f"   ✅ Audio extraído: {audio_path.name} ({size_mb:.1f} MB)")
 
 
-def transcribe_audio(audio_path: Path, api_key: str, model: str, language: str, dry_run: bool = False):
-    """Envía audio a Whisper API con word-level timestamps."""
-    import urllib.request
-    import urllib.error
+def keep_intervals(duration, silences, pad=0.25):
+    """Intervalos con voz (inversión de los silencios, con `pad` de aire a cada lado).
+
+    Retorna [(start, end, stripped_start), ...]: dónde empieza cada intervalo
+    en el timeline original y en el audio recortado que se sube.
+    """
+    keep = []
+    cursor = 0.0
+    for s_start, s_end in sorted(silences):
+        end = min(duration, s_start + pad)
+        if end > cursor:
+            keep.append([cursor, end])
+        cursor = max(cursor, s_end - pad)
+    if cursor < duration:
+        keep.append([cursor, duration])
 
-    url = "https://api.openai.com/v1/audio/transcriptions"
+    intervals = []
+    stripped_t = 0.0
+    for start, end in keep:
+        if intervals and start <= intervals[-1][1]:
+            # Intervalos que se tocan por el padding → uno solo
+            prev_start, _, prev_stripped = intervals.pop()
+            stripped_t = prev_stripped
+            start = prev_start
+        intervals.append((start, end, stripped_t))
+        stripped_t += end - start
+    return intervals
 
-    print(f"🎤 Transcribiendo con Whisper ({model}, idioma: {language})...")
 
-    if dry_run:
-        print(f"   [DRY RUN] POST {url}")
-        print(f"   model={model}, language={language}, timestamp_granularities=[word, segment]")
-        return None
+def to_original_time(t, keep, starts=None):
+    """Tiempo del audio recortado → tiempo original."""
+    import bisect
 
-    # Construir multipart form data manualmente
-    boundary = "----TranscribePy"
-    audio_data = audio_path.read_bytes()
-    filename = audio_path.name
+    if starts is None:
+        starts = [stripped for _, _, stripped in keep]
+    i = max(0, bisect.bisect_right(starts, t) - 1)
+    start, end, stripped = keep[i]
+    return min(start + (t - stripped), end)
 
-    body = (
+
+def remap_to_original(data, keep):
+    """Lleva words y segments del audio recortado al timeline original del video."""
+    starts = [stripped for _, _, stripped in keep]
+    for key in ("words", "segments"):
+        for item in data.get(key, []):
+            item["start"] = round(to_original_time(item["start"], keep, starts), 3)
+            item["end"] = round(to_original_time(item["end"], keep, starts), 3)
+            if item["end"] < item["start"]:
+                item["end"] = item["start"]
+    if keep:
+        data["duration"] = round(keep[-1][1], 3)
+    return data
+
+
+WHISPER_URL = "https://api.openai.com/v1/audio/transcriptions"
+
+# Cache compartida de transcripciones (clave: hash del PCM + modelo + idioma)
+CACHE_DIR = Path.home() / "Documents" / "Edicion" / "Serudda" / "recursos" / "cache" / "transcription"
+
+# Límite de la API para el archivo subido (25 MB) con margen
+MAX_UPLOAD_BYTES = 24 * 1024 * 1024
+
+
+class RetryableError(Exception):
+    """Error transitorio de la API (429, 5xx, red) — vale la pena reintentar."""
+
+
+def multipart_envelope(audio_path: Path, model: str, language: str, boundary: str = "----TranscribePy"):
+    """Cabecera y cola del multipart/form-data. El archivo va en el medio, en streaming."""
+    head = (
         f"--{boundary}\r\n"
-        f'Content-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Disposition: form-data; name="file"; filename="{audio_path.name}"\r\n'
         f"Content-Type: audio/ogg\r\n\r\n"
-    ).encode() + audio_data + (
+    ).encode()
+    tail = (
         f"\r\n--{boundary}\r\n"
         f'Content-Disposition: form-data; name="model"\r\n\r\n'
         f"{model}\r\n"
@@ -104,18 +171,169 @@ def transcribe_audio(audio_path: Path, api_key: str, model: str, language: str,
         f"segment\r\n"
         f"--{boundary}--\r\n"
     ).encode()
+    return head, tail, boundary
+
+
+class UploadProgress:
+    """Cuenta bytes enviados y muestra el throughput de subida.
+
+    El throughput se mide hasta que se entregó el último bloque del body, no
+    hasta la respuesta: la espera mientras el servidor transcribe no cuenta.
+    """
+
+    def __init__(self, total, label, live=True):
+        self.total = total
+        self.label = label
+        self.live = live
+        self.sent = 0
+        self.started = time.monotonic()
+        self.finished = None
+        self.last_print = 0.0
+
+    def update(self, n):
+        self.sent += n
+        now = time.monotonic()
+        if self.sent >= self.total and self.finished is None:
+            self.finished = now
+        if self.live and (now - self.last_print > 0.5 or self.sent == self.total):
+            self.last_print = now
+            print(f"\r   ⬆️  {self.label}: {self.sent / 1048576:.1f}/{self.total / 1048576:.1f} MB "
+                  f"({self.rate() / 1048576:.2f} MB/s)", end="", flush=True)
+
+    def rate(self):
+        elapsed = max((self.finished or time.monotonic()) - self.started, 1e-6)
+        return self.sent / elapsed
+
+    def finish(self):
+        if self.live:
+            print()
+
+
+def iter_multipart(audio_path: Path, head: bytes, tail: bytes, progress: UploadProgress,
+                   block_size: int = 256 * 1024):
+    """Genera el body multipart leyendo el archivo por bloques (nunca entero en memoria)."""
+    yield head
+    progress.update(len(head))
+    with open(audio_path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            yield block
+            progress.update(len(block))
+    yield tail
+    progress.update(len(tail))
+
+
+_connections = None
+
+
+def get_connection(url: str, timeout: int):
+    """Conexión HTTP keep-alive reutilizable (una por thread y por host).
+
+    Respeta HTTPS_PROXY / NO_PROXY para endpoints https: túnel CONNECT a través
+    de un proxy http://, con usuario:clave si el proxy los trae. Los endpoints
+    http (un servidor local con --api-url) van siempre directo.
+    """
+    import base64
+    import http.client
+    import threading
+    from urllib.parse import unquote, urlsplit
+    from urllib.request import getproxies, proxy_bypass
+
+    global _connections
+    if _connections is None:
+        _connections = threading.local()
+    pool = getattr(_connections, "pool", None)
+    if pool is None:
+        pool = _connections.pool = {}
+
+    parts = urlsplit(url)
+    key = (parts.scheme, parts.hostname, parts.port)
+    conn = pool.get(key)
+    if conn is None:
+        proxy = getproxies().get("https") if parts.scheme == "https" else None
+        if proxy and not proxy_bypass(parts.hostname):
+            proxy = urlsplit(proxy if "://" in proxy else f"http://{proxy}")
+            # CONNECT en claro contra el proxy; el TLS con la API va adentro del túnel
+            conn = http.client.HTTPSConnection(proxy.hostname, proxy.port or 80, timeout=timeout)
+            headers = {}
+            if proxy.username:
+                credentials = f"{unquote(proxy.username)}:{unquote(proxy.password or '')}"
+                headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode()
+            conn.set_tunnel(parts.hostname, parts.port or 443, headers=headers)
+        else:
+            cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            conn = cls(parts.hostname, parts.port, timeout=timeout)
+        pool[key] = conn
+    return conn, key
+
+
+def drop_connection(key):
+    """Cierra y descarta una conexión del pool (después de un error de red)."""
+    pool = getattr(_connections, "pool", {}) if _connections is not None else {}
+    conn = pool.pop(key, None)
+    if conn is not None:
+        conn.close()
+
+
+def post_transcription(audio_path: Path, api_key: str, model: str, language: str,
+                       url: str = WHISPER_URL, timeout: int = 300, live_progress: bool = True,
+                       stats: dict = None):
+    """POST en streaming de un archivo a la API. Lanza RetryableError en errores transitorios.
 
-    req = urllib.request.Request(url, data=body, method="POST")
-    req.add_header("Authorization", f"Bearer {api_key}")
-    req.add_header("Content-Type", f"multipart/form-data; boundary={boundary}")
+    Si se pasa `stats`, se completa con los bytes subidos y el throughput (bytes/s).
+    """
+    import http.client
+    from urllib.parse import urlsplit
+
+    head, tail, boundary = multipart_envelope(audio_path, model, language)
+    total = len(head) + audio_path.stat().st_size + len(tail)
+    progress = UploadProgress(total, audio_path.name, live=live_progress)
+
+    parts = urlsplit(url)
+    path = parts.path + (f"?{parts.query}" if parts.query else "")
+    conn, key = get_connection(url, timeout)
 
     try:
-        with urllib.request.urlopen(req, timeout=300) as resp:
-            data = json.loads(resp.read().decode())
-    except urllib.error.HTTPError as e:
-        error_body = e.read().decode() if e.fp else ""
-        print(f"❌ Whisper API error {e.code}: {error_body}", file=sys.stderr)
-        sys.exit(1)
+        conn.request("POST", path or "/", body=iter_multipart(audio_path, head, tail, progress), headers={
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": f"multipart/form-data; boundary={boundary}",
+            "Content-Length": str(total),
+            "Connection": "keep-alive",
+        })
+        resp = conn.getresponse()
+        body = resp.read().decode()
+    except (http.client.HTTPException, OSError) as e:
+        progress.finish()
+        drop_connection(key)
+        raise RetryableError(str(e) or type(e).__name__)
+
+    progress.finish()
+    if resp.will_close:
+        drop_connection(key)
+    if stats is not None:
+        stats["bytes"] = progress.sent
+        stats["rate"] = progress.rate()
+
+    if resp.status == 429 or resp.status >= 500:
+        raise RetryableError(f"HTTP {resp.status}: {body[:200]}")
+    if resp.status >= 400:
+        raise RuntimeError(f"Whisper API error {resp.status}: {body}")
+
+    return json.loads(body)
+
+
+def transcribe_audio(audio_path: Path, api_key: str, model: str, language: str, dry_run: bool = False,
+                     url: str = WHISPER_URL):
+    """Envía audio a Whisper API con word-level timestamps."""
+    print(f"🎤 Transcribiendo con Whisper ({model}, idioma: {language})...")
+
+    if dry_run:
+        print(f"   [DRY RUN] POST {url}")
+        print(f"   model={model}, language={language}, timestamp_granularities=[word, segment]")
+        return None
+
+    try:
+        # Mismos reintentos que el modo chunked: un 429/5xx o un socket caído no tira la corrida
+        data = post_with_retries(audio_path, api_key, model, language, url, RateLimiter(0), live_progress=True)
     except Exception as e:
         print(f"❌ Error llamando a Whisper API: {e}", file=sys.stderr)
         sys.exit(1)
@@ -127,6 +345,514 @@ def transcribe_audio(audio_path: Path, api_key: str, model: str, language: str,
     return data
 
 
+def get_audio_duration(audio_path: Path):
+    """Duración del audio con ffprobe."""
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration",
+         "-of", "csv=p=0", str(audio_path)],
+        capture_output=True, text=True
+    )
+    return float(result.stdout.strip())
+
+
+def detect_silences(audio_path: Path, noise_db: int = -35, min_detect: float = 0.5):
+    """Silencios del audio con silencedetect → [(start, end), ...]."""
+    import re
+
+    result = subprocess.run(
+        ["ffmpeg", "-i", str(audio_path),
+         "-af", f"silencedetect=noise={noise_db}dB:d={min_detect}",
+         "-f", "null", "-"],
+        capture_output=True, text=True
+    )
+    silences = []
+    current_start = None
+    for line in result.stderr.split("\n"):
+        m_start = re.search(r'silence_start:\s*([\d.]+)', line)
+        m_end = re.search(r'silence_end:\s*([\d.]+)', line)
+        if m_start:
+            current_start = float(m_start.group(1))
+        if m_end and current_start is not None:
+            silences.append((current_start, float(m_end.group(1))))
+            current_start = None
+    return silences
+
+
+def plan_chunks(duration, silences, max_chunk=600.0, min_chunk=60.0):
+    """Elige puntos de corte en el medio de silencios para que ningún chunk pase de max_chunk.
+
+    Retorna los límites [(start, end), ...] sin solapamiento. Si no hay
+    silencio disponible en la ventana, corta en seco en max_chunk.
+    """
+    midpoints = sorted((s + e) / 2 for s, e in silences)
+    bounds = []
+    start = 0.0
+    while duration - start > max_chunk:
+        limit = start + max_chunk
+        candidates = [m for m in midpoints if start + min_chunk <= m <= limit]
+        cut = candidates[-1] if candidates else limit
+        bounds.append((start, cut))
+        start = cut
+    bounds.append((start, duration))
+    return bounds
+
+
+def extract_chunk(audio_path: Path, chunk_path: Path, start: float, end: float):
+    """Extrae [start, end) del audio como OGG/Opus (mismo formato que extract_audio)."""
+    result = subprocess.run(
+        # -ss antes de -i: seek en el input (exacto en audio) sin decodificar desde 0 en cada chunk
+        ["ffmpeg", "-ss", f"{start:.3f}", "-i", str(audio_path),
+         "-t", f"{end - start:.3f}",
+         "-c:a", "libopus", "-b:a", "48k",
+         "-y", str(chunk_path)],
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Error extrayendo chunk {chunk_path.name}:\n{result.stderr[-500:]}")
+
+
+class RateLimiter:
+    """Espacia el inicio de requests: como mucho `per_minute` por minuto entre todos los threads."""
+
+    def __init__(self, per_minute):
+        import threading
+
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self.lock = threading.Lock()
+        self.next_slot = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def post_with_retries(chunk_path: Path, api_key, model, language, url, limiter,
+                      retries=5, backoff=2.0, stats=None, live_progress=False):
+    """POST con reintentos y backoff exponencial (2s, 4s, 8s...) para errores transitorios."""
+    import random
+
+    for attempt in range(retries + 1):
+        limiter.wait()
+        try:
+            return post_transcription(chunk_path, api_key, model, language, url=url,
+                                      live_progress=live_progress, stats=stats)
+        except RetryableError as e:
+            if attempt == retries:
+                raise RuntimeError(f"{chunk_path.name}: sin éxito tras {retries} reintentos ({e})")
+            delay = backoff * (2 ** attempt) + random.uniform(0, 0.5)
+            print(f"   ⚠️  {chunk_path.name}: {e} — reintento {attempt + 1}/{retries} en {delay:.1f}s")
+            time.sleep(delay)
+
+
+def merge_chunk_results(results):
+    """Une los verbose_json de cada chunk en uno solo.
+
+    `results` es [(chunk_start, chunk_end, own_start, own_end, data), ...] donde
+    chunk_start es el offset real del audio subido y [own_start, own_end) es
+    la porción que le "pertenece" al chunk. Las palabras/segmentos del solape
+    se quedan en el chunk que contiene su punto medio (sin duplicados).
+    """
+    words = []
+    segments = []
+    for chunk_start, _, own_start, own_end, data in sorted(results, key=lambda r: r[0]):
+        for w in data.get("words", []):
+            start, end = w["start"] + chunk_start, w["end"] + chunk_start
+            if own_start <= (start + end) / 2 < own_end:
+                words.append({**w, "start": round(start, 3), "end": round(end, 3)})
+        for seg in data.get("segments", []):
+            start, end = seg["start"] + chunk_start, seg["end"] + chunk_start
+            if own_start <= (start + end) / 2 < own_end:
+                segments.append({**seg, "start": round(start, 3), "end": round(end, 3)})
+
+    for idx, seg in enumerate(segments):
+        seg["id"] = idx
+
+    last = max(results, key=lambda r: r[0]) if results else None
+    first_data = results[0][4] if results else {}
+    return {
+        "task": first_data.get("task", "transcribe"),
+        "language": first_data.get("language"),
+        "duration": round(last[3], 3) if last else 0.0,
+        "text": " ".join(seg.get("text", "").strip() for seg in segments),
+        "segments": segments,
+        "words": words,
+    }
+
+
+def transcribe_chunked(audio_path: Path, tmp_dir: Path, api_key: str, model: str, language: str,
+                       url: str = WHISPER_URL, max_chunk: float = 600.0, overlap: float = 1.0,
+                       workers: int = 4, per_minute: int = 50, dry_run: bool = False):
+    """Transcribe audios largos: cortes en silencios, uploads concurrentes y merge con offsets."""
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    print(f"🎤 Transcribiendo en chunks con Whisper ({model}, idioma: {language})...")
+    print(f"   chunks ≤ {max_chunk / 60:.0f} min | solape {overlap}s | {workers} workers | ≤ {per_minute} req/min")
+
+    if dry_run:
+        print(f"   [DRY RUN] silencedetect → chunks → POST {url} en paralelo")
+        return None
+
+    duration = get_audio_duration(audio_path)
+    bounds = plan_chunks(duration, detect_silences(audio_path), max_chunk=max_chunk)
+
+    chunk_dir = tmp_dir / "whisper_chunks"
+    chunk_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = []
+    for i, (own_start, own_end) in enumerate(bounds):
+        chunk_start = max(0.0, own_start - overlap)
+        chunk_end = min(duration, own_end + overlap)
+        chunk_path = chunk_dir / f"chunk_{i:03d}.ogg"
+        extract_chunk(audio_path, chunk_path, chunk_start, chunk_end)
+        jobs.append((chunk_path, chunk_start, chunk_end, own_start, own_end))
+        print(f"   ✂️  {chunk_path.name}: {format_ts(own_start)} → {format_ts(own_end)}")
+
+    limiter = RateLimiter(per_minute)
+    results = []
+    failed = None
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for chunk_path, chunk_start, chunk_end, own_start, own_end in jobs:
+            stats = {}
+            future = pool.submit(post_with_retries, chunk_path, api_key, model, language, url, limiter,
+                                 stats=stats)
+            futures[future] = (chunk_path, chunk_start, chunk_end, own_start, own_end, stats)
+        for future in as_completed(futures):
+            chunk_path, chunk_start, chunk_end, own_start, own_end, stats = futures[future]
+            try:
+                data = future.result()
+            except Exception as e:
+                # Los chunks que no arrancaron se cancelan; el pool espera solo a los que están subiendo
+                failed = e
+                for other in futures:
+                    other.cancel()
+                break
+            results.append((chunk_start, chunk_end, own_start, own_end, data))
+            rate = stats.get("rate", 0) / 1048576
+            print(f"   ✅ {chunk_path.name} ({len(results)}/{len(jobs)}) — subida {rate:.2f} MB/s")
+
+    for chunk_path, *_ in jobs:
+        chunk_path.unlink(missing_ok=True)
+
+    if failed:
+        print(f"❌ {failed}", file=sys.stderr)
+        sys.exit(1)
+
+    data = merge_chunk_results(results)
+    data["duration"] = round(duration, 3)
+    print(f"   ✅ Transcripción completa: {len(data['words'])} palabras, {len(data['segments'])} segmentos")
+    return data
+
+
+class TranscriptionBackend(ABC):
+    """Interfaz de backend: transcribe(audio_path) → dict verbose_json.
+
+    Todos los backends devuelven el mismo formato que la API de OpenAI
+    (`words`, `segments`, `duration`, `text`), así generate_clean_transcription
+    y los pasos de overlay no saben ni les importa quién transcribió.
+    """
+
+    name = "base"
+
+    def describe(self):
+        return self.name
+
+    def cache_identity(self):
+        """Qué transcribe (servicio/endpoint + modelo): entra en la clave de la cache."""
+        return self.name
+
+    @abstractmethod
+    def transcribe(self, audio_path: Path, dry_run: bool = False):
+        """verbose_json del audio, o None con dry_run."""
+
+
+class OpenAIBackend(TranscriptionBackend):
+    """Whisper API (OpenAI). Usa el modo chunked si se pide o si el audio pasa de 24 MB."""
+
+    name = "openai"
+
+    def __init__(self, api_key, model, language, tmp_dir: Path, url=WHISPER_URL, chunked=False,
+                 chunk_minutes=10.0, workers=4, per_minute=50):
+        self.api_key = api_key
+        self.model = model
+        self.language = language
+        self.tmp_dir = tmp_dir
+        self.url = url
+        self.chunked = chunked
+        self.chunk_minutes = chunk_minutes
+        self.workers = workers
+        self.per_minute = per_minute
+
+    def describe(self):
+        return f"openai ({self.model})"
+
+    def cache_identity(self):
+        # El endpoint también: un servidor compatible (o uno de prueba) no llena la cache de la API real
+        return f"openai:{self.url}:{self.model}"
+
+    def transcribe(self, audio_path: Path, dry_run: bool = False):
+        chunked = self.chunked
+        if not chunked and not dry_run and audio_path.stat().st_size > MAX_UPLOAD_BYTES:
+            print(f"   ⚠️  El audio pasa de {MAX_UPLOAD_BYTES // (1024 * 1024)} MB — usando modo chunked")
+            chunked = True
+
+        if chunked:
+            return transcribe_chunked(
+                audio_path, self.tmp_dir, self.api_key, self.model, self.language, url=self.url,
+                max_chunk=self.chunk_minutes * 60, workers=self.workers,
+                per_minute=self.per_minute, dry_run=dry_run
+            )
+        return transcribe_audio(audio_path, self.api_key, self.model, self.language,
+                                dry_run=dry_run, url=self.url)
+
+
+class LocalBackend(TranscriptionBackend):
+    """Whisper local en CPU: faster-whisper (en proceso) o whisper.cpp (subprocess).
+
+    - faster-whisper: `pip3 install faster-whisper`. `threads` = cpu_threads,
+      `batch_size` > 1 usa BatchedInferencePipeline.
+    - whisper.cpp: binario `whisper-cli` + modelo ggml (`--local-model` = ruta al .bin).
+      `threads` = -t (por procesador), `processors` = -p (corta el audio en N
+      partes que corren en paralelo). whisper.cpp no tiene batch.
+    """
+
+    name = "local"
+
+    def __init__(self, engine, model, language, tmp_dir: Path, threads=None, batch_size=8,
+                 processors=1, binary="whisper-cli"):
+        self.engine = engine
+        self.model = model
+        self.language = language
+        self.tmp_dir = tmp_dir
+        self.threads = threads or os.cpu_count() or 4
+        self.batch_size = batch_size
+        self.processors = processors
+        self.binary = binary
+
+    def describe(self):
+        if self.engine == "whisper.cpp":
+            return f"local {self.engine} ({self.model}, {self.threads} threads × {self.processors} procesadores)"
+        return f"local {self.engine} ({self.model}, {self.threads} threads, batch {self.batch_size})"
+
+    def cache_identity(self):
+        return f"local:{self.engine}:{self.model}"
+
+    def transcribe(self, audio_path: Path, dry_run: bool = False):
+        print(f"🎤 Transcribiendo local con {self.describe()}, idioma: {self.language}...")
+        if dry_run:
+            print(f"   [DRY RUN] {self.engine} sobre {audio_path.name}")
+            return None
+        if self.engine == "whisper.cpp":
+            data = self._transcribe_whisper_cpp(audio_path)
+        else:
+            data = self._transcribe_faster_whisper(audio_path)
+        print(f"   ✅ Transcripción completa: {len(data['words'])} palabras, {len(data['segments'])} segmentos")
+        return data
+
+    def _transcribe_faster_whisper(self, audio_path: Path):
+        try:
+            from faster_whisper import WhisperModel, BatchedInferencePipeline
+        except ImportError:
+            print("❌ Necesitas faster-whisper: pip3 install faster-whisper", file=sys.stderr)
+            sys.exit(1)
+
+        model = WhisperModel(self.model, device="cpu", compute_type="int8", cpu_threads=self.threads)
+        if self.batch_size > 1:
+            pipeline = BatchedInferencePipeline(model=model)
+            segments_iter, info = pipeline.transcribe(
+                str(audio_path), language=self.language, word_timestamps=True, batch_size=self.batch_size
+            )
+        else:
+            segments_iter, info = model.transcribe(str(audio_path), language=self.language, word_timestamps=True)
+
+        segments = []
+        words = []
+        for seg in segments_iter:
+            segments.append({
+                "id": len(segments),
+                "start": round(seg.start, 3),
+                "end": round(seg.end, 3),
+                "text": seg.text,
+            })
+            for w in seg.words or []:
+                words.append({"word": w.word.strip(), "start": round(w.start, 3), "end": round(w.end, 3)})
+
+        return {
+            "task": "transcribe",
+            "language": info.language,
+            "duration": round(info.duration, 3),
+            "text": " ".join(seg["text"].strip() for seg in segments),
+            "segments": segments,
+            "words": words,
+        }
+
+    def _transcribe_whisper_cpp(self, audio_path: Path):
+        # whisper.cpp solo lee WAV 16 kHz mono
+        wav_path = self.tmp_dir / "audio_for_whisper_cpp.wav"
+        out_prefix = self.tmp_dir / "whisper_cpp_output"
+        subprocess.run(
+            ["ffmpeg", "-i", str(audio_path), "-ac", "1", "-ar", "16000", "-c:a", "pcm_s16le",
+             "-y", str(wav_path)],
+            capture_output=True, check=True
+        )
+        result = subprocess.run(
+            [self.binary, "-m", self.model, "-f", str(wav_path), "-l", self.language,
+             "-t", str(self.threads), "-p", str(max(1, self.processors)),
+             "-ojf", "-of", str(out_prefix)],
+            capture_output=True, text=True
+        )
+        if result.returncode != 0:
+            print(f"❌ Error en whisper.cpp:\n{result.stderr[-1000:]}", file=sys.stderr)
+            sys.exit(1)
+
+        raw = json.loads(Path(f"{out_prefix}.json").read_text())
+        wav_path.unlink(missing_ok=True)
+        return whisper_cpp_to_verbose_json(raw, get_audio_duration(audio_path))
+
+
+def whisper_cpp_to_verbose_json(raw, duration):
+    """Convierte la salida -ojf de whisper.cpp (tokens con offsets en ms) al formato verbose_json."""
+    segments = []
+    words = []
+    for entry in raw.get("transcription", []):
+        offsets = entry.get("offsets", {})
+        segments.append({
+            "id": len(segments),
+            "start": offsets.get("from", 0) / 1000,
+            "end": offsets.get("to", 0) / 1000,
+            "text": entry.get("text", ""),
+        })
+        current = None
+        for tok in entry.get("tokens", []):
+            text = tok.get("text", "")
+            if not text or text.startswith("[_") or text.startswith("<|"):
+                continue
+            t_from = tok.get("offsets", {}).get("from", 0) / 1000
+            t_to = tok.get("offsets", {}).get("to", 0) / 1000
+            # Un token que empieza con espacio abre una palabra nueva
+            if current is None or text.startswith(" "):
+                if current:
+                    words.append(current)
+                current = {"word": text.strip(), "start": t_from, "end": t_to}
+            else:
+                current["word"] += text
+                current["end"] = t_to
+        if current:
+            words.append(current)
+
+    return {
+        "task": "transcribe",
+        "language": raw.get("result", {}).get("language"),
+        "duration": round(duration, 3),
+        "text": " ".join(seg["text"].strip() for seg in segments),
+        "segments": segments,
+        "words": [w for w in words if w["word"]],
+    }
+
+
+class FakeBackend(TranscriptionBackend):
+    """Backend determinístico para pruebas: sin red ni modelos.
+
+    Genera una palabra cada `word_step` segundos y un segmento cada
+    `segment_words` palabras sobre la duración real del audio.
+    """
+
+    name = "fake"
+
+    def __init__(self, language="es", word_step=0.5, segment_words=10):
+        self.language = language
+        self.word_step = word_step
+        self.segment_words = segment_words
+
+    def transcribe(self, audio_path: Path, dry_run: bool = False):
+        print("🎤 Transcribiendo con backend fake (determinístico)...")
+        if dry_run:
+            return None
+        duration = get_audio_duration(audio_path)
+        return fake_transcription(duration, self.language, self.word_step, self.segment_words)
+
+
+def fake_transcription(duration, language="es", word_step=0.5, segment_words=10):
+    """verbose_json sintético y determinístico para una duración dada."""
+    words = []
+    t = 0.0
+    while t + word_step <= duration:
+        words.append({"word": f"palabra{len(words)}", "start": round(t, 3), "end": round(t + word_step * 0.8, 3)})
+        t += word_step
+
+    segments = []
+    for i in range(0, len(words), segment_words):
+        group = words[i:i + segment_words]
+        text = " ".join(w["word"] for w in group)
+        segments.append({
+            "id": len(segments),
+            "start": group[0]["start"],
+            "end": group[-1]["end"],
+            "text": text + ".",
+        })
+
+    return {
+        "task": "transcribe",
+        "language": language,
+        "duration": round(duration, 3),
+        "text": " ".join(seg["text"] for seg in segments),
+        "segments": segments,
+        "words": words,
+    }
+
+
+def hash_decoded_pcm(video_path: Path):
+    """SHA-256 del audio decodificado (PCM 16 kHz mono), no de los bytes del contenedor.
+
+    Un re-mux o un re-render de otro paso cambia el archivo pero no el audio,
+    así que el hash (y la cache) sigue siendo válido.
+    """
+    import hashlib
+
+    proc = subprocess.Popen(
+        ["ffmpeg", "-i", str(video_path), "-vn", "-ac", "1", "-ar", "16000",
+         "-f", "s16le", "-"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    digest = hashlib.sha256()
+    for block in iter(lambda: proc.stdout.read(1024 * 1024), b""):
+        digest.update(block)
+    proc.wait()
+    if proc.returncode != 0:
+        return None
+    return digest.hexdigest()
+
+
+def cache_entry_path(cache_dir: Path, pcm_hash: str, params: dict):
+    """Ruta de la entrada de cache para un audio + parámetros que afectan el resultado."""
+    import hashlib
+
+    key_src = pcm_hash + json.dumps(params, sort_keys=True)
+    return cache_dir / f"{hashlib.sha256(key_src.encode()).hexdigest()}.json"
+
+
+def load_cached_transcription(cache_path: Path):
+    """Devuelve el verbose_json cacheado o None."""
+    if cache_path is None or not cache_path.exists():
+        return None
+    try:
+        return json.loads(cache_path.read_text())
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+def store_cached_transcription(cache_path: Path, data):
+    """Guarda el verbose_json en la cache (escritura atómica)."""
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix(".json.part")
+    tmp_path.write_text(json.dumps(data, ensure_ascii=False))
+    tmp_path.replace(cache_path)
+
+
 def format_ts(seconds):
     """Formatear segundos a M:SS.xx"""
     m = int(seconds // 60)
@@ -258,6 +984,22 @@ def main():
     parser.add_argument("--audio-only", action="store_true", help="Solo extraer audio, no transcribir")
     parser.add_argument("--clean-only", action="store_true", help="Solo regenerar transcription_limpia.md desde el JSON existente")
     parser.add_argument("--dry-run", action="store_true", help="Mostrar qué haría sin ejecutar")
+    parser.add_argument("--chunked", action="store_true", help="Cortar el audio en silencios y subir los chunks en paralelo (automático si pasa de 24 MB)")
+    parser.add_argument("--chunk-minutes", type=float, default=10.0, help="Duración máxima de cada chunk en minutos (default: 10)")
+    parser.add_argument("--workers", type=int, default=4, help="Uploads concurrentes en modo chunked (default: 4)")
+    parser.add_argument("--requests-per-minute", type=int, default=50, help="Límite de requests por minuto en modo chunked (default: 50)")
+    parser.add_argument("--api-url", default=WHISPER_URL, help="Endpoint de transcripción (default: API de OpenAI)")
+    parser.add_argument("--backend", default="openai", choices=["openai", "local", "fake"], help="Motor de transcripción (default: openai)")
+    parser.add_argument("--local-engine", default="faster-whisper", choices=["faster-whisper", "whisper.cpp"], help="Motor local para --backend local (default: faster-whisper)")
+    parser.add_argument("--local-model", default="large-v3", help="Modelo local: nombre de faster-whisper o ruta al .bin de whisper.cpp (default: large-v3)")
+    parser.add_argument("--threads", type=int, default=None, help="Threads de CPU para --backend local (default: todos)")
+    parser.add_argument("--batch-size", type=int, default=8, help="Batch de inferencia de faster-whisper (default: 8)")
+    parser.add_argument("--processors", type=int, default=1, help="Procesadores en paralelo de whisper.cpp (-p): cada uno usa --threads (default: 1)")
+    parser.add_argument("--strip-silence", action="store_true", help="No subir los silencios largos (los timestamps se remapean al timeline original)")
+    parser.add_argument("--strip-min-silence", type=float, default=1.0, help="Silencios mayores a N segundos se recortan con --strip-silence (default: 1.0)")
+    parser.add_argument("--strip-noise", type=int, default=-35, help="Threshold de silencio en dB para --strip-silence (default: -35)")
+    parser.add_argument("--cache-dir", default=str(CACHE_DIR), help="Cache de transcripciones (default: recursos/cache/transcription)")
+    parser.add_argument("--no-cache", action="store_true", help="Ignorar la cache y volver a transcribir")
 
     args = parser.parse_args()
 
@@ -296,25 +1038,82 @@ def main():
         limpia_path = transcripcion_dir / "transcription_limpia.md"
         generate_clean_transcription(data, video_path.name, limpia_path)
         print(f"✅ Transcripción limpia regenerada: {limpia_path.relative_to(video_dir)}")
+        index_dir = write_transcript_index(data, output_path)
+        if index_dir:
+            print(f"✅ Índice columnar: {index_dir.relative_to(video_dir)}")
         return
 
-    # Paso 1: Extraer audio
-    extract_audio(video_path, audio_path, dry_run=args.dry_run)
+    if args.backend == "openai":
+        backend = OpenAIBackend(
+            get_api_key(), args.model, args.language, tmp_dir, url=args.api_url, chunked=args.chunked,
+            chunk_minutes=args.chunk_minutes, workers=args.workers, per_minute=args.requests_per_minute
+        )
+    elif args.backend == "local":
+        backend = LocalBackend(
+            args.local_engine, args.local_model, args.language, tmp_dir,
+            threads=args.threads, batch_size=args.batch_size, processors=args.processors
+        )
+    else:
+        backend = FakeBackend(args.language)
 
-    if args.audio_only:
-        print(f"\n🏁 Audio extraído en: {audio_path}")
-        return
+    # Cache: si el audio no cambió desde la última corrida, no hace falta llamar a la API
+    data = None
+    cache_path = None
+    # El backend fake es solo para pruebas: sus resultados no entran a la cache compartida
+    if not args.audio_only and not args.dry_run and not args.no_cache and args.backend != "fake":
+        print("🔑 Calculando hash del audio decodificado...")
+        pcm_hash = hash_decoded_pcm(video_path)
+        if pcm_hash:
+            cache_params = {"backend": backend.cache_identity(), "language": args.language}
+            if args.strip_silence:
+                cache_params["strip_silence"] = [args.strip_noise, args.strip_min_silence]
+            cache_path = cache_entry_path(Path(args.cache_dir).expanduser(), pcm_hash, cache_params)
+            data = load_cached_transcription(cache_path)
+            if data:
+                print(f"   ♻️  Cache hit: {cache_path.name[:16]}… — sin llamar a la API")
+            else:
+                print(f"   Cache miss: {pcm_hash[:16]}…")
+        print()
 
-    # Paso 2: Transcribir
-    api_key = get_api_key()
-    if not api_key and not args.dry_run:
-        print("❌ No se encontró OPENAI_API_KEY en el entorno ni en ~/.openclaw/workspace/.env", file=sys.stderr)
-        print("   Exportala con: export OPENAI_API_KEY=sk-...", file=sys.stderr)
-        sys.exit(1)
+    if data is None:
+        # Paso 1: Extraer audio (opcional: sin los silencios largos)
+        keep = None
+        if args.strip_silence and not args.dry_run:
+            print(f"🔇 Detectando silencios para recortar (noise={args.strip_noise}dB, min={args.strip_min_silence}s)...")
+            video_duration = get_audio_duration(video_path)
+            keep = keep_intervals(video_duration, detect_silences(
+                video_path, args.strip_noise, args.strip_min_silence
+            ))
+            kept = sum(end - start for start, end, _ in keep)
+            print(f"   {len(keep)} intervalos con voz | se sube {format_ts(kept)} de {format_ts(video_duration)} "
+                  f"({kept / video_duration * 100:.0f}%)")
+            (tmp_dir / "audio_for_whisper.keep.json").write_text(json.dumps(keep))
+        extract_audio(video_path, audio_path, dry_run=args.dry_run, keep=keep)
 
-    data = transcribe_audio(audio_path, api_key, args.model, args.language, dry_run=args.dry_run)
+        if args.audio_only:
+            print(f"\n🏁 Audio extraído en: {audio_path}")
+            return
+
+        # Paso 2: Transcribir
+        if args.backend == "openai" and not backend.api_key and not args.dry_run:
+            print("❌ No se encontró OPENAI_API_KEY en el entorno ni en ~/.openclaw/workspace/.env", file=sys.stderr)
+            print("   Exportala con: export OPENAI_API_KEY=sk-...", file=sys.stderr)
+            sys.exit(1)
+        data = backend.transcribe(audio_path, dry_run=args.dry_run)
+
+        if data and keep:
+            data = remap_to_original(data, keep)
+            print("   🗺️  Timestamps remapeados al timeline original")
+
+        if data and cache_path:
+            store_cached_transcription(cache_path, data)
 
     if data and not args.dry_run:
+        # Anotar sobre qué corte del jump cut se transcribió (remap-transcript.py lo usa)
+        cutlist_path = video_path.with_suffix(".cutlist.json")
+        cutlist_id = json.loads(cutlist_path.read_text()).get("id") if cutlist_path.exists() else None
+        if cutlist_id:
+            data["cutlist"] = cutlist_id
         output_path.write_text(json.dumps(data, ensure_ascii=False, indent=2))
         print(f"\n✅ Transcripción guardada en: {output_path.relative_to(video_dir)}")
 
@@ -330,6 +1129,11 @@ def main():
         generate_clean_transcription(data, video_path.name, limpia_path)
         print(f"✅ Transcripción limpia: {limpia_path.relative_to(video_dir)}")
 
+        # Índice columnar para las búsquedas de los pasos 7-9
+        index_dir = write_transcript_index(data, output_path)
+        if index_dir:
+            print(f"✅ Índice columnar: {index_dir.relative_to(video_dir)}")
+
     if args.dry_run:
         print("\n🏁 [DRY RUN] No se ejecutó nada.")
 
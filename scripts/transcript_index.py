@@ -0,0 +1,216 @@
+"""
+Transcripción word-level — compartido por transcribe, detect-logos y los pasos 7-9.
+
+Índice columnar junto al JSON (`transcription_original.index/`, arrays .npy),
+carga con mmap y búsqueda fuzzy de palabras y frases.
+
+Los scripts viven en la misma carpeta, así que lo importan directo:
+  from transcript_index import WordIndex, load_transcript
+"""
+
+import bisect
+import json
+import os
+from collections import Counter
+from difflib import SequenceMatcher
+from functools import lru_cache
+from pathlib import Path
+
+INDEX_VERSION = 2  # v2: agrega la palabra original (word.npy / word_vocab.npy)
+
+
+def normalize_token(word):
+    """Normalización de palabras para búsquedas (la misma en todos los pasos)."""
+    return word.lower().strip(' .,!?¿¡"\'')
+
+
+class Transcript:
+    """Palabras word-level en columnas, ordenadas por `start`.
+
+    `starts`/`ends` y los ids (`tokens`, `word_ids`) pueden ser listas o arrays
+    numpy con mmap: solo se leen las posiciones que se consultan. Los textos
+    viven internados en `vocab` (normalizado) y `word_vocab` (original).
+    """
+
+    def __init__(self, starts, ends, tokens, vocab, word_ids, word_vocab):
+        self.starts = starts
+        self.ends = ends
+        self.tokens = tokens
+        self.vocab = vocab
+        self.word_ids = word_ids
+        self.word_vocab = word_vocab
+
+    @classmethod
+    def from_words(cls, words):
+        """Desde la lista `words` del JSON ([{'word', 'start', 'end'}, ...])."""
+        words = sorted(words, key=lambda w: w['start'])
+        vocab, word_vocab = {}, {}
+        return cls(
+            [w['start'] for w in words],
+            [w['end'] for w in words],
+            [vocab.setdefault(normalize_token(w['word']), len(vocab)) for w in words],
+            list(vocab),
+            [word_vocab.setdefault(w['word'], len(word_vocab)) for w in words],
+            list(word_vocab),
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def start(self, pos):
+        return float(self.starts[pos])
+
+    def end(self, pos):
+        return float(self.ends[pos])
+
+    def norm(self, pos):
+        return self.vocab[self.tokens[pos]]
+
+    def word(self, pos):
+        return self.word_vocab[self.word_ids[pos]]
+
+    def norms(self, lo, hi):
+        """Palabras normalizadas de [lo, hi)."""
+        return [self.vocab[t] for t in self.tokens[lo:hi]]
+
+
+def write_transcript_index(data, json_path: Path):
+    """Escribe el índice columnar junto al JSON: `<json>.index/` con arrays .npy.
+
+    - start.npy / end.npy: float64 por palabra, ordenadas por start
+    - token.npy: int32, id de la palabra normalizada en vocab
+    - vocab.npy: vocabulario internado (palabras normalizadas únicas)
+    - word.npy / word_vocab.npy: lo mismo para la palabra original (con mayúsculas y acentos)
+    - meta.json: versión, tamaño y mtime del JSON para detectar índices viejos
+
+    load_transcript() lo carga con np.load(mmap_mode='r') en vez de parsear el JSON.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        print("   ⚠️  numpy no está instalado — se omite el índice columnar")
+        return None
+
+    words = Transcript.from_words(data.get("words", []))
+
+    index_dir = json_path.parent / f"{json_path.stem}.index"
+    index_dir.mkdir(parents=True, exist_ok=True)
+    np.save(index_dir / "start.npy", np.array(words.starts, dtype=np.float64))
+    np.save(index_dir / "end.npy", np.array(words.ends, dtype=np.float64))
+    np.save(index_dir / "token.npy", np.array(words.tokens, dtype=np.int32))
+    np.save(index_dir / "vocab.npy", np.array(words.vocab, dtype=np.str_))
+    np.save(index_dir / "word.npy", np.array(words.word_ids, dtype=np.int32))
+    np.save(index_dir / "word_vocab.npy", np.array(words.word_vocab, dtype=np.str_))
+
+    st = json_path.stat()
+    (index_dir / "meta.json").write_text(json.dumps({
+        "version": INDEX_VERSION,
+        "source": json_path.name,
+        "size": st.st_size,
+        "mtime_ns": st.st_mtime_ns,
+        "words": len(words),
+        "vocab": len(words.vocab),
+    }))
+    return index_dir
+
+
+def load_transcript(transcription_json):
+    """Cargar la transcripción word-level como Transcript.
+
+    Usa el índice columnar (`transcription_original.index/`, mmap) si existe y
+    está al día con el JSON; si no, parsea el JSON.
+    """
+    index_dir = os.path.splitext(transcription_json)[0] + ".index"
+    meta_path = os.path.join(index_dir, "meta.json")
+    if os.path.isfile(meta_path):
+        try:
+            import numpy as np
+            with open(meta_path) as f:
+                meta = json.load(f)
+            st = os.stat(transcription_json)
+            if (meta.get("version") == INDEX_VERSION and meta.get("size") == st.st_size
+                    and meta.get("mtime_ns") == st.st_mtime_ns):
+                def load(name, mmap=True):
+                    return np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r" if mmap else None)
+                # Los vocabularios son chicos: se pasan a listas de str
+                return Transcript(load("start"), load("end"), load("token"), load("vocab", False).tolist(),
+                                  load("word"), load("word_vocab", False).tolist())
+        except (ImportError, OSError, ValueError):
+            pass
+
+    with open(transcription_json) as f:
+        transcription = json.load(f)
+    return Transcript.from_words(transcription.get('words', []))
+
+
+@lru_cache(maxsize=None)
+def similarity(a, b):
+    return SequenceMatcher(None, a, b).ratio()
+
+
+@lru_cache(maxsize=None)
+def similarity_bound(a, b):
+    """Cota superior de similarity(a, b): caracteres en común sin importar el orden.
+
+    Es la misma cota que SequenceMatcher.quick_ratio, pero sin armar el matcher.
+    """
+    if not a and not b:
+        return 1.0
+    common = sum((Counter(a) & Counter(b)).values())
+    return 2.0 * common / (len(a) + len(b))
+
+
+class WordIndex:
+    """Índice de búsqueda sobre un Transcript.
+
+    - Palabras ordenadas por `start` → el rango de un segmento sale con bisect
+    - Dentro del rango se rankea cada token distinto una sola vez, en orden de
+      cota (similarity_bound): SequenceMatcher solo corre sobre los que todavía
+      pueden ganarle al mejor encontrado.
+    El resultado es el mismo que comparar palabra por palabra todo el segmento.
+    """
+
+    def __init__(self, words):
+        self.words = words
+
+    def range(self, segment_start=None, segment_end=None):
+        """Posiciones [lo, hi) de las palabras dentro del segmento (±1s, como antes)."""
+        lo, hi = 0, len(self.words)
+        if segment_start is not None:
+            lo = bisect.bisect_left(self.words.starts, segment_start - 1.0)
+        if segment_end is not None:
+            hi = bisect.bisect_right(self.words.starts, segment_end + 1.0)
+            while hi > lo and self.words.ends[hi - 1] > segment_end + 1.0:
+                hi -= 1
+        return lo, hi
+
+    def best_word(self, token, lo, hi):
+        """(score, pos) de la palabra más parecida en [lo, hi); empate → la primera."""
+        first = {}
+        for pos, cand in enumerate(self.words.norms(lo, hi), lo):
+            first.setdefault(cand, pos)
+        ranked = sorted(((similarity_bound(token, cand), pos, cand) for cand, pos in first.items()),
+                        key=lambda c: (-c[0], c[1]))
+
+        best_score, best_pos = 0, None
+        for bound, pos, cand in ranked:
+            if bound < best_score:
+                break  # el resto tiene cota menor: ninguno puede ganar
+            score = similarity(token, cand)
+            if score > best_score or (score == best_score and best_pos is not None and pos < best_pos):
+                best_score, best_pos = score, pos
+        return best_score, best_pos
+
+    def best_phrase(self, tokens, lo, hi):
+        """(score, pos_inicio) de la ventana de len(tokens) palabras con mejor promedio; empate → la primera."""
+        size = len(tokens)
+        norms = self.words.norms(lo, hi)
+        best_score, best_pos = 0, None
+        for offset in range(len(norms) - size + 1):
+            window = norms[offset:offset + size]
+            if sum(similarity_bound(t, w) for t, w in zip(tokens, window)) / size <= best_score:
+                continue
+            score = sum(similarity(t, w) for t, w in zip(tokens, window)) / size
+            if score > best_score:
+                best_score, best_pos = score, lo + offset
+        return best_score, best_pos
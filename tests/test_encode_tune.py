@@ -0,0 +1,46 @@
+import pytest
+
+from conftest import load_script
+
+tune = load_script("encode-tune")
+
+
+def row(preset, crf, speed, bitrate, ssim):
+    return {"filter": "encode", "preset": preset, "crf": crf, "speed": speed, "bitrate": bitrate, "ssim": ssim}
+
+
+ROWS = [
+    row("ultrafast", 23, 20.0, 9e6, 0.960),
+    row("veryfast", 20, 10.0, 7e6, 0.975),
+    row("medium", 18, 4.0, 6e6, 0.985),
+    row("fast", 18, 5.0, 6e6, 0.984),
+    row("slow", 16, 2.0, 8e6, 0.992),
+]
+
+
+@pytest.mark.parametrize("seconds, budget, max_bitrate, min_ssim, expected, ok", [
+    # Solo presupuesto: el mejor SSIM que entra (600s / 2x = 300s)
+    (600, 300, None, None, ("slow", 16), True),
+    # Presupuesto más justo: medium (150s) entra, slow no
+    (600, 200, None, None, ("medium", 18), True),
+    # Objetivo de calidad: el archivo más chico que lo cumple, y entre iguales el más rápido
+    (600, None, None, 0.98, ("fast", 18), True),
+    (600, None, 7e6, None, ("fast", 18), True),
+    # Calidad + presupuesto: lo que cumple la calidad no entra → se prioriza el tiempo
+    (600, 70, None, 0.98, ("veryfast", 20), False),
+    # Nada entra en el tiempo → el más rápido
+    (600, 10, None, None, ("ultrafast", 23), False),
+])
+def test_pick_setting(seconds, budget, max_bitrate, min_ssim, expected, ok):
+    choice, meets = tune.pick_setting(ROWS, seconds, budget, max_bitrate, min_ssim)
+    assert (choice["preset"], choice["crf"]) == expected
+    assert meets == ok
+
+
+@pytest.mark.parametrize("budget, durations, expected", [
+    (900, {2: 600, 3: 600, 6: 300}, {2: 360, 3: 360, 6: 180}),
+    (100, {4: 50}, {4: 100}),
+    (100, {2: 0}, {2: 0.0}),
+])
+def test_split_budget(budget, durations, expected):
+    assert tune.split_budget(budget, durations) == pytest.approx(expected)
@@ -0,0 +1,38 @@
+import sys
+import time
+
+import pytest
+
+from conftest import load_script
+
+inserts = load_script("inserts")
+
+# Escribe la salida (último argumento, como ffmpeg) y después duerme/sale con el código pedido
+JOB = "import sys, time; open(sys.argv[-1], 'w').write('x'); time.sleep({sleep}); sys.exit({code})"
+
+
+def job(path, sleep=0.0, code=0):
+    return ([sys.executable, "-c", JOB.format(sleep=sleep, code=code), str(path)], str(path), path.name)
+
+
+def test_run_jobs_ok(tmp_path):
+    jobs = [job(tmp_path / f"piece_{i:04d}.ts") for i in range(4)]
+    inserts.run_jobs(jobs, workers=2)
+    assert all((tmp_path / f"piece_{i:04d}.ts").exists() for i in range(4))
+
+
+def test_run_jobs_failure_kills_running_and_cleans_up(tmp_path):
+    done = tmp_path / "clip-ok.partial.ts"
+    slow = tmp_path / "clip-lento.partial.ts"
+    broken = tmp_path / "piece_0001.ts"
+    queued = tmp_path / "piece_0002.ts"
+    jobs = [job(done), job(slow, sleep=30), job(broken, sleep=0.5, code=1), job(queued)]
+
+    started = time.monotonic()
+    with pytest.raises(SystemExit):
+        inserts.run_jobs(jobs, workers=3)
+
+    assert time.monotonic() - started < 10  # el ffmpeg lento se mató, no se esperó
+    assert (tmp_path / "clip-ok.ts").exists()  # lo que terminó pasa al cache
+    assert not slow.exists() and not broken.exists()
+    assert not list(tmp_path.glob("*.partial.*"))
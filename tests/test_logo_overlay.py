@@ -0,0 +1,56 @@
+from types import SimpleNamespace
+
+import pytest
+
+from conftest import load_script
+
+logo_overlay = load_script("logo-overlay")
+
+
+def test_prescale_keeps_straight_alpha(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    source = tmp_path / "marca.png"
+    img = Image.new("RGBA", (40, 20), (0, 0, 0, 0))
+    img.paste((255, 0, 0, 128), (10, 5, 30, 15))  # rojo semitransparente con borde transparente
+    img.save(source)
+
+    dest = logo_overlay.prescale_logo(str(source), str(tmp_path / "out.png"), 40, "fit")
+    out = Image.open(dest)
+    assert out.size == (40, 20)  # recortado a 20×10 y escalado a 40 de ancho
+    assert out.getpixel((20, 10)) == (255, 0, 0, 128)  # el color no se multiplica por el alpha
+
+
+def test_prescaled_graph_uses_straight_alpha():
+    args = SimpleNamespace(size=120, position="top-right", padding=40, padding_x=None, padding_y=None)
+    groups = [("marca", 0, [(1.0, 3.0)])]
+    filters, _ = logo_overlay.build_filter_graph(groups, {"marca": 1}, args, prescaled=True)
+    assert not any("premultiplied" in f for f in filters)
+
+
+@pytest.mark.parametrize("windows, expected", [
+    ([], []),
+    ([(1.0, 2.0)], [(1.0, 2.0)]),
+    # Solapadas y desordenadas → una sola
+    ([(3.0, 5.0), (1.0, 4.0)], [(1.0, 5.0)]),
+    # Se tocan → se unen
+    ([(1.0, 2.0), (2.0, 3.0)], [(1.0, 3.0)]),
+    # Una contiene a la otra
+    ([(1.0, 10.0), (2.0, 3.0)], [(1.0, 10.0)]),
+    # Separadas → quedan separadas
+    ([(5.0, 6.0), (1.0, 2.0)], [(1.0, 2.0), (5.0, 6.0)]),
+])
+def test_merge_windows(windows, expected):
+    assert logo_overlay.merge_windows(windows) == expected
+
+
+@pytest.mark.parametrize("detections, expected", [
+    ([], []),
+    # Misma marca y nivel → un grupo con las ventanas unidas
+    ([(1.0, 3.0, "a", 0), (2.0, 4.0, "a", 0), (8.0, 9.0, "a", 0)],
+     [("a", 0, [(1.0, 4.0), (8.0, 9.0)])]),
+    # Misma marca en otro nivel → grupo aparte; orden de primera aparición
+    ([(5.0, 6.0, "b", 0), (1.0, 2.0, "a", 1), (7.0, 8.0, "b", 1), (9.0, 10.0, "a", 1)],
+     [("b", 0, [(5.0, 6.0)]), ("a", 1, [(1.0, 2.0), (9.0, 10.0)]), ("b", 1, [(7.0, 8.0)])]),
+])
+def test_group_detections(detections, expected):
+    assert logo_overlay.group_detections(detections) == expected
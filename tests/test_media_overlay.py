@@ -0,0 +1,34 @@
+import json
+import subprocess
+
+import pytest
+
+from conftest import load_script
+
+media_overlay = load_script("media-overlay")
+
+BASE = {"width": 1920, "height": 1080, "fps": 30.0, "pix_fmt": "yuv420p"}
+
+
+@pytest.mark.parametrize("stream, expected", [
+    ({"codec_name": "h264", "pix_fmt": "yuv420p"}, (False, [])),
+    ({"codec_name": "prores", "pix_fmt": "yuva444p10le"}, (True, [])),
+    ({"codec_name": "qtrle", "pix_fmt": "argb"}, (True, [])),
+    ({"codec_name": "png", "pix_fmt": "rgba"}, (True, [])),
+    # VP9 con alfa: el pix_fmt no lo dice, el tag sí, y hace falta libvpx para decodificarlo
+    ({"codec_name": "vp9", "pix_fmt": "yuv420p", "tags": {"alpha_mode": "1"}}, (True, ["-c:v", "libvpx-vp9"])),
+    ({"codec_name": "vp9", "pix_fmt": "yuv420p"}, (False, [])),
+])
+def test_get_media_alpha(monkeypatch, stream, expected):
+    probe = subprocess.CompletedProcess([], 0, stdout=json.dumps({"streams": [stream]}), stderr="")
+    monkeypatch.setattr(media_overlay.subprocess, "run", lambda *a, **k: probe)
+    assert media_overlay.get_media_alpha("overlay.mov") == expected
+
+
+def test_alpha_videos_cache_to_alpha_format(tmp_path):
+    media = tmp_path / "intro.mov"
+    media.write_bytes(b"frames")
+    opaque = media_overlay.normalized_media_path(str(tmp_path), str(media), True, BASE)
+    alpha = media_overlay.normalized_media_path(str(tmp_path), str(media), True, BASE, alpha=True)
+    assert opaque.endswith("-yuv420p.mp4")
+    assert alpha.endswith("-yuva420p.mkv")
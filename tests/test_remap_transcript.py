@@ -0,0 +1,120 @@
+import json
+
+import pytest
+
+from conftest import load_script
+
+remap = load_script("remap-transcript")
+jump_cut = load_script("jump-cut")
+
+CURRENT = {"id": "nuevo"}
+
+
+@pytest.fixture
+def history_dir(tmp_path):
+    history = tmp_path / "4_video_jumpcut.cutlists"
+    history.mkdir()
+    (history / "viejo.json").write_text(json.dumps({"id": "viejo", "segments": []}))
+    return str(history)
+
+
+@pytest.mark.parametrize("data, from_cutlist, precut, expected, error", [
+    # Transcripción anotada con un corte del historial → se encuentra sola
+    ({"cutlist": "viejo"}, None, False, "viejo.json", None),
+    # Ya está en el timeline de la cut list actual → no se remapea dos veces
+    ({"cutlist": "nuevo"}, None, False, None, "ya está en el timeline"),
+    # Sin anotación ni flags → se niega (antes pisaba la transcripción sin saber su timeline)
+    ({}, None, False, None, "--from-cutlist"),
+    # Corte anotado que no está en el historial
+    ({"cutlist": "perdido"}, None, False, None, "no está la cut list perdido"),
+    # Pre-corte explícito y --from-cutlist explícito ganan sobre la anotación
+    ({}, None, True, None, None),
+    ({"cutlist": "nuevo"}, "a_mano.json", False, "a_mano.json", None),
+])
+def test_resolve_source_cutlist(history_dir, data, from_cutlist, precut, expected, error):
+    path, problem = remap.resolve_source_cutlist(data, CURRENT, history_dir, from_cutlist, precut)
+    assert (path and path.split("/")[-1]) == expected
+    assert (problem is None) if error is None else (error in problem)
+
+
+def test_cutlist_history_keeps_every_cut(tmp_path):
+    cutlist_path = str(tmp_path / "4_video_jumpcut.cutlist.json")
+    first = jump_cut.build_cutlist("3_video.mp4", 10.0, [(0.0, 4.0), (5.0, 10.0)], {"padding": 0.1})
+    second = jump_cut.build_cutlist("3_video.mp4", 10.0, [(0.0, 3.0), (6.0, 10.0)], {"padding": 0.3})
+    again = jump_cut.build_cutlist("3_video.mp4", 10.0, [(0.0, 4.0), (5.0, 10.0)], {"padding": 0.1})
+    for cutlist in (first, second, again):
+        jump_cut.write_cutlist(cutlist_path, cutlist)
+
+    assert first["id"] == again["id"] != second["id"]
+    history = tmp_path / "4_video_jumpcut.cutlists"
+    assert sorted(p.name for p in history.iterdir()) == sorted([f"{first['id']}.json", f"{second['id']}.json"])
+    assert json.loads((tmp_path / "4_video_jumpcut.cutlist.json").read_text())["id"] == first["id"]
+
+
+def test_cutlist_uses_measured_durations():
+    segments = [(0.0, 4.0), (5.0, 10.0)]
+    nominal = jump_cut.build_cutlist("3_video.mp4", 10.0, segments, {})
+    measured = jump_cut.build_cutlist("3_video.mp4", 10.0, segments, {}, durations=[4.021, 5.013])
+
+    # El timeline de salida sigue a las piezas reales, no a end - start
+    assert [(e["output_start"], e["output_end"]) for e in measured["segments"]] == [(0.0, 4.021), (4.021, 9.034)]
+    assert measured["output_duration"] == 9.034
+    # El id depende solo del corte
+    assert measured["id"] == nominal["id"]
+
+
+OVERLAY = "# Overlay\n[0:10 - 0:12] (2.0s) hola\n→ marca.png | 0:11 | ✅\n"
+
+
+@pytest.mark.parametrize("text, expected", [
+    (OVERLAY, None),
+    (remap.tag_overlay_md(OVERLAY, "viejo"), "viejo"),
+    (remap.tag_overlay_md(remap.tag_overlay_md(OVERLAY, "viejo"), "nuevo"), "nuevo"),
+])
+def test_overlay_cutlist_tag(text, expected):
+    assert remap.overlay_cutlist(text) == expected
+    assert text.count("<!-- cutlist:") == (expected is not None)
+
+
+def test_tagged_overlay_remaps_once():
+    forward = remap.CutMap({"segments": [
+        {"source_start": 0.0, "source_end": 5.0, "output_start": 0.0, "output_end": 5.0},
+        {"source_start": 8.0, "source_end": 20.0, "output_start": 5.0, "output_end": 17.0},
+    ]})
+    once = remap.tag_overlay_md(remap.remap_overlay_md(OVERLAY, forward), "nuevo")
+    assert "[0:07 - 0:09] (2.0s) hola" in once
+    assert "→ marca.png | 0:08 | ✅" in once
+    assert remap.overlay_cutlist(once) == "nuevo"
+
+
+CUT = {"id": "corte1", "source": "3_video.mp4", "segments": [
+    {"source_start": 0.0, "source_end": 4.0, "output_start": 0.0, "output_end": 4.0},
+    {"source_start": 10.0, "source_end": 20.0, "output_start": 4.0, "output_end": 14.0},
+]}
+
+
+@pytest.mark.parametrize("data, video, expected, error", [
+    # Sin anotar → se asume del video de entrada
+    ({}, "3_video.mp4", None, None),
+    # transcription_original.json sobre el corte → se vuelve al origen con la cut list del historial
+    ({"cutlist": "corte1"}, "3_video.mp4", "corte1", None),
+    # El video de entrada es ese mismo corte → sirve tal cual
+    ({"cutlist": "corte1"}, "4_video_jumpcut.mp4", None, None),
+    # Corte desconocido, o de otro video → se niega
+    ({"cutlist": "otro"}, "3_video.mp4", None, "timeline del corte otro"),
+    ({"cutlist": "corte1"}, "2_video.mp4", None, "timeline del corte corte1"),
+])
+def test_transcript_timeline(tmp_path, data, video, expected, error):
+    history = tmp_path / "4_video_jumpcut.cutlists"
+    history.mkdir()
+    (history / "corte1.json").write_text(json.dumps(CUT))
+    (tmp_path / "4_video_jumpcut.cutlist.json").write_text(json.dumps(CUT))
+
+    cutlist, problem = jump_cut.transcript_timeline(data, str(tmp_path / video), str(history))
+    assert (cutlist and cutlist["id"]) == expected
+    assert (problem is None) if error is None else (error in problem)
+
+
+def test_words_to_source():
+    words = [{"word": "a", "start": 1.0, "end": 1.4}, {"word": "b", "start": 5.0, "end": 5.4}]
+    assert [(w["start"], w["end"]) for w in jump_cut.words_to_source(words, CUT)] == [(1.0, 1.4), (11.0, 11.4)]
@@ -0,0 +1,80 @@
+import pytest
+
+from render_ranges import piece_seek, plan_render_ranges, plan_smart_pieces, range_commands
+
+KEYFRAMES = [0.0, 2.0, 4.0, 6.0, 8.0]
+
+
+@pytest.mark.parametrize("windows, duration, expected", [
+    # Sin ventanas: todo se copia
+    ([], 10.0, [(0.0, 10.0, "copy")]),
+    # Una ventana se abre hacia afuera hasta los keyframes que la rodean
+    ([(2.5, 3.5)], 10.0, [(0.0, 2.0, "copy"), (2.0, 4.0, "encode"), (4.0, 10.0, "copy")]),
+    # Ventanas que caen en GOPs contiguos se unen en un solo tramo
+    ([(2.5, 3.5), (4.2, 5.0)], 10.0, [(0.0, 2.0, "copy"), (2.0, 6.0, "encode"), (6.0, 10.0, "copy")]),
+    # Después del último keyframe el tramo llega hasta el final
+    ([(8.5, 9.0)], 10.0, [(0.0, 8.0, "copy"), (8.0, 10.0, "encode")]),
+    # Ventana que empieza justo en un keyframe no arrastra el GOP anterior
+    ([(4.0, 5.0)], 10.0, [(0.0, 4.0, "copy"), (4.0, 6.0, "encode"), (6.0, 10.0, "copy")]),
+    # Ventanas fuera del video o vacías se ignoran
+    ([(12.0, 13.0), (3.0, 3.0)], 10.0, [(0.0, 10.0, "copy")]),
+])
+def test_plan_render_ranges(windows, duration, expected):
+    assert plan_render_ranges(windows, KEYFRAMES, duration) == expected
+
+
+@pytest.mark.parametrize("windows", [[(0.3, 0.7)], [(1.0, 2.5), (7.9, 9.9)], [(0.0, 10.0)]])
+def test_plan_render_ranges_covers_video(windows):
+    pieces = plan_render_ranges(windows, KEYFRAMES, 10.0)
+    assert pieces[0][0] == 0.0 and pieces[-1][1] == 10.0
+    assert all(a[1] == b[0] for a, b in zip(pieces, pieces[1:]))
+
+
+def test_range_commands_one_per_piece(tmp_path):
+    pieces = [(0.0, 2.0, "copy"), (2.0, 4.0, "encode")]
+    commands, concat = range_commands("in.mp4", "out.mp4", pieces, str(tmp_path), lambda s, e: ["-map", "0:v"], 18, "fast", {})
+    assert len(commands) == 2
+    assert "copy" in commands[0] and "libx264" in commands[1]
+    assert (tmp_path / "list.txt").read_text() == "file 'piece_0000.ts'\nfile 'piece_0001.ts'\n"
+    assert concat[-1] == "out.mp4"
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    # Keyframes a ambos lados: cabeza y cola re-encodeadas, interior copiado
+    (1.0, 7.0, [(1.0, 2.0, "encode"), (2.0, 6.0, "copy"), (6.0, 7.0, "encode")]),
+    # Bordes justo en keyframes: solo copy
+    (2.0, 6.0, [(2.0, 6.0, "copy")]),
+    # Un solo keyframe adentro: se re-encodea todo el tramo
+    (3.0, 5.0, [(3.0, 5.0, "encode")]),
+    # Sin keyframes después de start
+    (8.5, 9.5, [(8.5, 9.5, "encode")]),
+    # Cabeza más corta que min_piece: no se genera pieza de 10 ms
+    (1.99, 4.5, [(2.0, 4.0, "copy"), (4.0, 4.5, "encode")]),
+])
+def test_plan_smart_pieces(start, end, expected):
+    assert plan_smart_pieces(start, end, KEYFRAMES) == expected
+
+
+@pytest.mark.parametrize("start, end, copy, expected", [
+    # Keyframe en pts no exacto: copy redondea hacia arriba (si no, el seek cae en el GOP anterior)
+    (16.683333, 18.683333, True, ("16.684", "1.999")),
+    # Re-encode redondea hacia abajo para no descartar el frame de borde
+    (16.683333, 18.683333, False, ("16.683", "2.000")),
+    # pts exactos en ms quedan igual
+    (2.0, 4.0, True, ("2.000", "2.000")),
+    (2.0, 4.0, False, ("2.000", "2.000")),
+])
+def test_piece_seek(start, end, copy, expected):
+    assert piece_seek(start, end, copy) == expected
+
+
+@pytest.mark.parametrize("fps", [24000 / 1001, 30000 / 1001, 25.0, 60.0])
+def test_piece_seek_lands_on_boundary_frame(fps):
+    # Para cualquier frame de borde, el seek de copy queda entre ese frame y el siguiente,
+    # y el de re-encode entre el anterior y ese frame (nunca en el GOP de al lado).
+    for n in range(1, 2000, 37):
+        pts = n / fps
+        ss_copy, _ = piece_seek(pts, pts + 2, copy=True)
+        ss_encode, _ = piece_seek(pts, pts + 2, copy=False)
+        assert pts <= float(ss_copy) < pts + 1 / fps
+        assert pts - 1 / fps < float(ss_encode) <= pts
@@ -0,0 +1,58 @@
+import re
+
+import pytest
+
+from conftest import load_script
+from transcript_index import Transcript
+
+text_overlay = load_script("text-overlay")
+
+
+def transcript(text, step=0.5):
+    """Texto → Transcript con una palabra cada `step` segundos (0.4s de duración)."""
+    return Transcript.from_words([{"word": f" {w}", "start": i * step, "end": i * step + 0.4}
+                                  for i, w in enumerate(text.split())])
+
+
+def tokens(text):
+    return re.findall(r"\w+", text.lower())
+
+
+@pytest.mark.parametrize("said, phrase, band, expected", [
+    # Match exacto en medio de la transcripción
+    ("hola a todos hoy vemos python avanzado", "hoy vemos python", None, (3, 5)),
+    # Errores de Whisper: se tolera el token mal transcripto
+    ("bueno entonces usamos antrópic para esto", "usamos anthropic", None, (2, 3)),
+    # La card resume: palabras dichas de más quedan dentro del span
+    ("esto es muy muy importante", "esto es importante", None, (0, 4)),
+    # Token de la card que no se dijo
+    ("vamos con el ejemplo", "vamos con el primer ejemplo", None, (0, 3)),
+    # La banda limita la búsqueda a la segunda aparición
+    ("hola mundo otra cosa hola mundo", "hola mundo", (2, 6), (4, 5)),
+    # Sin tokens o banda vacía → None
+    ("hola mundo", "", None, None),
+    ("hola mundo", "hola", (1, 1), None),
+])
+def test_align_phrase(said, phrase, band, expected):
+    words = transcript(said)
+    lo, hi = band or (0, len(words))
+    assert text_overlay.align_phrase(tokens(phrase), words, lo, hi) == expected
+
+
+def card(display, segment_text, start, end):
+    return {"display_text": display, "segment_text": segment_text, "segment_start": start, "segment_end": end}
+
+
+@pytest.mark.parametrize("cards, expected", [
+    # Frase repetida: la segunda card no puede volver a la primera aparición
+    ([card("hola mundo", "hola mundo", 0.0, 1.0), card("hola mundo", "hola mundo", 0.0, 1.0)],
+     [(0.0, 0.9), (2.0, 2.9)]),
+    # El display no se dijo → se usa el texto del segmento
+    ([card("Resumen XYZ", "otra cosa", 0.0, 3.0)], [(1.0, 1.9)]),
+    # Nada parecido → fallback al segmento
+    ([card("zzz qqq", "zzz qqq", 0.0, 3.0)], [(None, None)]),
+])
+def test_align_cards(cards, expected):
+    words = transcript("hola mundo otra cosa hola mundo")
+    results = text_overlay.align_cards(cards, words, margin=5.0)
+    assert [(start, end) for start, end, *_ in results] == [pytest.approx(span) for span in expected]
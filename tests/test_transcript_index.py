@@ -0,0 +1,129 @@
+import json
+import os
+import random
+import re
+from difflib import SequenceMatcher
+from pathlib import Path
+
+import pytest
+
+from conftest import load_script
+from transcript_index import (Transcript, WordIndex, load_transcript, similarity, similarity_bound,
+                              write_transcript_index)
+
+find_word_timestamp = load_script("media-overlay").find_word_timestamp
+find_word_end_timestamp = load_script("inserts").find_word_end_timestamp
+
+
+def norm(word):
+    return word.lower().strip(' .,!?¿¡"\'')
+
+
+def make_words(spec):
+    """[(palabra, start)] → palabras word-level de 0.4s."""
+    return [{'word': w, 'start': s, 'end': s + 0.4} for w, s in spec]
+
+
+def scan_timestamp(target_phrase, words, segment_start=None, segment_end=None):
+    """Búsqueda original (escaneo completo del segmento), la referencia para WordIndex."""
+    filtered = [w for w in words
+                if not (segment_start is not None and w['start'] < segment_start - 1.0)
+                and not (segment_end is not None and w['end'] > segment_end + 1.0)]
+    tokens = re.findall(r'\w+', target_phrase.lower())
+    if not filtered or not tokens:
+        return None, None
+    size = len(tokens)
+    best_score, best = 0, (None, None)
+    for i in range(len(filtered) - size + 1):
+        window = filtered[i:i + size]
+        score = sum(SequenceMatcher(None, t, norm(w['word'])).ratio() for t, w in zip(tokens, window)) / size
+        if score > best_score:
+            best_score, best = score, (window[0]['start'], window[-1]['end'])
+    return best if best_score >= 0.6 else (None, None)
+
+
+# Vocabulario lleno de tokens parecidos a `programacionales5` fuera del segmento
+DECOYS = [(f"programacionales{i}", 100.0 + i) for i in range(40)]
+
+
+@pytest.mark.parametrize("spec, phrase, segment, expected", [
+    # Los 30 mejores candidatos de todo el vocabulario no pueden tapar el match dentro del segmento
+    (DECOYS + [("programacionales5", 20.0), ("programación", 20.5)], "programacion", (20.0, 21.0), (20.5, 20.9)),
+    # Match exacto gana sobre uno parecido
+    ([("hola", 1.0), ("confirmaron", 1.5), ("confirmaran", 2.0)], "confirmaron", None, (1.5, 1.9)),
+    # Empate → la primera aparición
+    ([("gato", 1.0), ("pato", 1.5), ("gato", 2.0)], "gato", None, (1.0, 1.4)),
+    # Sin nada parecido → None
+    ([("hola", 1.0), ("mundo", 1.5)], "xyzzy", None, (None, None)),
+    # Frase: ventana consecutiva con mejor promedio
+    ([("el", 1.0), ("50", 1.5), ("por", 2.0), ("el", 2.5), ("cincuenta", 3.0)], "El 50", None, (1.0, 1.9)),
+    # La ventana de la frase queda dentro del segmento
+    ([("el", 1.0), ("50", 1.5), ("el", 10.0), ("50", 10.5)], "el 50", (10.0, 11.0), (10.0, 10.9)),
+])
+def test_find_word_timestamp(spec, phrase, segment, expected):
+    words = make_words(spec)
+    segment = segment or (None, None)
+    assert find_word_timestamp(phrase, WordIndex(Transcript.from_words(words)), *segment) == expected
+    assert scan_timestamp(phrase, sorted(words, key=lambda w: w['start']), *segment) == expected
+
+
+def test_find_word_end_timestamp_in_segment():
+    words = make_words(DECOYS + [("programacionales5", 20.0), ("programación", 20.5)])
+    assert find_word_end_timestamp("programacion", WordIndex(Transcript.from_words(words)), 20.0, 21.0) == pytest.approx(20.9)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_full_scan(seed):
+    rng = random.Random(seed)
+    syllables = ["pro", "gra", "ma", "ción", "con", "fir", "ma", "ron", "el", "la", "da", "tos", "50", "a"]
+    vocab = ["".join(rng.choices(syllables, k=rng.randint(1, 4))) for _ in range(60)]
+    words = make_words([(rng.choice(vocab), i * 0.5) for i in range(300)])
+    index = WordIndex(Transcript.from_words(words))
+    for _ in range(30):
+        phrase = " ".join(rng.choice(vocab) for _ in range(rng.randint(1, 3)))
+        if rng.random() < 0.5:
+            phrase = phrase[:-1] or phrase
+        start = rng.uniform(0, 150)
+        segment = rng.choice([(None, None), (start, start + rng.uniform(1, 20))])
+        assert find_word_timestamp(phrase, index, *segment) == scan_timestamp(phrase, words, *segment)
+
+
+@pytest.mark.parametrize("a, b", [
+    ("", ""), ("hola", ""), ("hola", "hola"), ("confirmaron", "confirmaran"),
+    ("programacion", "programacionales5"), ("abc", "cba"), ("50", "cincuenta"),
+])
+def test_similarity_bound(a, b):
+    assert similarity_bound(a, b) >= similarity(a, b)
+    assert similarity_bound(a, b) == pytest.approx(SequenceMatcher(None, a, b).quick_ratio())
+
+
+def write_json(tmp_path, words):
+    path = Path(tmp_path) / "transcription_original.json"
+    path.write_text(json.dumps({"words": words}))
+    return path
+
+
+def test_load_transcript_from_index(tmp_path):
+    np = pytest.importorskip("numpy")
+    spec = [{"word": " Antrópic,", "start": 1.5, "end": 1.9}, {"word": " Hola", "start": 0.5, "end": 0.9},
+            {"word": " antrópic.", "start": 2.0, "end": 2.4}]
+    path = write_json(tmp_path, spec)
+    write_transcript_index(json.loads(path.read_text()), path)
+
+    words = load_transcript(str(path))
+    assert isinstance(words.starts, np.memmap)
+    assert [words.word(pos) for pos in range(len(words))] == [" Hola", " Antrópic,", " antrópic."]
+    assert words.norms(0, 3) == ["hola", "antrópic", "antrópic"]
+    assert (words.start(1), words.end(2)) == (1.5, 2.4)
+
+
+def test_load_transcript_stale_index_falls_back_to_json(tmp_path):
+    pytest.importorskip("numpy")
+    path = write_json(tmp_path, [{"word": "uno", "start": 0.0, "end": 0.4}])
+    write_transcript_index(json.loads(path.read_text()), path)
+    path.write_text(json.dumps({"words": [{"word": "Dos", "start": 0.0, "end": 0.4}]}))
+    os.utime(path, ns=(0, 0))
+
+    words = load_transcript(str(path))
+    assert isinstance(words.starts, list)
+    assert (words.word(0), words.norm(0)) == ("Dos", "dos")